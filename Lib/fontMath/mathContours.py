@@ -0,0 +1,259 @@
+from __future__ import absolute_import
+from array import array
+from fontMath.mathFunctions import transformArray, _roundNumber
+
+"""
+Array backed contour storage for MathGlyph.
+
+The contour data of a glyph is split into:
+-   coordinates: one flat array of doubles holding the
+    interleaved x, y values of every point in the glyph.
+    this is a (N, 2) matrix in row major order.
+-   contourEnds: the index, in points, one past the last
+    point of each contour.
+-   pointInfo: a (segmentType, smooth, name, identifier)
+    tuple for each point.
+-   contourIdentifiers: the identifier of each contour.
+
+The topology fingerprint of the contours is cached on the
+object and passed on to the results of math.
+
+Only the coordinates change during math, so the other
+structures are immutable tuples that are shared between
+the operands and the result.
+"""
+
+__all__ = [
+    "PackedContours",
+    "contourFingerprint",
+]
+
+
+class PackedContours(object):
+
+    def __init__(self, coordinates, contourEnds, pointInfo, contourIdentifiers):
+        self.coordinates = coordinates
+        self.contourEnds = contourEnds
+        self.pointInfo = pointInfo
+        self.contourIdentifiers = contourIdentifiers
+        self._fingerprint = None
+
+    @classmethod
+    def fromContours(cls, contours):
+        """
+        Pack a list of MathGlyph contour dicts.
+
+        >>> contours = [
+        ...     dict(identifier="contour 1", points=[
+        ...         ("curve", (0, 1), False, "a", "1"),
+        ...         (None, (2, 3), False, None, None),
+        ...     ]),
+        ...     dict(identifier=None, points=[
+        ...         ("line", (4, 5), True, None, None),
+        ...     ]),
+        ... ]
+        >>> packed = PackedContours.fromContours(contours)
+        >>> packed.coordinates
+        array('d', [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+        >>> packed.contourEnds
+        (2, 3)
+        >>> packed.toContours() == contours
+        True
+        """
+        coordinates = array("d")
+        contourEnds = []
+        pointInfo = []
+        contourIdentifiers = []
+        for contour in contours:
+            for segmentType, pt, smooth, name, identifier in contour["points"]:
+                coordinates.extend(pt)
+                pointInfo.append((segmentType, smooth, name, identifier))
+            contourEnds.append(len(pointInfo))
+            contourIdentifiers.append(contour["identifier"])
+        return cls(coordinates, tuple(contourEnds), tuple(pointInfo), tuple(contourIdentifiers))
+
+    def toContours(self):
+        """
+        Unpack to a list of MathGlyph contour dicts.
+        """
+        coordinates = self.coordinates
+        pts = list(zip(coordinates[0::2], coordinates[1::2]))
+        pointInfo = self.pointInfo
+        contours = []
+        start = 0
+        for contourIdentifier, end in zip(self.contourIdentifiers, self.contourEnds):
+            points = [
+                (segmentType, pt, smooth, name, identifier)
+                for pt, (segmentType, smooth, name, identifier)
+                in zip(pts[start:end], pointInfo[start:end])
+            ]
+            contours.append(dict(identifier=contourIdentifier, points=points))
+            start = end
+        return contours
+
+    def copyWithCoordinates(self, coordinates):
+        """
+        Return a new object sharing the topology of
+        self but with different coordinates.
+        """
+        packed = self.__class__(coordinates, self.contourEnds, self.pointInfo, self.contourIdentifiers)
+        packed._fingerprint = self._fingerprint
+        return packed
+
+    @classmethod
+    def join(cls, packedList):
+        """
+        Return a new object with the contours of all objects
+        in packedList, in order.
+        """
+        coordinates = array("d")
+        contourEnds = []
+        pointInfo = []
+        contourIdentifiers = []
+        for packed in packedList:
+            values = packed.coordinates
+            if isinstance(values, array) and values.typecode == "d":
+                coordinates.extend(values)
+            else:
+                coordinates.extend(iter(values))
+            offset = len(pointInfo)
+            contourEnds.extend([end + offset for end in packed.contourEnds])
+            pointInfo.extend(packed.pointInfo)
+            contourIdentifiers.extend(packed.contourIdentifiers)
+        return cls(coordinates, tuple(contourEnds), tuple(pointInfo), tuple(contourIdentifiers))
+
+    def withoutIdentifiers(self):
+        """
+        Return a new object sharing the coordinates of self
+        but without contour and point identifiers.
+        """
+        pointInfo = tuple([
+            (segmentType, smooth, name, None)
+            for segmentType, smooth, name, identifier in self.pointInfo
+        ])
+        packed = self.__class__(self.coordinates, self.contourEnds, pointInfo, (None,) * len(self.contourEnds))
+        packed._fingerprint = self._fingerprint
+        return packed
+
+    def isCompatible(self, other):
+        return self.contourEnds == other.contourEnds
+
+    def fingerprint(self):
+        """
+        Return the topology fingerprint of the contours.
+        See contourFingerprint.
+        """
+        if self._fingerprint is None:
+            pointInfo = self.pointInfo
+            segmentTypes = []
+            start = 0
+            for end in self.contourEnds:
+                segmentTypes.append([info[0] for info in pointInfo[start:end]])
+                start = end
+            self._fingerprint = contourFingerprint(segmentTypes)
+        return self._fingerprint
+
+    def __len__(self):
+        return len(self.pointInfo)
+
+    def __eq__(self, other):
+        if not isinstance(other, PackedContours):
+            return NotImplemented
+        return (
+            self.contourEnds == other.contourEnds
+            and self.contourIdentifiers == other.contourIdentifiers
+            and self.pointInfo == other.pointInfo
+            and self.coordinates == other.coordinates
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    # -------
+    # Drawing
+    # -------
+
+    def drawPoints(self, pointPen):
+        coordinates = self.coordinates
+        pts = list(zip(coordinates[0::2], coordinates[1::2]))
+        pointInfo = self.pointInfo
+        start = 0
+        for contourIdentifier, end in zip(self.contourIdentifiers, self.contourEnds):
+            pointPen.beginPath(identifier=contourIdentifier)
+            for index in range(start, end):
+                segmentType, smooth, name, identifier = pointInfo[index]
+                pointPen.addPoint(pt=pts[index], segmentType=segmentType, smooth=smooth, name=name, identifier=identifier)
+            pointPen.endPath()
+            start = end
+
+    # --------------
+    # Transformation
+    # --------------
+
+    def transform(self, matrix):
+        """
+        Return a new object with the coordinates transformed
+        by a (xx, xy, yx, yy, dx, dy) matrix.
+        """
+        return self.copyWithCoordinates(transformArray(self.coordinates, matrix))
+
+    # --------
+    # Rounding
+    # --------
+
+    def round(self, digits=None):
+        """
+        Round the coordinates. Rounding to integers stores the
+        result in an integer array so that the drawn points are
+        ints, as they are with unpacked contours.
+        """
+        return self.copyWithCoordinates(_roundArray(self.coordinates, digits))
+
+
+# -----------
+# Fingerprint
+# -----------
+
+_segmentTypeCodes = {
+    None: "o",
+    "move": "m",
+    "line": "l",
+    "curve": "c",
+    "qcurve": "q",
+}
+
+def contourFingerprint(contours):
+    """
+    Return a string describing the topology of a list of
+    contours, each given as a list of point segment types.
+    Two lists of contours have the same fingerprint when they
+    have the same number of contours, the same number of points
+    in each contour and the same segment type at each point.
+    The string starts with the number of contours, so no
+    contours and a single empty contour are told apart.
+    The string caches its own hash, so the fingerprint is cheap
+    to compare and to use as a dict key.
+
+    >>> contourFingerprint([["curve", None, None, "curve"], ["line"]])
+    '2:cooc|l'
+    >>> contourFingerprint([]), contourFingerprint([[]])
+    ('0:', '1:')
+    """
+    codes = _segmentTypeCodes
+    contours = [
+        "".join([codes.get(segmentType) or "(%s)" % segmentType for segmentType in contour])
+        for contour in contours
+    ]
+    return "%d:%s" % (len(contours), "|".join(contours))
+
+
+def _roundArray(values, digits=None):
+    if digits is None:
+        return array("q", map(_roundNumber, values))
+    return array("d", [_roundNumber(v, digits) for v in values])
+
+
+if __name__ == "__main__":
+    import sys
+    import doctest
+    sys.exit(doctest.testmod().failed)
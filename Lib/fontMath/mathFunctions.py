@@ -1,6 +1,9 @@
 from __future__ import division
 import math
+import operator
 import sys
+from array import array
+from itertools import cycle, repeat
 
 __all__ = [
     "add",
@@ -11,7 +14,18 @@ __all__ = [
     "mulPt",
     "div",
     "divPt",
+    "addArray",
+    "subArray",
+    "mulArray",
+    "divArray",
+    "interpolate",
+    "interpolatePt",
+    "interpolateArray",
+    "linearCombinationArray",
+    "transformPt",
+    "transformArray",
     "factorAngle",
+    "transformAngle",
     "_roundNumber",
 ]
 
@@ -41,6 +55,72 @@ def divPt(pt, f):
     (f1, f2) = f
     return pt[0] / f1, pt[1] / f2
 
+# Point arrays are flat arrays of interleaved coordinates:
+# x0, y0, x1, y1, ... The result is always a new array of doubles.
+# (building the array from a list is faster than from an iterator)
+
+def addArray(a1, a2):
+    return array("d", list(map(operator.add, a1, a2)))
+
+def subArray(a1, a2):
+    return array("d", list(map(operator.sub, a1, a2)))
+
+def _arrayFactors(f):
+    (f1, f2) = f
+    if f1 == f2:
+        return repeat(f1)
+    return cycle((f1, f2))
+
+def _processArrayWithFactor(a, f, func):
+    return array("d", list(map(func, a, _arrayFactors(f))))
+
+def mulArray(a, f):
+    return _processArrayWithFactor(a, f, operator.mul)
+
+def divArray(a, f):
+    return _processArrayWithFactor(a, f, operator.truediv)
+
+# Interpolation gives exactly the same result as
+# v1 + (v2 - v1) * f written with the functions above.
+
+def interpolate(v1, v2, f):
+    return v1 + (v2 - v1) * f
+
+def interpolatePt(pt1, pt2, f):
+    (f1, f2) = f
+    return pt1[0] + (pt2[0] - pt1[0]) * f1, pt1[1] + (pt2[1] - pt1[1]) * f2
+
+def interpolateArray(a1, a2, f):
+    deltas = map(operator.mul, map(operator.sub, a2, a1), _arrayFactors(f))
+    return array("d", list(map(operator.add, a1, deltas)))
+
+# The linear combination is summed in order, so it gives
+# exactly the same result as a1 * f1 + a2 * f2 + ...
+
+def linearCombinationArray(arrays, factors):
+    result = mulArray(arrays[0], factors[0])
+    for a, f in zip(arrays[1:], factors[1:]):
+        scaled = map(operator.mul, a, _arrayFactors(f))
+        result = array("d", list(map(operator.add, result, scaled)))
+    return result
+
+# The affine transformations take a (xx, xy, yx, yy, dx, dy)
+# matrix, as fontTools.misc.transform.Transform does.
+
+def transformPt(pt, matrix):
+    (xx, xy, yx, yy, dx, dy) = matrix
+    x, y = pt
+    return xx * x + yx * y + dx, xy * x + yy * y + dy
+
+def transformArray(a, matrix):
+    (xx, xy, yx, yy, dx, dy) = matrix
+    xs = a[0::2]
+    ys = a[1::2]
+    result = array("d", [0.0]) * len(a)
+    result[0::2] = array("d", [xx * x + yx * y + dx for x, y in zip(xs, ys)])
+    result[1::2] = array("d", [xy * x + yy * y + dy for x, y in zip(xs, ys)])
+    return result
+
 def factorAngle(angle, f, func):
     (f1, f2) = f
     # If both factors are equal, assume a scalar factor and scale the angle as such.
@@ -56,6 +136,15 @@ def factorAngle(angle, f, func):
         )
     )
 
+def transformAngle(angle, matrix):
+    # transform the direction vector of the angle
+    # and leave the offset out.
+    (xx, xy, yx, yy, dx, dy) = matrix
+    rangle = math.radians(angle)
+    x = math.cos(rangle)
+    y = math.sin(rangle)
+    return math.degrees(math.atan2(xy * x + yy * y, xx * x + yx * y))
+
 
 def round2(number, ndigits=None):
     """
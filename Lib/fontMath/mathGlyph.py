@@ -1,11 +1,18 @@
 from __future__ import print_function, absolute_import
 from copy import deepcopy
+from array import array
 from collections import OrderedDict
 from fontMath.mathFunctions import (
-    add, addPt, div, divPt, mul, mulPt, _roundNumber, sub, subPt)
+    add, addPt, div, divPt, mul, mulPt, _roundNumber, sub, subPt,
+    addArray, subArray, mulArray, divArray, factorAngle,
+    interpolate, interpolatePt, interpolateArray, linearCombinationArray,
+    transformPt)
+from fontMath.mathContours import PackedContours, contourFingerprint
 from fontMath.mathGuideline import (
-    _compressGuideline, _expandGuideline, _pairGuidelines,
-    _processMathOneGuidelines, _processMathTwoGuidelines, _roundGuidelines)
+    _compressGuideline, _expandGuideline, _pairGuidelines, _pairGuidelineIndexes,
+    _processMathOneGuidelines, _processMathTwoGuidelines, _transformGuidelines,
+    _roundGuidelines)
+from fontTools.misc.transform import Transform
 from fontTools.pens.pointPen import AbstractPointPen
 
 # ------------------
@@ -57,6 +64,13 @@ except NameError:
     basestring = str
 
 
+_glyphSlots = (
+    "scaleComponentTransform", "strict", "packed", "singlePrecision", "lazy", "geometryOnly",
+    "_contours", "_packedContours", "_contourFingerprint", "components", "anchors", "guidelines",
+    "image", "_lib", "_sharedLib", "_libExposed", "name", "unicodes", "width", "height", "note"
+)
+
+
 class MathGlyph(object):
 
     """
@@ -70,7 +84,9 @@ class MathGlyph(object):
         same order as the original.
     """
 
-    def __init__(self, glyph, scaleComponentTransform=True, strict=False):
+    __slots__ = _glyphSlots + ("__dict__", "__weakref__")
+
+    def __init__(self, glyph, scaleComponentTransform=True, strict=False, packed=False, lazy=False, geometryOnly=False, singlePrecision=False):
         """Initialize a new MathGlyph object.
 
         Args:
@@ -85,16 +101,43 @@ class MathGlyph(object):
                 straight segments to improve compatibility. Any offcurves that are
                 still on-point will be filtered when extracted. When set to True,
                 no offcurves will be added or filtered.
+            packed (bool): when set to True, the point coordinates of all contours
+                are stored in a single flat array of doubles and contour math is
+                done on that array in one pass. The contours attribute is still
+                available but reading it unpacks the data.
+            lazy (bool): when set to True, the math operators return a LazyMathGlyph
+                expression instead of a new MathGlyph. The expression is evaluated
+                in one pass, with linearCombination, when its data is first used.
+            geometryOnly (bool): when set to True, only the outline and component
+                geometry is kept. The anchors, guidelines, image and lib are not
+                copied from the glyph, math results leave them empty and
+                extractGlyph does not change them in the target glyph.
+            singlePrecision (bool): when set to True, the contours are packed, as with
+                packed=True, but the point coordinates are stored as 32 bit floats.
+                This halves the memory used by the coordinates, at the cost of
+                about 7 significant digits of precision, and is meant for glyphs
+                that are kept in memory in large numbers, such as previews. Math is
+                still done in double precision and the result is stored in single
+                precision again. round returns a glyph that is not single precision,
+                and extractGlyph draws the coordinates as regular Python floats.
         """
         self.scaleComponentTransform = scaleComponentTransform
-        self.contours = []
+        self._contours = []
+        self._packedContours = None
+        self._contourFingerprint = None
+        self._sharedLib = None
+        self._libExposed = False
         self.components = []
         self.strict = strict
+        self.packed = packed or singlePrecision
+        self.singlePrecision = singlePrecision
+        self.lazy = lazy
+        self.geometryOnly = geometryOnly
         if glyph is None:
             self.anchors = []
             self.guidelines = []
             self.image = _expandImage(None)
-            self.lib = {}
+            self._lib = {}
             self.name = None
             self.unicodes = None
             self.width = None
@@ -103,35 +146,216 @@ class MathGlyph(object):
         else:
             p = MathGlyphPen(self, strict=self.strict)
             glyph.drawPoints(p)
-            self.anchors = [dict(anchor) for anchor in glyph.anchors]
-            self.guidelines = [_expandGuideline(guideline) for guideline in glyph.guidelines]
-            self.image = _expandImage(glyph.image)
-            self.lib = deepcopy(dict(glyph.lib))
+            if geometryOnly:
+                self.anchors = []
+                self.guidelines = []
+                self.image = _expandImage(None)
+                self._lib = {}
+            else:
+                self.anchors = [dict(anchor) for anchor in glyph.anchors]
+                self.guidelines = [_expandGuideline(guideline) for guideline in glyph.guidelines]
+                self.image = _expandImage(glyph.image)
+                self._lib = deepcopy(dict(glyph.lib))
             self.name = glyph.name
             self.unicodes = list(glyph.unicodes)
             self.width = glyph.width
             self.height = glyph.height
             self.note = glyph.note
+        if self.packed:
+            self._setPackedContours(self._getPackedContours())
 
     def __eq__(self, other):
         try:
             return all(getattr(self, attr) == getattr(other, attr)
                        for attr in ("name", "unicodes", "width", "height",
-                                    "note", "lib", "contours", "components",
-                                    "anchors", "guidelines", "image"))
+                                    "note", "components",
+                                    "anchors", "guidelines", "image")) \
+                and self._peekLib() == _peekLib(other) \
+                and self._contoursEqual(other)
         except AttributeError:
             return NotImplemented
 
     def __ne__(self, other):
         return not self == other
 
+    # --------
+    # Pickling
+    # --------
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for attr in _glyphSlots:
+            state[attr] = getattr(self, attr)
+        return state
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
+    # --------
+    # Contours
+    # --------
+
+    def _get_contours(self):
+        if self._contours is None:
+            self._contours = self._packedContours.toContours()
+            self._packedContours = None
+        return self._contours
+
+    def _set_contours(self, contours):
+        self._contours = contours
+        self._packedContours = None
+        self._contourFingerprint = None
+
+    contours = property(_get_contours, _set_contours, doc="""
+        The contours as a list of dicts. In packed mode reading this
+        unpacks the point array. The unpacked list replaces the
+        packed storage of the glyph, so in-place changes to it are
+        honored. The glyph itself is not packed again, only the
+        results of math with it are.
+        """)
+
+    def _peekContours(self):
+        """
+        Return the contours without unpacking the storage.
+        The returned list must not be modified.
+        """
+        if self._contours is None:
+            return self._packedContours.toContours()
+        return self._contours
+
+    def _getPackedContours(self):
+        if self._packedContours is not None:
+            return self._packedContours
+        return PackedContours.fromContours(self._contours)
+
+    def _setPackedContours(self, packedContours):
+        if self.singlePrecision and _typecode(packedContours.coordinates) != "f":
+            packedContours = packedContours.copyWithCoordinates(array("f", packedContours.coordinates))
+        self._packedContours = packedContours
+        self._contours = None
+        self._contourFingerprint = None
+
+    def _hasContours(self):
+        if self._packedContours is not None:
+            return len(self._packedContours) > 0
+        return bool(self._contours)
+
+    def _contoursEqual(self, other):
+        packed1 = self._packedContours
+        packed2 = getattr(other, "_packedContours", None)
+        if packed1 is not None and packed2 is not None:
+            return packed1 == packed2
+        if packed1 is not None:
+            contours1 = packed1.toContours()
+        else:
+            contours1 = self._contours
+        if packed2 is not None:
+            contours2 = packed2.toContours()
+        else:
+            contours2 = other.contours
+        return contours1 == contours2
+
+    # -----------
+    # Fingerprint
+    # -----------
+
+    def _get_topologyFingerprint(self):
+        if self._packedContours is not None:
+            contours = self._packedContours.fingerprint()
+        else:
+            contours = self._contourFingerprint
+            if contours is None:
+                contours = contourFingerprint(
+                    [point[0] for point in contour["points"]] for contour in self._contours
+                )
+                self._contourFingerprint = contours
+        return contours, tuple([component["baseGlyph"] for component in self.components])
+
+    topologyFingerprint = property(_get_topologyFingerprint, doc="""
+        A hashable description of the structure of the glyph: the
+        number of contours, the number of points and the segment
+        types in each contour and the base glyphs of the components.
+        Glyphs with the same fingerprint are compatible for contour
+        math. The contour part is computed once and kept until the
+        contours are set again or a point pen is requested, so
+        other changes made in place to the contour list afterwards
+        are not noticed. Packed contours
+        share it with the results of math.
+        """)
+
+    # ---
+    # Lib
+    # ---
+
+    def _get_lib(self):
+        if self._sharedLib is not None:
+            self._lib = deepcopy(dict(self._sharedLib))
+            self._sharedLib = None
+        self._libExposed = True
+        return self._lib
+
+    def _set_lib(self, lib):
+        self._lib = lib
+        self._sharedLib = None
+        self._libExposed = True
+
+    lib = property(_get_lib, _set_lib, doc="""
+        The lib as a dict. A lib that has not been read or set
+        through this property is shared by the glyph with its
+        copies and math results, and each of them makes its own
+        deep copy when the lib is first read, so glyph math that
+        never touches the lib does not pay for copying it. Once
+        the dict has been handed out, it may be changed at any
+        time, so copies and math results get a deep copy of it.
+        """)
+
+    def _peekLib(self):
+        """
+        Return the lib data without making a private copy.
+        The returned dict must not be modified.
+        """
+        if self._sharedLib is not None:
+            return self._sharedLib
+        return self._lib
+
+    def _shareLib(self):
+        """
+        Return the lib data to be shared with a new glyph.
+        """
+        if self._sharedLib is not None:
+            return self._sharedLib
+        if self._libExposed:
+            return deepcopy(dict(self._lib))
+        # self also makes a private copy on its next read
+        self._sharedLib = self._lib
+        self._lib = None
+        return self._sharedLib
+
     # ----
     # Copy
     # ----
 
     def copy(self):
-        """return a new MathGlyph containing all data in self"""
-        return MathGlyph(self, scaleComponentTransform=self.scaleComponentTransform, strict=self.strict)
+        """
+        return a new MathGlyph containing all data in self
+
+        the data is already normalized, so the structures are
+        cloned directly rather than drawn through MathGlyphPen.
+        point tuples and packed topology are shared.
+        """
+        n = self.copyWithoutMathSubObjects()
+        if self._packedContours is not None:
+            packed = self._packedContours
+            n._setPackedContours(packed.copyWithCoordinates(packed.coordinates[:]))
+        else:
+            n.contours = _copyContours(self._contours)
+            n._contourFingerprint = self._contourFingerprint
+        n.components = [dict(component) for component in self.components]
+        n.anchors = [dict(anchor) for anchor in self.anchors]
+        n.guidelines = [dict(guideline) for guideline in self.guidelines]
+        n.image = dict(self.image)
+        return n
 
     def copyWithoutMathSubObjects(self):
         """
@@ -143,14 +367,15 @@ class MathGlyph(object):
 
         this is used mainly for internal glyph math.
         """
-        n = MathGlyph(None, scaleComponentTransform=self.scaleComponentTransform, strict=self.strict)
+        n = MathGlyph(None, scaleComponentTransform=self.scaleComponentTransform, strict=self.strict, packed=self.packed, lazy=self.lazy, geometryOnly=self.geometryOnly, singlePrecision=self.singlePrecision)
         n.name = self.name
         if self.unicodes is not None:
             n.unicodes = list(self.unicodes)
         n.width = self.width
         n.height = self.height
         n.note = self.note
-        n.lib = deepcopy(dict(self.lib))
+        if not self.geometryOnly:
+            n._sharedLib = self._shareLib()
         return n
 
     # ----
@@ -160,50 +385,83 @@ class MathGlyph(object):
     # math with other glyph
 
     def __add__(self, otherGlyph):
+        if self.lazy:
+            return LazyMathGlyph.fromGlyph(self) + otherGlyph
         copiedGlyph = self.copyWithoutMathSubObjects()
         self._processMathOne(copiedGlyph, otherGlyph, addPt, add)
         return copiedGlyph
 
     def __sub__(self, otherGlyph):
+        if self.lazy:
+            return LazyMathGlyph.fromGlyph(self) - otherGlyph
         copiedGlyph = self.copyWithoutMathSubObjects()
         self._processMathOne(copiedGlyph, otherGlyph, subPt, sub)
         return copiedGlyph
 
-    def _processMathOne(self, copiedGlyph, otherGlyph, ptFunc, func):
+    # in-place math with other glyph
+
+    def __iadd__(self, otherGlyph):
+        if self.lazy:
+            return NotImplemented
+        self._processMathOne(self, otherGlyph, addPt, add)
+        return self
+
+    def __isub__(self, otherGlyph):
+        if self.lazy:
+            return NotImplemented
+        self._processMathOne(self, otherGlyph, subPt, sub)
+        return self
+
+    def _processMathOne(self, copiedGlyph, otherGlyph, ptFunc, func, pairing=None):
+        # copiedGlyph may be self, so each value
+        # is computed before it is replaced.
+        if pairing is None:
+            pairing = MathGlyphPairing([self, otherGlyph])
         # width
         copiedGlyph.width = func(self.width, otherGlyph.width)
         # height
         copiedGlyph.height = func(self.height, otherGlyph.height)
         # contours
-        copiedGlyph.contours = []
-        if self.contours:
-            copiedGlyph.contours = _processMathOneContours(self.contours, otherGlyph.contours, ptFunc)
+        if self._hasContours():
+            if self.packed:
+                copiedGlyph._setPackedContours(_processMathOnePackedContours(
+                    self._getPackedContours(), otherGlyph, ptFunc, _arrayFunctions[ptFunc]
+                ))
+            else:
+                copiedGlyph.contours = _processMathOneContours(self._peekContours(), _peekContours(otherGlyph), ptFunc)
+        else:
+            copiedGlyph.contours = []
         # components
-        copiedGlyph.components = []
+        components = []
         if self.components:
-            componentPairs = _pairComponents(self.components, otherGlyph.components)
-            copiedGlyph.components = _processMathOneComponents(componentPairs, ptFunc)
+            componentPairs = pairing.componentPairs(self, otherGlyph)
+            components = _processMathOneComponents(componentPairs, ptFunc)
+        copiedGlyph.components = components
+        if self.geometryOnly:
+            return
         # anchors
-        copiedGlyph.anchors = []
+        anchors = []
         if self.anchors:
-            anchorTree1 = _anchorTree(self.anchors)
-            anchorTree2 = _anchorTree(otherGlyph.anchors)
-            anchorPairs = _pairAnchors(anchorTree1, anchorTree2)
-            copiedGlyph.anchors = _processMathOneAnchors(anchorPairs, ptFunc)
+            anchorPairs = pairing.anchorPairs(self, otherGlyph)
+            anchors = _processMathOneAnchors(anchorPairs, ptFunc)
+        copiedGlyph.anchors = anchors
         # guidelines
-        copiedGlyph.guidelines = []
+        guidelines = []
         if self.guidelines:
-            guidelinePairs = _pairGuidelines(self.guidelines, otherGlyph.guidelines)
-            copiedGlyph.guidelines = _processMathOneGuidelines(guidelinePairs, ptFunc, func)
+            guidelinePairs = pairing.guidelinePairs(self, otherGlyph)
+            guidelines = _processMathOneGuidelines(guidelinePairs, ptFunc, func)
+        copiedGlyph.guidelines = guidelines
         # image
-        copiedGlyph.image = _expandImage(None)
-        imagePair = _pairImages(self.image, otherGlyph.image)
-        if imagePair:
-            copiedGlyph.image = _processMathOneImage(imagePair, ptFunc)
+        image = _expandImage(None)
+        if pairing.imagesPaired:
+            image = _processMathOneImage((self.image, otherGlyph.image), ptFunc)
+        copiedGlyph.image = image
 
     # math with factor
 
     def __mul__(self, factor):
+        if self.lazy:
+            return LazyMathGlyph.fromGlyph(self) * factor
         if not isinstance(factor, tuple):
             factor = (factor, factor)
         copiedGlyph = self.copyWithoutMathSubObjects()
@@ -213,6 +471,8 @@ class MathGlyph(object):
     __rmul__ = __mul__
 
     def __div__(self, factor):
+        if self.lazy:
+            return LazyMathGlyph.fromGlyph(self) / factor
         if not isinstance(factor, tuple):
             factor = (factor, factor)
         copiedGlyph = self.copyWithoutMathSubObjects()
@@ -225,32 +485,135 @@ class MathGlyph(object):
 
     __rtruediv__ = __rdiv__
 
+    # in-place math with factor
+
+    def __imul__(self, factor):
+        if self.lazy:
+            return NotImplemented
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        self._processMathTwo(self, factor, mulPt, mul)
+        return self
+
+    def __idiv__(self, factor):
+        if self.lazy:
+            return NotImplemented
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        self._processMathTwo(self, factor, divPt, div)
+        return self
+
+    __itruediv__ = __idiv__
+
     def _processMathTwo(self, copiedGlyph, factor, ptFunc, func):
+        # copiedGlyph may be self, so each value
+        # is computed before it is replaced.
         # width
         copiedGlyph.width = func(self.width, factor[0])
         # height
         copiedGlyph.height = func(self.height, factor[1])
         # contours
+        if self._hasContours():
+            if self.packed:
+                copiedGlyph._setPackedContours(_processMathTwoPackedContours(
+                    self._getPackedContours(), factor, ptFunc
+                ))
+            else:
+                copiedGlyph.contours = _processMathTwoContours(self._peekContours(), factor, ptFunc)
+        else:
+            copiedGlyph.contours = []
+        # components
+        components = []
+        if self.components:
+            components = _processMathTwoComponents(
+                self.components, factor, ptFunc, scaleComponentTransform=self.scaleComponentTransform
+            )
+        copiedGlyph.components = components
+        if self.geometryOnly:
+            return
+        # anchors
+        anchors = []
+        if self.anchors:
+            anchors = _processMathTwoAnchors(self.anchors, factor, ptFunc)
+        copiedGlyph.anchors = anchors
+        # guidelines
+        guidelines = []
+        if self.guidelines:
+            guidelines = _processMathTwoGuidelines(self.guidelines, factor, func)
+        copiedGlyph.guidelines = guidelines
+        # image
+        if self.image:
+            copiedGlyph.image = _processMathTwoImage(self.image, factor, ptFunc)
+
+    # interpolation
+
+    def interpolate(self, otherGlyph, factor, pairing=None):
+        """
+        return a new MathGlyph interpolated between self
+        and otherGlyph. this gives the values of:
+
+            self + (otherGlyph - self) * factor
+
+        but the components, anchors and guidelines are
+        paired once and only one new glyph is created.
+        the guidelines are listed in pairing order, which
+        can differ from the order the expression gives.
+        factor may be a number or an (x, y) tuple.
+        pairing may be a MathGlyphPairing made from
+        [self, otherGlyph] to reuse for many factors.
+        """
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        if pairing is None:
+            pairing = MathGlyphPairing([self, otherGlyph])
+        elif pairing.glyphCount != 2:
+            raise ValueError("The pairing must be made from two glyphs.")
+        copiedGlyph = self.copyWithoutMathSubObjects()
+        self._processInterpolation(copiedGlyph, otherGlyph, factor, pairing)
+        return copiedGlyph
+
+    def _processInterpolation(self, copiedGlyph, otherGlyph, factor, pairing):
+        def ptFunc(pt1, pt2):
+            return interpolatePt(pt1, pt2, factor)
+        def angleFunc(angle1, angle2):
+            return angle1 + factorAngle((angle2 - angle1) % 360, factor, mul) % 360
+        # width
+        copiedGlyph.width = interpolate(self.width, otherGlyph.width, factor[0])
+        # height
+        copiedGlyph.height = interpolate(self.height, otherGlyph.height, factor[1])
+        # contours
         copiedGlyph.contours = []
-        if self.contours:
-            copiedGlyph.contours = _processMathTwoContours(self.contours, factor, ptFunc)
+        if self._hasContours():
+            if self.packed:
+                copiedGlyph._setPackedContours(_processMathOnePackedContours(
+                    self._getPackedContours(), otherGlyph, ptFunc,
+                    lambda a1, a2: interpolateArray(a1, a2, factor)
+                ))
+            else:
+                copiedGlyph.contours = _processMathOneContours(self._peekContours(), _peekContours(otherGlyph), ptFunc)
         # components
         copiedGlyph.components = []
         if self.components:
-            copiedGlyph.components = _processMathTwoComponents(
-                self.components, factor, ptFunc, scaleComponentTransform=self.scaleComponentTransform
+            componentPairs = pairing.componentPairs(self, otherGlyph)
+            copiedGlyph.components = _interpolateComponents(
+                componentPairs, factor, scaleComponentTransform=self.scaleComponentTransform
             )
+        if self.geometryOnly:
+            return
         # anchors
         copiedGlyph.anchors = []
         if self.anchors:
-            copiedGlyph.anchors = _processMathTwoAnchors(self.anchors, factor, ptFunc)
+            anchorPairs = pairing.anchorPairs(self, otherGlyph)
+            copiedGlyph.anchors = _processMathOneAnchors(anchorPairs, ptFunc)
         # guidelines
         copiedGlyph.guidelines = []
         if self.guidelines:
-            copiedGlyph.guidelines = _processMathTwoGuidelines(self.guidelines, factor, func)
+            guidelinePairs = pairing.guidelinePairs(self, otherGlyph)
+            copiedGlyph.guidelines = _processMathOneGuidelines(guidelinePairs, ptFunc, angleFunc)
         # image
-        if self.image:
-            copiedGlyph.image = _processMathTwoImage(self.image, factor, ptFunc)
+        copiedGlyph.image = _expandImage(None)
+        if pairing.imagesPaired:
+            copiedGlyph.image = _processMathOneImage((self.image, otherGlyph.image), ptFunc)
 
     # -------
     # Additional math
@@ -258,17 +621,24 @@ class MathGlyph(object):
     def round(self, digits=None):
         """round the geometry."""
         copiedGlyph = self.copyWithoutMathSubObjects()
+        # the rounded values are stored at full precision
+        copiedGlyph.singlePrecision = False
         # misc
         copiedGlyph.width = _roundNumber(self.width, digits)
         copiedGlyph.height = _roundNumber(self.height, digits)
         # contours
         copiedGlyph.contours = []
-        if self.contours:
-            copiedGlyph.contours = _roundContours(self.contours, digits)
+        if self._hasContours():
+            if self.packed:
+                copiedGlyph._setPackedContours(self._getPackedContours().round(digits))
+            else:
+                copiedGlyph.contours = _roundContours(self._peekContours(), digits)
         # components
         copiedGlyph.components = []
         if self.components:
             copiedGlyph.components = _roundComponents(self.components, digits)
+        if self.geometryOnly:
+            return copiedGlyph
         # guidelines
         copiedGlyph.guidelines = []
         if self.guidelines:
@@ -283,6 +653,72 @@ class MathGlyph(object):
             copiedGlyph.image = _roundImage(self.image, digits)
         return copiedGlyph
 
+    def transform(self, matrix):
+        """
+        return a new glyph with the geometry transformed by
+        matrix, a (xx, xy, yx, yy, dx, dy) tuple or a
+        fontTools Transform.
+
+        the points, anchors and guidelines are transformed
+        and the component and image transformations are
+        combined with the matrix, as drawing the glyph through
+        a TransformPen would do. the guideline angles follow
+        the transformed direction. the width and height are
+        not changed.
+        """
+        matrix = tuple(matrix)
+        copiedGlyph = self.copyWithoutMathSubObjects()
+        # contours
+        if self._hasContours():
+            if self.packed:
+                copiedGlyph._setPackedContours(self._getPackedContours().transform(matrix))
+            else:
+                copiedGlyph.contours = _transformContours(self._peekContours(), matrix)
+        # components
+        if self.components:
+            copiedGlyph.components = _transformComponents(self.components, matrix)
+        if self.geometryOnly:
+            return copiedGlyph
+        # anchors
+        if self.anchors:
+            copiedGlyph.anchors = _transformAnchors(self.anchors, matrix)
+        # guidelines
+        if self.guidelines:
+            copiedGlyph.guidelines = _transformGuidelines(self.guidelines, matrix)
+        # image
+        if self.image:
+            copiedGlyph.image = _transformImage(self.image, matrix)
+        return copiedGlyph
+
+    def decompose(self, glyphs, cache=None):
+        """
+        return a new glyph with the components replaced by the
+        decomposed outlines of their base glyphs.
+
+        glyphs is a mapping of glyph name to MathGlyph. components
+        whose base glyph is not in glyphs are dropped. cache may be
+        a DecomposedOutlineCache made from glyphs. sharing one cache
+        between all the glyphs of a font means that each base glyph
+        is decomposed only once.
+        """
+        if cache is None:
+            cache = DecomposedOutlineCache(glyphs)
+        copiedGlyph = self.copyWithoutMathSubObjects()
+        outlines = [self._getPackedContours()]
+        for component in self.components:
+            outline = cache.getOutline(component["baseGlyph"], component["transformation"])
+            if outline is not None:
+                outlines.append(outline)
+        packed = PackedContours.join(outlines)
+        if self.packed:
+            copiedGlyph._setPackedContours(packed)
+        else:
+            copiedGlyph.contours = packed.toContours()
+        copiedGlyph.anchors = [dict(anchor) for anchor in self.anchors]
+        copiedGlyph.guidelines = [dict(guideline) for guideline in self.guidelines]
+        copiedGlyph.image = dict(self.image)
+        return copiedGlyph
+
 
     # -------
     # Pen API
@@ -290,19 +726,32 @@ class MathGlyph(object):
 
     def getPointPen(self):
         """get a point pen for drawing to this object"""
-        return MathGlyphPen(self)
+        pen = MathGlyphPen(self)
+        # the pen draws into the contour list in place
+        self._contourFingerprint = None
+        return pen
 
     def drawPoints(self, pointPen, filterRedundantPoints=False):
         """draw self using pointPen"""
-        if filterRedundantPoints:
-            pointPen = FilterRedundantPointPen(pointPen)
-        for contour in self.contours:
+        if self._packedContours is not None:
+            if filterRedundantPoints:
+                self._packedContours.drawPoints(FilterRedundantPointPen(pointPen))
+            else:
+                self._packedContours.drawPoints(pointPen)
+        else:
+            self._drawContourPoints(pointPen, filterRedundantPoints)
+        for component in self.components:
+            pointPen.addComponent(component["baseGlyph"], component["transformation"], identifier=component["identifier"])
+
+    def _drawContourPoints(self, pointPen, filterRedundantPoints=False):
+        for contour in self._contours:
+            points = contour["points"]
+            if filterRedundantPoints:
+                points = _filterRedundantPoints(points)
             pointPen.beginPath(identifier=contour["identifier"])
-            for segmentType, pt, smooth, name, identifier in contour["points"]:
+            for segmentType, pt, smooth, name, identifier in points:
                 pointPen.addPoint(pt=pt, segmentType=segmentType, smooth=smooth, name=name, identifier=identifier)
             pointPen.endPath()
-        for component in self.components:
-            pointPen.addComponent(component["baseGlyph"], component["transformation"], identifier=component["identifier"])
 
     def draw(self, pen, filterRedundantPoints=False):
         """draw self using pen"""
@@ -325,18 +774,16 @@ class MathGlyph(object):
             pointPen = glyph.getPointPen()
         glyph.clearContours()
         glyph.clearComponents()
-        glyph.clearAnchors()
-        glyph.clearGuidelines()
-        glyph.lib.clear()
-        if self.strict:
-            self.drawPoints(pointPen)
-        else:
-            cleanerPen = FilterRedundantPointPen(pointPen)
-            self.drawPoints(cleanerPen)
-        glyph.anchors = [dict(anchor) for anchor in self.anchors]
-        glyph.guidelines = [_compressGuideline(guideline) for guideline in self.guidelines]
-        glyph.image = _compressImage(self.image)
-        glyph.lib = deepcopy(dict(self.lib))
+        if not self.geometryOnly:
+            glyph.clearAnchors()
+            glyph.clearGuidelines()
+            glyph.lib.clear()
+        self.drawPoints(pointPen, filterRedundantPoints=not self.strict)
+        if not self.geometryOnly:
+            glyph.anchors = [dict(anchor) for anchor in self.anchors]
+            glyph.guidelines = [_compressGuideline(guideline) for guideline in self.guidelines]
+            glyph.image = _compressImage(self.image)
+            glyph.lib = deepcopy(dict(self._peekLib()))
         glyph.width = self.width
         glyph.height = self.height
         glyph.note = self.note
@@ -346,6 +793,804 @@ class MathGlyph(object):
         return glyph
 
 
+# ------------------
+# Linear Combination
+# ------------------
+
+def linearCombination(glyphsAndWeights, pairing=None):
+    """
+    Return a new MathGlyph that is the weighted sum of any
+    number of compatible glyphs:
+
+        glyph1 * weight1 + glyph2 * weight2 + ...
+
+    glyphsAndWeights is a list of (glyph, weight) tuples.
+    A weight may be a number or an (x, y) tuple. The result
+    is based on the first glyph. The components, anchors and
+    guidelines of the first glyph are paired with those of
+    every other glyph once, and only the ones that can be
+    paired in all glyphs are kept. pairing may be a
+    MathGlyphPairing made from the glyphs, in the same order,
+    to reuse for many sets of weights.
+    """
+    if not glyphsAndWeights:
+        raise ValueError("At least one glyph is required.")
+    if pairing is not None and pairing.glyphCount != len(glyphsAndWeights):
+        raise ValueError("The pairing must be made from %d glyphs." % len(glyphsAndWeights))
+    glyphs = [glyph for glyph, weight in glyphsAndWeights]
+    factors, scaleFactors = _linearCombinationFactors(glyphs, [weight for glyph, weight in glyphsAndWeights])
+    return _linearCombination(glyphs, factors, scaleFactors, pairing)
+
+def _linearCombinationFactors(glyphs, weights):
+    # scaleFactors are the factors for the scale part
+    # of the component transformations.
+    factors = []
+    scaleFactors = []
+    for glyph, weight in zip(glyphs, weights):
+        if not isinstance(weight, tuple):
+            weight = (weight, weight)
+        factors.append(weight)
+        scaleFactors.append(weight if glyph.scaleComponentTransform else (1, 1))
+    return factors, scaleFactors
+
+def _linearCombination(glyphs, factors, scaleFactors, pairing=None, coordinates=None):
+    # coordinates may be the already combined packed
+    # coordinates of the contours.
+    if pairing is None:
+        pairing = MathGlyphPairing(glyphs)
+    glyph1 = glyphs[0]
+    result = glyph1.copyWithoutMathSubObjects()
+    # width
+    result.width = _linearCombinationNumbers([glyph.width for glyph in glyphs], [f[0] for f in factors])
+    # height
+    result.height = _linearCombinationNumbers([glyph.height for glyph in glyphs], [f[1] for f in factors])
+    # contours
+    if glyph1._hasContours():
+        if coordinates is not None:
+            packed = glyph1._getPackedContours().copyWithCoordinates(coordinates)
+            if glyph1.packed:
+                result._setPackedContours(packed)
+            else:
+                result.contours = packed.toContours()
+        elif glyph1.packed:
+            result._setPackedContours(_linearCombinationPackedContours(glyphs, factors))
+        else:
+            result.contours = _linearCombinationContours([_peekContours(glyph) for glyph in glyphs], factors)
+    # components
+    if glyph1.components:
+        componentLists = [glyph.components for glyph in glyphs]
+        result.components = _linearCombinationComponents(componentLists, pairing.componentIndexes, factors, scaleFactors)
+    if glyph1.geometryOnly:
+        return result
+    # anchors
+    if glyph1.anchors:
+        anchorLists = [glyph.anchors for glyph in glyphs]
+        result.anchors = _linearCombinationAnchors(anchorLists, pairing.anchorIndexes, factors)
+    # guidelines
+    if glyph1.guidelines:
+        guidelineLists = [glyph.guidelines for glyph in glyphs]
+        result.guidelines = _linearCombinationGuidelines(guidelineLists, pairing.guidelineIndexes, factors)
+    # image
+    if pairing.imagesPaired:
+        result.image = _linearCombinationImages([glyph.image for glyph in glyphs], factors)
+    return result
+
+
+# ------------------------
+# Batch Linear Combination
+# ------------------------
+
+def batchLinearCombination(glyphs, locations, pairing=None):
+    """
+    Return a MathGlyphBatch with the linear combination of
+    the same glyphs at many locations. This is much faster
+    than calling linearCombination for every location.
+
+    glyphs is a list of glyphs with compatible contours and
+    locations is a list with one list of weights, one weight
+    for each glyph, per location. A weight may be a number or
+    an (x, y) tuple. The glyphs are paired once for all
+    locations, pairing may be a MathGlyphPairing made from
+    the glyphs to reuse.
+
+    The result is the weighted sum of the glyphs, which is
+    not the same as interpolating between them: guideline
+    angles are wrapped to 0-360 after every operation and
+    the component scales of glyphs that do not scale their
+    component transformations are summed. To interpolate,
+    use batchInterpolate or MathGlyphDeltaCache.batch.
+    """
+    if not glyphs:
+        raise ValueError("At least one glyph is required.")
+    if pairing is None:
+        pairing = MathGlyphPairing(glyphs)
+    elif pairing.glyphCount != len(glyphs):
+        raise ValueError("The pairing must be made from %d glyphs." % len(glyphs))
+    packedList = [glyph._getPackedContours() for glyph in glyphs]
+    packed1 = packedList[0]
+    for packed in packedList[1:]:
+        if not packed1.isCompatible(packed):
+            raise ValueError("The glyphs do not have compatible contours.")
+    arrays = [packed.coordinates for packed in packedList]
+    factorsList = []
+    scaleFactorsList = []
+    coordinates = array("d")
+    for weights in locations:
+        if len(weights) != len(glyphs):
+            raise ValueError("Each location must have %d weights." % len(glyphs))
+        factors, scaleFactors = _linearCombinationFactors(glyphs, weights)
+        factorsList.append(factors)
+        scaleFactorsList.append(scaleFactors)
+        if arrays[0]:
+            coordinates.extend(linearCombinationArray(arrays, factors))
+    return MathGlyphBatch(glyphs, factorsList, scaleFactorsList, pairing, len(packed1), coordinates)
+
+def batchInterpolate(glyph1, glyph2, factors):
+    """
+    Return a MathGlyphBatch with glyph1 interpolated to
+    glyph2 at each factor in factors, with the values of:
+
+        glyph1.interpolate(glyph2, factor)
+
+    A factor may be a number or an (x, y) tuple. The
+    delta glyph2 - glyph1 is made once and every location
+    is glyph1 + delta * factor. The guidelines can be
+    listed in a different order than interpolate gives.
+    """
+    cache = MathGlyphDeltaCache(glyph1, [glyph2])
+    return cache.batch([[factor] for factor in factors])
+
+
+class MathGlyphBatch(object):
+
+    """
+    The result of batchLinearCombination.
+
+    The point coordinates of all locations are computed up
+    front and stored in one flat array of doubles, the
+    coordinates attribute. This is a (locations, points, 2)
+    matrix in row major order, its dimensions are given by
+    the shape attribute. A MathGlyph for a location is only
+    made when it is requested by index, and is then kept.
+    """
+
+    def __init__(self, glyphs, factorsList, scaleFactorsList, pairing, pointCount, coordinates):
+        self._glyphs = glyphs
+        self._factorsList = factorsList
+        self._scaleFactorsList = scaleFactorsList
+        self._pairing = pairing
+        self._instances = {}
+        self.coordinates = coordinates
+        self.shape = (len(factorsList), pointCount, 2)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def getCoordinates(self, index):
+        """
+        Return the flat x, y coordinates of the points of
+        the location at index. This is a view on the
+        coordinates array and is not copied.
+        """
+        index = range(len(self))[index]
+        size = self.shape[1] * 2
+        return memoryview(self.coordinates)[index * size:(index + 1) * size]
+
+    def __getitem__(self, index):
+        index = range(len(self))[index]
+        glyph = self._instances.get(index)
+        if glyph is None:
+            coordinates = None
+            if self.shape[1]:
+                size = self.shape[1] * 2
+                coordinates = self.coordinates[index * size:(index + 1) * size]
+            glyph = _linearCombination(
+                self._glyphs, self._factorsList[index], self._scaleFactorsList[index],
+                self._pairing, coordinates
+            )
+            self._instances[index] = glyph
+        return glyph
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+# -------------
+# Master Deltas
+# -------------
+
+class MathGlyphDeltaCache(object):
+
+    """
+    A cache of the deltas between a base glyph and any number
+    of master glyphs, for making many instances from them:
+
+        base + (master1 - base) * weight1 + (master2 - base) * weight2 + ...
+
+    The delta glyphs and the pairing of the base with them are
+    made the first time they are needed and then kept, so every
+    instance costs one linear combination. The cache does not
+    notice changes made to the glyphs. When a master changes,
+    give the new glyph to setMaster or call invalidate with its
+    index. When the base changes, give it to setBase.
+    """
+
+    def __init__(self, base, masters):
+        self._base = base
+        self._masters = list(masters)
+        self._deltas = [None] * len(self._masters)
+        self._pairing = None
+
+    def __len__(self):
+        return len(self._masters)
+
+    def _get_base(self):
+        return self._base
+
+    base = property(_get_base, doc="The base glyph.")
+
+    def _get_masters(self):
+        return tuple(self._masters)
+
+    masters = property(_get_masters, doc="The master glyphs.")
+
+    def setBase(self, base):
+        """
+        Replace the base glyph. All deltas are made again.
+        """
+        self._base = base
+        self.invalidate()
+
+    def setMaster(self, index, master):
+        """
+        Replace the master glyph at index.
+        Its delta is made again.
+        """
+        self._masters[index] = master
+        self.invalidate(index)
+
+    def invalidate(self, index=None):
+        """
+        Drop the delta of the master at index, or all
+        deltas when index is None, so that they are
+        made again from the current glyphs.
+        """
+        if index is None:
+            self._deltas = [None] * len(self._masters)
+        else:
+            self._deltas[index] = None
+        self._pairing = None
+
+    def _get_deltas(self):
+        base = self._base
+        deltas = self._deltas
+        for index, delta in enumerate(deltas):
+            if delta is None:
+                master = self._masters[index]
+                delta = master.copyWithoutMathSubObjects()
+                master._processMathOne(delta, base, subPt, sub)
+                deltas[index] = delta
+        return list(deltas)
+
+    deltas = property(_get_deltas, doc="""
+        The delta glyphs, master - base, in the order of the masters.
+        """)
+
+    def _get_pairing(self):
+        if self._pairing is None:
+            self._pairing = MathGlyphPairing([self._base] + self.deltas)
+        return self._pairing
+
+    pairing = property(_get_pairing, doc="""
+        The MathGlyphPairing of the base with the delta glyphs.
+        """)
+
+    def _location(self, weights):
+        if len(weights) != len(self._masters):
+            raise ValueError("Each location must have %d weights." % len(self._masters))
+        # the base always has a weight of 1
+        return [1] + list(weights)
+
+    def instance(self, weights):
+        """
+        Return base + delta1 * weight1 + delta2 * weight2 + ...
+        weights has one weight for each master. A weight may
+        be a number or an (x, y) tuple.
+        """
+        glyphs = [self._base] + self.deltas
+        factors, scaleFactors = _linearCombinationFactors(glyphs, self._location(weights))
+        return _linearCombination(glyphs, factors, scaleFactors, self.pairing)
+
+    def batch(self, locations):
+        """
+        Return a MathGlyphBatch with the instances at many
+        locations, each a list of weights as for instance.
+        """
+        glyphs = [self._base] + self.deltas
+        locations = [self._location(weights) for weights in locations]
+        return batchLinearCombination(glyphs, locations, self.pairing)
+
+
+# -------------
+# Decomposition
+# -------------
+
+_identityTransformation = (1, 0, 0, 1, 0, 0)
+
+class DecomposedOutlineCache(object):
+
+    """
+    The decomposed outlines of the glyphs in a mapping of glyph
+    name to MathGlyph, for MathGlyph.decompose.
+
+    The outline of a glyph, with its components decomposed all
+    the way down, is made once and kept by glyph name. The outline
+    transformed by a component transformation is kept by glyph name
+    and transformation. So a base glyph is decomposed only once, no
+    matter how many composites use it, directly or through other
+    composites. The outlines are PackedContours without identifiers,
+    since those would not be unique in the composites.
+
+    The cache does not notice changes made to the glyphs.
+    Call clear after changing them.
+    """
+
+    def __init__(self, glyphs):
+        self.glyphs = glyphs
+        self._outlines = {}
+        self._transformedOutlines = {}
+
+    def clear(self):
+        self._outlines.clear()
+        self._transformedOutlines.clear()
+
+    def getOutline(self, glyphName, transformation=_identityTransformation):
+        """
+        Return the decomposed outline of glyphName transformed
+        by transformation, or None if the glyph is not in glyphs.
+        """
+        return self._getTransformedOutline(glyphName, tuple(transformation), ())
+
+    def _getTransformedOutline(self, glyphName, transformation, parents):
+        # parents are the names of the composites being
+        # decomposed, to catch components that refer back
+        # to one of them.
+        if transformation == _identityTransformation:
+            return self._getOutline(glyphName, parents)
+        key = (glyphName, transformation)
+        if key not in self._transformedOutlines:
+            outline = self._getOutline(glyphName, parents)
+            if outline is not None:
+                outline = outline.transform(transformation)
+            self._transformedOutlines[key] = outline
+        return self._transformedOutlines[key]
+
+    def _getOutline(self, glyphName, parents):
+        if glyphName in self._outlines:
+            return self._outlines[glyphName]
+        if glyphName in parents:
+            raise ValueError("The glyph %s is a component of itself." % glyphName)
+        glyph = self.glyphs.get(glyphName)
+        if glyph is None:
+            return None
+        outlines = [glyph._getPackedContours().withoutIdentifiers()]
+        parents += (glyphName,)
+        for component in glyph.components:
+            outline = self._getTransformedOutline(component["baseGlyph"], tuple(component["transformation"]), parents)
+            if outline is not None:
+                outlines.append(outline)
+        if len(outlines) == 1:
+            outline = outlines[0]
+        else:
+            outline = PackedContours.join(outlines)
+        self._outlines[glyphName] = outline
+        return outline
+
+
+# -------------
+# Compatibility
+# -------------
+
+def checkCompatibility(masters):
+    """
+    Check the glyphs of any number of masters for compatibility
+    using their topology fingerprints.
+
+    masters is a list of dicts of glyph name to MathGlyph, one
+    for each master. This returns a (groups, incompatible) tuple:
+    -   groups is an ordered dict of fingerprint to the list of
+        names of the glyphs that have that fingerprint in every
+        master. The glyphs in a group all have the same structure
+        and can be processed together.
+    -   incompatible is the list of names of the glyphs whose
+        fingerprints differ between the masters or that are
+        missing from a master.
+    """
+    glyphNames = []
+    seen = set()
+    for master in masters:
+        for glyphName in master:
+            if glyphName not in seen:
+                seen.add(glyphName)
+                glyphNames.append(glyphName)
+    groups = OrderedDict()
+    incompatible = []
+    for glyphName in glyphNames:
+        fingerprint = None
+        for master in masters:
+            glyph = master.get(glyphName)
+            if glyph is None:
+                fingerprint = None
+                break
+            other = glyph.topologyFingerprint
+            if fingerprint is None:
+                fingerprint = other
+            elif other != fingerprint:
+                fingerprint = None
+                break
+        if fingerprint is None:
+            incompatible.append(glyphName)
+        else:
+            groups.setdefault(fingerprint, []).append(glyphName)
+    return groups, incompatible
+
+
+# ---------------
+# Lazy Expression
+# ---------------
+
+class LazyMathGlyph(object):
+
+    """
+    A MathGlyph math expression that is evaluated when its
+    data is first used.
+
+    The math operators of a MathGlyph made with lazy=True
+    return one of these. Adding, subtracting, multiplying and
+    dividing expressions only updates a list of weighted terms,
+    so an expression like:
+
+        m0 + (m1 - m0) * a + (m2 - m0) * b
+
+    is collapsed to m0 * (1 - a - b) + m1 * a + m2 * b and
+    evaluated with a single linearCombination, without making
+    any intermediate glyphs. Getting any attribute, such as
+    contours or extractGlyph, evaluates the expression and
+    returns the attribute of the resulting MathGlyph.
+
+    Guideline angles are wrapped to 0-360 after every
+    operation, so a weighted sum of angles is not the same
+    as the expression. The guidelines are evaluated through
+    the operations of the expression, as the eager operators
+    do, instead of through the collapsed terms.
+
+    Notes:
+    -   the glyphs in the expression are not copied, so changes
+        made to them before the evaluation are in the result.
+    -   the results can differ from the eager operators by
+        floating point rounding.
+    """
+
+    def __init__(self, terms, guidelineExpression):
+        # terms is a list of (glyph, factor, sign) where sign
+        # is the factor without multiplication and division.
+        # it is used for the component scales of glyphs that
+        # do not scale their component transformations.
+        # guidelineExpression is a glyph or a (funct, expression,
+        # operand) tuple, see _evaluateLazyGuidelines.
+        object.__setattr__(self, "_terms", terms)
+        object.__setattr__(self, "_guidelineExpression", guidelineExpression)
+        object.__setattr__(self, "_result", None)
+
+    @classmethod
+    def fromGlyph(cls, glyph):
+        return cls([(glyph, (1, 1), 1)], glyph)
+
+    def evaluate(self):
+        """return the MathGlyph for this expression"""
+        if self._result is None:
+            glyphs = []
+            factors = []
+            signs = []
+            indexes = {}
+            for glyph, factor, sign in self._terms:
+                index = indexes.get(id(glyph))
+                if index is None:
+                    indexes[id(glyph)] = len(glyphs)
+                    glyphs.append(glyph)
+                    factors.append(factor)
+                    signs.append(sign)
+                else:
+                    factors[index] = addPt(factors[index], factor)
+                    signs[index] += sign
+            scaleFactors = [
+                factor if glyph.scaleComponentTransform else (sign, sign)
+                for glyph, factor, sign in zip(glyphs, factors, signs)
+            ]
+            result = _linearCombination(glyphs, factors, scaleFactors)
+            if not result.geometryOnly:
+                result.guidelines = _evaluateLazyGuidelines(self._guidelineExpression)
+            object.__setattr__(self, "_result", result)
+        return self._result
+
+    # attribute access
+
+    def __getattr__(self, attr):
+        if attr in ("_terms", "_guidelineExpression", "_result") or attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.evaluate(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.evaluate(), attr, value)
+
+    def __eq__(self, other):
+        return self.evaluate() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    # math
+
+    def __add__(self, other):
+        return LazyMathGlyph(
+            self._terms + _lazyTerms(other),
+            (add, self._guidelineExpression, _lazyGuidelineExpression(other))
+        )
+
+    def __sub__(self, other):
+        return LazyMathGlyph(
+            self._terms + _scaleLazyTerms(_lazyTerms(other), (-1, -1), mulPt, -1),
+            (sub, self._guidelineExpression, _lazyGuidelineExpression(other))
+        )
+
+    def __mul__(self, factor):
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        return LazyMathGlyph(
+            _scaleLazyTerms(self._terms, factor, mulPt),
+            (mul, self._guidelineExpression, factor)
+        )
+
+    __rmul__ = __mul__
+
+    def __div__(self, factor):
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        return LazyMathGlyph(
+            _scaleLazyTerms(self._terms, factor, divPt),
+            (div, self._guidelineExpression, factor)
+        )
+
+    __truediv__ = __div__
+
+    __rdiv__ = __div__
+
+    __rtruediv__ = __rdiv__
+
+
+def _lazyTerms(glyph):
+    if isinstance(glyph, LazyMathGlyph):
+        return glyph._terms
+    return [(glyph, (1, 1), 1)]
+
+def _scaleLazyTerms(terms, factor, func, sign=1):
+    return [(glyph, func(termFactor, factor), termSign * sign) for glyph, termFactor, termSign in terms]
+
+def _lazyGuidelineExpression(glyph):
+    if isinstance(glyph, LazyMathGlyph):
+        return glyph._guidelineExpression
+    return glyph
+
+_lazyGuidelinePtFunctions = {add: addPt, sub: subPt}
+
+def _evaluateLazyGuidelines(expression):
+    # an expression is a glyph, a (add or sub, expression,
+    # expression) tuple or a (mul or div, expression, factor)
+    # tuple. the guidelines are paired and combined as the
+    # eager operators do it.
+    if not isinstance(expression, tuple):
+        return expression.guidelines
+    funct, expression1, operand = expression
+    guidelines = _evaluateLazyGuidelines(expression1)
+    if not guidelines:
+        return []
+    if funct in _lazyGuidelinePtFunctions:
+        guidelinePairs = _pairGuidelines(guidelines, _evaluateLazyGuidelines(operand))
+        return _processMathOneGuidelines(guidelinePairs, _lazyGuidelinePtFunctions[funct], funct)
+    return _processMathTwoGuidelines(guidelines, operand, funct)
+
+
+# -------
+# Pairing
+# -------
+
+class MathGlyphPairing(object):
+
+    """
+    The pairing of the components, anchors, guidelines and
+    image of two or more MathGlyph objects.
+
+    Pairing is done on every math operation between glyphs,
+    but it only depends on the glyphs' structure, so it can
+    be made once for a set of masters and reused for every
+    instance made from them with MathGlyph.interpolate or
+    linearCombination. The glyphs given to those must have
+    the same components, anchors and guidelines, in the same
+    order, as the glyphs the pairing was made from.
+
+    componentIndexes, anchorIndexes and guidelineIndexes are
+    lists of index tuples, one for each item of the first glyph
+    that could be paired with an item in every other glyph.
+    """
+
+    def __init__(self, glyphs):
+        glyphs = list(glyphs)
+        self.glyphCount = len(glyphs)
+        self.componentIndexes = _pairIndexesAcrossGlyphs(
+            [glyph.components for glyph in glyphs], _pairComponentIndexes
+        )
+        if glyphs[0].geometryOnly:
+            self.anchorIndexes = []
+            self.guidelineIndexes = []
+            self.imagesPaired = False
+            return
+        self.anchorIndexes = _pairIndexesAcrossGlyphs(
+            [glyph.anchors for glyph in glyphs], _pairAnchorIndexes
+        )
+        self.guidelineIndexes = _pairIndexesAcrossGlyphs(
+            [glyph.guidelines for glyph in glyphs], _pairGuidelineIndexes
+        )
+        image1 = glyphs[0].image
+        self.imagesPaired = all(_pairImages(image1, glyph.image) for glyph in glyphs[1:])
+
+    # pairs for math between two glyphs
+
+    def componentPairs(self, glyph1, glyph2):
+        components1 = glyph1.components
+        components2 = glyph2.components
+        return [(components1[index1], components2[index2]) for index1, index2 in self.componentIndexes]
+
+    def anchorPairs(self, glyph1, glyph2):
+        anchors1 = glyph1.anchors
+        anchors2 = glyph2.anchors
+        return [(_pairedAnchor(anchors1[index1]), anchors2[index2]) for index1, index2 in self.anchorIndexes]
+
+    def guidelinePairs(self, glyph1, glyph2):
+        guidelines1 = glyph1.guidelines
+        guidelines2 = glyph2.guidelines
+        return [(guidelines1[index1], guidelines2[index2]) for index1, index2 in self.guidelineIndexes]
+
+def _pairIndexesAcrossGlyphs(itemLists, pairFunc):
+    """
+    Pair the items of the first list with the items of every
+    other list using pairFunc. Return an index tuple for each
+    item of the first list that was paired in all lists.
+
+    >>> pairFunc = lambda items1, items2: [
+    ...     (items1.index(item), items2.index(item))
+    ...     for item in items1 if item in items2]
+    >>> _pairIndexesAcrossGlyphs([["a", "b", "c"], ["c", "a"], ["a", "x", "c"]], pairFunc)
+    [(0, 1, 0), (2, 0, 2)]
+    """
+    items1 = itemLists[0]
+    if not items1:
+        return []
+    if len(itemLists) == 1:
+        return [(index,) for index in range(len(items1))]
+    mappings = [dict(pairFunc(items1, items)) for items in itemLists[2:]]
+    result = []
+    for index1, index2 in pairFunc(items1, itemLists[1]):
+        indexes = [index1, index2]
+        for mapping in mappings:
+            if index1 not in mapping:
+                break
+            indexes.append(mapping[index1])
+        else:
+            result.append(tuple(indexes))
+    return result
+
+def _linearCombinationNumbers(values, factors):
+    total = mul(values[0], factors[0])
+    for value, factor in zip(values[1:], factors[1:]):
+        total = add(total, mul(value, factor))
+    return total
+
+def _linearCombinationPts(pts, factors):
+    total = mulPt(pts[0], factors[0])
+    for pt, factor in zip(pts[1:], factors[1:]):
+        total = addPt(total, mulPt(pt, factor))
+    return total
+
+def _linearCombinationPackedContours(glyphs, factors):
+    packedList = [glyph._getPackedContours() for glyph in glyphs]
+    packed1 = packedList[0]
+    for packed in packedList[1:]:
+        if not packed1.isCompatible(packed):
+            # let the unpacked path deal with (or fail on)
+            # the incompatibility exactly as it always has
+            contours = _linearCombinationContours([packed.toContours() for packed in packedList], factors)
+            return PackedContours.fromContours(contours)
+    coordinates = linearCombinationArray([packed.coordinates for packed in packedList], factors)
+    return packed1.copyWithCoordinates(coordinates)
+
+def _linearCombinationContours(contourLists, factors):
+    result = []
+    for contourIndex, contour1 in enumerate(contourLists[0]):
+        points1 = contour1["points"]
+        (fx, fy) = factors[0]
+        xs = [point[1][0] * fx for point in points1]
+        ys = [point[1][1] * fy for point in points1]
+        for contours, (fx, fy) in zip(contourLists[1:], factors[1:]):
+            points = contours[contourIndex]["points"]
+            if len(points) < len(points1):
+                raise IndexError("list index out of range")
+            xs = [x + point[1][0] * fx for x, point in zip(xs, points)]
+            ys = [y + point[1][1] * fy for y, point in zip(ys, points)]
+        resultPoints = [
+            (segmentType, pt, smooth, name, identifier)
+            for (segmentType, _, smooth, name, identifier), pt in zip(points1, zip(xs, ys))
+        ]
+        result.append(dict(identifier=contour1["identifier"], points=resultPoints))
+    return result
+
+def _linearCombinationComponents(componentLists, indexes, factors, scaleFactors):
+    result = []
+    for componentIndexes in indexes:
+        components = [componentList[index] for componentList, index in zip(componentLists, componentIndexes)]
+        transformations = [component["transformation"] for component in components]
+        component = dict(components[0])
+        component["transformation"] = _linearCombinationTransformations(transformations, factors, scaleFactors)
+        result.append(component)
+    return result
+
+def _linearCombinationAnchors(anchorLists, indexes, factors):
+    result = []
+    for anchorIndexes in indexes:
+        anchors = [anchorList[index] for anchorList, index in zip(anchorLists, anchorIndexes)]
+        anchor = _pairedAnchor(anchors[0])
+        pts = [(anchor["x"], anchor["y"]) for anchor in anchors]
+        anchor["x"], anchor["y"] = _linearCombinationPts(pts, factors)
+        result.append(anchor)
+    return result
+
+def _linearCombinationGuidelines(guidelineLists, indexes, factors):
+    result = []
+    for guidelineIndexes in indexes:
+        guidelines = [guidelineList[index] for guidelineList, index in zip(guidelineLists, guidelineIndexes)]
+        guideline = dict(guidelines[0])
+        pts = [(guideline["x"], guideline["y"]) for guideline in guidelines]
+        guideline["x"], guideline["y"] = _linearCombinationPts(pts, factors)
+        angle = factorAngle(guidelines[0]["angle"], factors[0], mul) % 360
+        for other, factor in zip(guidelines[1:], factors[1:]):
+            angle = (angle + factorAngle(other["angle"], factor, mul) % 360) % 360
+        guideline["angle"] = angle
+        result.append(guideline)
+    return result
+
+def _linearCombinationImages(images, factors):
+    image1 = images[0]
+    transformations = [image["transformation"] for image in images]
+    transformation = _linearCombinationTransformations(transformations, factors)
+    return dict(fileName=image1["fileName"], transformation=transformation, color=image1["color"])
+
+def _linearCombinationTransformations(transformations, factors, scaleFactors=None):
+    if scaleFactors is None:
+        scaleFactors = factors
+    total = None
+    for transformation, factor, scaleFactor in zip(transformations, factors, scaleFactors):
+        xScale, xyScale, yxScale, yScale, xOffset, yOffset = transformation
+        xScale, yScale = mulPt((xScale, yScale), scaleFactor)
+        xyScale, yxScale = mulPt((xyScale, yxScale), scaleFactor)
+        xOffset, yOffset = mulPt((xOffset, yOffset), factor)
+        scaled = (xScale, xyScale, yxScale, yScale, xOffset, yOffset)
+        if total is None:
+            total = scaled
+        else:
+            total = _processMathOneTransformation(total, scaled, addPt)
+    return total
+
+
 # ----------
 # Point Pens
 # ----------
@@ -375,42 +1620,44 @@ class MathGlyphPen(AbstractPointPen):
           of the previous on curve and the new curve on curve.
         - the contour starts with an on curve
         """
-        self.contours.append(
-            dict(identifier=self._contourIdentifier, points=[])
-        )
-        contourPoints = self.contours[-1]["points"]
         points = self._points
-        # move offcurves at the beginning of the contour to the end
-        if not self.strict:
-            haveOnCurve = False
-            for point in points:
+        if self.strict:
+            contourPoints = list(points)
+        else:
+            # move offcurves at the beginning of the contour to the end
+            for index, point in enumerate(points):
                 if point[0] is not None:
-                    haveOnCurve = True
+                    if index:
+                        points = points[index:] + points[:index]
                     break
-            if haveOnCurve:
-                while 1:
-                    if points[0][0] is None:
-                        point = points.pop(0)
-                        points.append(point)
+            # convert lines to curves. the off curve on top of
+            # an on curve is shared by the lines on either side.
+            contourPoints = []
+            append = contourPoints.append
+            holdingOffCurves = ()
+            prevPt = points[-1][1] if points else None
+            prevOffCurve = None
+            for index, point in enumerate(points):
+                segmentType, pt, smooth, name, identifier = point
+                if segmentType == "line":
+                    if prevOffCurve is None:
+                        prevOffCurve = (None, prevPt, False, None, None)
+                    offCurve = (None, pt, False, None, None)
+                    if index == 0:
+                        holdingOffCurves = (prevOffCurve, offCurve)
                     else:
-                        break
-        # convert lines to curves
-        holdingOffCurves = []
-        for index, point in enumerate(points):
-            segmentType = point[0]
-            if segmentType == "line" and not self.strict:
-                pt, smooth, name, identifier = point[1:]
-                prevPt = points[index - 1][1]
-                if index == 0:
-                    holdingOffCurves.append((None, prevPt, False, None, None))
-                    holdingOffCurves.append((None, pt, False, None, None))
+                        append(prevOffCurve)
+                        append(offCurve)
+                    append(("curve", pt, smooth, name, identifier))
+                    prevOffCurve = offCurve
                 else:
-                    contourPoints.append((None, prevPt, False, None, None))
-                    contourPoints.append((None, pt, False, None, None))
-                contourPoints.append(("curve", pt, smooth, name, identifier))
-            else:
-                contourPoints.append(point)
-        contourPoints.extend(holdingOffCurves)
+                    append(point)
+                    prevOffCurve = None
+                prevPt = pt
+            contourPoints.extend(holdingOffCurves)
+        self.contours.append(
+            dict(identifier=self._contourIdentifier, points=contourPoints)
+        )
 
     def beginPath(self, identifier=None):
         self._contourIdentifier = identifier
@@ -433,49 +1680,16 @@ class FilterRedundantPointPen(AbstractPointPen):
         self._points = []
 
     def _flushContour(self):
-        # keep the point order and
-        # change the removed flag if the point should be removed
-        points = self._points
-        for index, data in enumerate(points):
-            if data["segmentType"] == "curve":
-                prevOnCurve = points[index - 3]
-                prevOffCurve1 = points[index - 2]
-                prevOffCurve2 = points[index - 1]
-                # check if the curve is a super bezier
-                if prevOnCurve["segmentType"] is not None:
-                    if prevOnCurve["pt"] == prevOffCurve1["pt"] and prevOffCurve2["pt"] == data["pt"]:
-                        # the off curves are on top of the on curve point
-                        # change the segmentType
-                        data["segmentType"] = "line"
-                        # flag the off curves to be removed
-                        prevOffCurve1["removed"] = True
-                        prevOffCurve2["removed"] = True
-
-        for data in points:
-            if not data["removed"]:
-                self._pen.addPoint(
-                    data["pt"],
-                    data["segmentType"],
-                    smooth=data["smooth"],
-                    name=data["name"],
-                    identifier=data["identifier"]
-                )
+        pen = self._pen
+        for segmentType, pt, smooth, name, identifier in _filterRedundantPoints(self._points):
+            pen.addPoint(pt, segmentType, smooth=smooth, name=name, identifier=identifier)
 
     def beginPath(self, identifier=None, **kwargs):
         self._points = []
         self._pen.beginPath(identifier=identifier)
 
     def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
-        self._points.append(
-            dict(
-                pt=pt,
-                segmentType=segmentType,
-                smooth=smooth,
-                name=name,
-                identifier=identifier,
-                removed=False
-            )
-        )
+        self._points.append((segmentType, pt, smooth, name, identifier))
 
     def endPath(self):
         self._flushContour()
@@ -484,6 +1698,33 @@ class FilterRedundantPointPen(AbstractPointPen):
     def addComponent(self, baseGlyph, transformation, identifier=None, **kwargs):
         self._pen.addComponent(baseGlyph, transformation, identifier)
 
+def _filterRedundantPoints(points):
+    """
+    Find the curves in a list of MathGlyph contour points
+    whose off curves are on top of their on curves, the
+    "super beziers" that MathGlyphPen makes from lines,
+    and return the points with those curves changed back
+    to lines and their off curves removed. If there are
+    none, the given list is returned.
+    """
+    count = len(points)
+    lines = []
+    removed = set()
+    for index, (segmentType, pt, smooth, name, identifier) in enumerate(points):
+        if segmentType == "curve":
+            prevOnCurve = points[index - 3]
+            if prevOnCurve[0] is not None and prevOnCurve[1] == points[index - 2][1] and points[index - 1][1] == pt:
+                lines.append(index)
+                removed.add((index - 2) % count)
+                removed.add((index - 1) % count)
+    if not lines:
+        return points
+    filtered = list(points)
+    for index in lines:
+        segmentType, pt, smooth, name, identifier = points[index]
+        filtered[index] = ("line", pt, smooth, name, identifier)
+    return [point for index, point in enumerate(filtered) if index not in removed]
+
 
 # -------
 # Support
@@ -491,6 +1732,16 @@ class FilterRedundantPointPen(AbstractPointPen):
 
 # contours
 
+def _typecode(coordinates):
+    # coordinates may be an array or a memoryview
+    try:
+        return coordinates.typecode
+    except AttributeError:
+        return coordinates.format
+
+def _copyContours(contours):
+    return [dict(contour, points=list(contour["points"])) for contour in contours]
+
 def _processMathOneContours(contours1, contours2, func):
     result = []
     for index, contour1 in enumerate(contours1):
@@ -519,6 +1770,31 @@ def _processMathTwoContours(contours, factor, func):
         result.append(dict(identifier=contourIdentifier, points=resultPoints))
     return result
 
+# packed contours
+
+_arrayFunctions = {
+    addPt: addArray,
+    subPt: subArray,
+    mulPt: mulArray,
+    divPt: divArray,
+}
+
+def _processMathOnePackedContours(packed1, otherGlyph, func, arrayFunc):
+    packed2 = getattr(otherGlyph, "_packedContours", None)
+    if packed2 is None:
+        packed2 = PackedContours.fromContours(_peekContours(otherGlyph))
+    if not packed1.isCompatible(packed2):
+        # let the unpacked path deal with (or fail on)
+        # the incompatibility exactly as it always has
+        contours = _processMathOneContours(packed1.toContours(), packed2.toContours(), func)
+        return PackedContours.fromContours(contours)
+    coordinates = arrayFunc(packed1.coordinates, packed2.coordinates)
+    return packed1.copyWithCoordinates(coordinates)
+
+def _processMathTwoPackedContours(packed, factor, func):
+    coordinates = _arrayFunctions[func](packed.coordinates, factor)
+    return packed.copyWithCoordinates(coordinates)
+
 # anchors
 
 def _anchorTree(anchors):
@@ -629,6 +1905,68 @@ def _pairAnchors(anchorDict1, anchorDict2):
                 break
     return pairs
 
+def _pairAnchorIndexes(anchors1, anchors2):
+    """
+    Pair two lists of anchors with the rules of _pairAnchors
+    and return a list of (index in anchors1, index in anchors2)
+    tuples.
+
+    >>> anchors1 = [
+    ...     dict(name="test", x=1, y=2),
+    ...     dict(name="test", identifier="identifier 1", x=3, y=4),
+    ...     dict(name="other", x=5, y=6),
+    ... ]
+    >>> anchors2 = [
+    ...     dict(name="test", identifier="identifier 1", x=1, y=2),
+    ...     dict(name="test", x=3, y=4),
+    ... ]
+    >>> _pairAnchorIndexes(anchors1, anchors2)
+    [(0, 1), (1, 0)]
+    """
+    tree1 = _anchorIndexTree(anchors1)
+    tree2 = _anchorIndexTree(anchors2)
+    pairs = []
+    for name, indexes1 in tree1.items():
+        if name not in tree2:
+            continue
+        indexes2 = tree2[name]
+        # align with matching identifiers
+        unmatched = []
+        for identifier, index1 in indexes1:
+            match = None
+            for item in indexes2:
+                if item[0] == identifier:
+                    match = item
+                    break
+            if match is None:
+                unmatched.append(index1)
+            else:
+                indexes2.remove(match)
+                pairs.append((index1, match[1]))
+        # align by index
+        for index1, (identifier, index2) in zip(unmatched, indexes2):
+            pairs.append((index1, index2))
+    return pairs
+
+def _pairedAnchor(anchor):
+    # the anchor as it is returned by _pairAnchors
+    return dict(
+        name=anchor.get("name"),
+        identifier=anchor.get("identifier"),
+        x=anchor["x"],
+        y=anchor["y"],
+        color=anchor.get("color")
+    )
+
+def _anchorIndexTree(anchors):
+    tree = OrderedDict()
+    for index, anchor in enumerate(anchors):
+        name = anchor.get("name")
+        if name not in tree:
+            tree[name] = []
+        tree[name].append((anchor.get("identifier"), index))
+    return tree
+
 def _processMathOneAnchors(anchorPairs, func):
     result = []
     for anchor1, anchor2 in anchorPairs:
@@ -651,33 +1989,44 @@ def _processMathTwoAnchors(anchors, factor, func):
 # components
 
 def _pairComponents(components1, components2):
-    components1 = list(components1)
-    components2 = list(components2)
+    return [
+        (components1[index1], components2[index2])
+        for index1, index2 in _pairComponentIndexes(components1, components2)
+    ]
+
+def _pairComponentIndexes(components1, components2):
+    """
+    Pair two lists of components and return a list of
+    (index in components1, index in components2) tuples.
+    """
+    indexes1 = list(range(len(components1)))
+    indexes2 = list(range(len(components2)))
     pairs = []
     # align with matching identifiers
-    removeFromComponents1 = []
-    for component1 in components1:
+    removeFromIndexes1 = []
+    for index1 in indexes1:
+        component1 = components1[index1]
         baseGlyph = component1["baseGlyph"]
         identifier = component1["identifier"]
         match = None
-        for component2 in components2:
+        for index2 in indexes2:
+            component2 = components2[index2]
             if component2["baseGlyph"] == baseGlyph and component2["identifier"] == identifier:
-                match = component2
+                match = index2
                 break
         if match is not None:
-            component2 = match
-            removeFromComponents1.append(component1)
-            components2.remove(component2)
-            pairs.append((component1, component2))
-    for component1 in removeFromComponents1:
-        components1.remove(component1)
+            removeFromIndexes1.append(index1)
+            indexes2.remove(match)
+            pairs.append((index1, match))
+    for index1 in removeFromIndexes1:
+        indexes1.remove(index1)
     # align with index
-    for component1 in components1:
-        baseGlyph = component1["baseGlyph"]
-        for component2 in components2:
-            if component2["baseGlyph"] == baseGlyph:
-                components2.remove(component2)
-                pairs.append((component1, component2))
+    for index1 in indexes1:
+        baseGlyph = components1[index1]["baseGlyph"]
+        for index2 in indexes2:
+            if components2[index2]["baseGlyph"] == baseGlyph:
+                indexes2.remove(index2)
+                pairs.append((index1, index2))
                 break
     return pairs
 
@@ -699,6 +2048,16 @@ def _processMathTwoComponents(components, factor, func, scaleComponentTransform=
         result.append(component)
     return result
 
+def _interpolateComponents(componentPairs, factor, scaleComponentTransform=True):
+    result = []
+    for component1, component2 in componentPairs:
+        component = dict(component1)
+        component["transformation"] = _interpolateTransformation(
+            component1["transformation"], component2["transformation"], factor, doScale=scaleComponentTransform
+        )
+        result.append(component)
+    return result
+
 # image
 
 _imageTransformationKeys = "xScale xyScale yxScale yScale xOffset yOffset".split(" ")
@@ -707,6 +2066,21 @@ _defaultImageTransformationDict = {}
 for key, value in zip(_imageTransformationKeys, _defaultImageTransformation):
     _defaultImageTransformationDict[key] = value
 
+def _peekLib(glyph):
+    # the lib of a MathGlyph is compared without making
+    # a private copy, other glyphs give their lib as is.
+    if isinstance(glyph, MathGlyph):
+        return glyph._peekLib()
+    return glyph.lib
+
+def _peekContours(glyph):
+    # the contours of a MathGlyph are read without
+    # unpacking its storage, math must not change it.
+    if isinstance(glyph, MathGlyph):
+        return glyph._peekContours()
+    return glyph.contours
+
+
 def _expandImage(image):
     if image is None:
         fileName = None
@@ -771,6 +2145,17 @@ def _processMathTwoTransformation(transformation, factor, func, doScale=True):
     xOffset, yOffset = func((xOffset, yOffset), factor)
     return (xScale, xyScale, yxScale, yScale, xOffset, yOffset)
 
+def _interpolateTransformation(transformation1, transformation2, factor, doScale=True):
+    # when the scale is not factored, this matches
+    # transformation1 + (transformation2 - transformation1)
+    scaleFactor = factor if doScale else (1, 1)
+    xScale1, xyScale1, yxScale1, yScale1, xOffset1, yOffset1 = transformation1
+    xScale2, xyScale2, yxScale2, yScale2, xOffset2, yOffset2 = transformation2
+    xScale, yScale = interpolatePt((xScale1, yScale1), (xScale2, yScale2), scaleFactor)
+    xyScale, yxScale = interpolatePt((xyScale1, yxScale1), (xyScale2, yxScale2), scaleFactor)
+    xOffset, yOffset = interpolatePt((xOffset1, yOffset1), (xOffset2, yOffset2), factor)
+    return (xScale, xyScale, yxScale, yScale, xOffset, yOffset)
+
 
 # rounding
 
@@ -814,6 +2199,45 @@ def _roundAnchors(anchors, digits=None):
     return result
 
 
+# transforming
+
+def _transformContours(contours, matrix):
+    result = []
+    for contour in contours:
+        points = [
+            (segmentType, transformPt(pt, matrix), smooth, name, identifier)
+            for segmentType, pt, smooth, name, identifier in contour["points"]
+        ]
+        result.append(dict(identifier=contour["identifier"], points=points))
+    return result
+
+def _transformTransformation(transformation, matrix):
+    # the transformation is applied first, as in TransformPen.addComponent
+    return tuple(Transform(*matrix).transform(transformation))
+
+def _transformImage(image, matrix):
+    fileName = image["fileName"]
+    color = image["color"]
+    transformation = _transformTransformation(image["transformation"], matrix)
+    return dict(fileName=fileName, transformation=transformation, color=color)
+
+def _transformComponents(components, matrix):
+    result = []
+    for component in components:
+        component = dict(component)
+        component["transformation"] = _transformTransformation(component["transformation"], matrix)
+        result.append(component)
+    return result
+
+def _transformAnchors(anchors, matrix):
+    result = []
+    for anchor in anchors:
+        anchor = dict(anchor)
+        anchor["x"], anchor["y"] = transformPt((anchor["x"], anchor["y"]), matrix)
+        result.append(anchor)
+    return result
+
+
 if __name__ == "__main__":
     import sys
     import doctest
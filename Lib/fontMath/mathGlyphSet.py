@@ -0,0 +1,602 @@
+from __future__ import absolute_import
+import json
+import mmap
+import struct
+import sys
+from array import array
+from fontMath.mathFunctions import (
+    addArray, subArray, mulArray, divArray, interpolateArray,
+    linearCombinationArray)
+from fontMath.mathContours import PackedContours, _roundArray
+from fontMath.mathGlyph import MathGlyph
+
+"""
+The glyphs of one font master packed into a few contiguous
+arrays, so that a whole font can be added, scaled or
+interpolated with one array operation for each kind of data
+instead of one MathGlyph operation for each glyph.
+
+The geometry of all glyphs, in glyph order, is stored in
+these parallel arrays:
+-   coordinates: the interleaved x, y values of every
+    contour point.
+-   componentScales: the xScale, yScale, xyScale, yxScale
+    values of every component transformation.
+-   componentOffsets: the xOffset, yOffset values of every
+    component transformation.
+-   anchorCoordinates: the x, y values of every anchor.
+-   metrics: the width, height values of every glyph.
+
+All values are ordered so that x values are at even and y
+values at odd indexes, like in PackedContours. The ragged
+offset tables that map the arrays back to glyphs and
+contours are kept in a structure object that is shared by
+every glyph set made from the same master:
+-   pointStarts, componentStarts, anchorStarts: for glyph
+    index i the points, components and anchors of the glyph
+    are items pointStarts[i] to pointStarts[i + 1] and so on.
+-   contourStarts: the index, in contourEnds, of the first
+    contour of each glyph.
+-   contourEnds: the end of each contour, in points,
+    relative to the first point of its glyph.
+
+Glyph sets used together must be packed from glyphs with
+the same glyph order, contour structure and number of
+components and anchors. Components and anchors are paired
+by their order and not by name.
+
+Guidelines and images are not packed. The glyphs unpacked
+from a glyph set have none.
+
+A glyph set can be written to a binary file and opened with
+mmap, so that many processes share one page cached copy of
+a master. The file is:
+-   a 24 byte header: the magic b"fontMath", the format
+    version and a reserved field as little endian uint32 and
+    the length of the side table as a little endian uint64.
+-   the side table: UTF-8 JSON with the glyph order, the
+    names and topology of every glyph and the byte order,
+    typecode, offset and length of every array.
+-   the arrays, as raw 8 byte values. they start at the
+    first multiple of 8 after the side table and the offsets
+    in the side table are relative to that position, so the
+    arrays can also be opened with numpy.memmap.
+The lib, guidelines and image of the glyphs are not written.
+"""
+
+__all__ = [
+    "PackedGlyphSet",
+    "linearCombination",
+]
+
+
+class PackedGlyphSet(object):
+
+    """
+    A packed set of MathGlyph objects that supports the same
+    math as MathGlyph: +, -, * and / with numbers or (x, y)
+    tuples, interpolate and round. Glyphs are unpacked into
+    MathGlyph objects when they are first requested by name.
+
+    scaleComponentTransform has the same meaning as in
+    MathGlyph and applies to all glyphs in the set.
+    """
+
+    def __init__(self, structure, coordinates, componentScales,
+                 componentOffsets, anchorCoordinates, metrics,
+                 scaleComponentTransform=True):
+        self._structure = structure
+        self.coordinates = coordinates
+        self.componentScales = componentScales
+        self.componentOffsets = componentOffsets
+        self.anchorCoordinates = anchorCoordinates
+        self.metrics = metrics
+        self.scaleComponentTransform = scaleComponentTransform
+        self._glyphs = {}
+
+    @classmethod
+    def fromGlyphs(cls, glyphs, glyphOrder=None, scaleComponentTransform=True):
+        """
+        Pack a dict of MathGlyph objects. glyphOrder is the
+        list of glyph names to pack, in order. It defaults
+        to all the glyphs.
+        """
+        if glyphOrder is None:
+            glyphOrder = list(glyphs.keys())
+        templates = []
+        topology = []
+        pointStarts = array("q", [0])
+        contourStarts = array("q", [0])
+        contourEnds = array("q")
+        componentStarts = array("q", [0])
+        anchorStarts = array("q", [0])
+        coordinates = array("d")
+        componentScales = array("d")
+        componentOffsets = array("d")
+        anchorCoordinates = array("d")
+        metrics = array("d")
+        for glyphName in glyphOrder:
+            glyph = glyphs[glyphName]
+            templates.append(glyph)
+            # contours
+            packed = glyph._getPackedContours()
+            values = packed.coordinates
+            if isinstance(values, array) and values.typecode == "d":
+                coordinates.extend(values)
+            else:
+                coordinates.extend(iter(values))
+            contourEnds.extend(packed.contourEnds)
+            pointStarts.append(pointStarts[-1] + len(packed))
+            contourStarts.append(len(contourEnds))
+            topology.append((packed.pointInfo, packed.contourIdentifiers))
+            # components
+            for component in glyph.components:
+                xScale, xyScale, yxScale, yScale, xOffset, yOffset = component["transformation"]
+                componentScales.extend((xScale, yScale, xyScale, yxScale))
+                componentOffsets.extend((xOffset, yOffset))
+            componentStarts.append(componentStarts[-1] + len(glyph.components))
+            # anchors
+            for anchor in glyph.anchors:
+                anchorCoordinates.extend((anchor["x"], anchor["y"]))
+            anchorStarts.append(anchorStarts[-1] + len(glyph.anchors))
+            # metrics
+            metrics.extend((glyph.width, glyph.height))
+        structure = _GlyphSetStructure(
+            tuple(glyphOrder), templates, topology,
+            pointStarts, contourStarts, contourEnds,
+            componentStarts, anchorStarts
+        )
+        return cls(
+            structure, coordinates, componentScales, componentOffsets,
+            anchorCoordinates, metrics, scaleComponentTransform=scaleComponentTransform
+        )
+
+    def _arrays(self):
+        return (self.coordinates, self.componentScales, self.componentOffsets,
+                self.anchorCoordinates, self.metrics)
+
+    def _copyWithArrays(self, arrays):
+        return self.__class__(self._structure, *arrays, scaleComponentTransform=self.scaleComponentTransform)
+
+    def isCompatible(self, other):
+        """
+        Return True if math can be done with self and other.
+        """
+        return self._structure.isCompatible(other._structure)
+
+    def _checkCompatible(self, other):
+        if not self.isCompatible(other):
+            raise ValueError("The glyph sets are not compatible.")
+
+    # -------------
+    # dict Behavior
+    # -------------
+
+    @property
+    def glyphOrder(self):
+        return self._structure.glyphOrder
+
+    def keys(self):
+        return list(self._structure.glyphOrder)
+
+    def __len__(self):
+        return len(self._structure.glyphOrder)
+
+    def __iter__(self):
+        return iter(self._structure.glyphOrder)
+
+    def __contains__(self, glyphName):
+        return glyphName in self._structure.glyphIndexes
+
+    def __getitem__(self, glyphName):
+        glyph = self._glyphs.get(glyphName)
+        if glyph is None:
+            index = self._structure.glyphIndexes[glyphName]
+            glyph = self._glyphs[glyphName] = self._unpackGlyph(index)
+        return glyph
+
+    def _unpackGlyph(self, index):
+        structure = self._structure
+        template = structure.getTemplate(index)
+        glyph = template.copyWithoutMathSubObjects()
+        # metrics
+        metrics = self.metrics
+        glyph.width = metrics[index * 2]
+        glyph.height = metrics[index * 2 + 1]
+        # contours
+        start = structure.pointStarts[index]
+        end = structure.pointStarts[index + 1]
+        contourEnds = structure.contourEnds[structure.contourStarts[index]:structure.contourStarts[index + 1]]
+        pointInfo, contourIdentifiers = structure.getTopology(index)
+        glyph._setPackedContours(PackedContours(
+            self.coordinates[start * 2:end * 2], tuple(contourEnds), pointInfo, contourIdentifiers
+        ))
+        # components
+        scales = self.componentScales
+        offsets = self.componentOffsets
+        components = []
+        for i, component in enumerate(template.components, structure.componentStarts[index]):
+            xScale, yScale, xyScale, yxScale = scales[i * 4:i * 4 + 4]
+            xOffset, yOffset = offsets[i * 2:i * 2 + 2]
+            component = dict(component)
+            component["transformation"] = (xScale, xyScale, yxScale, yScale, xOffset, yOffset)
+            components.append(component)
+        glyph.components = components
+        # anchors
+        anchorCoordinates = self.anchorCoordinates
+        anchors = []
+        for i, anchor in enumerate(template.anchors, structure.anchorStarts[index]):
+            anchor = dict(anchor)
+            anchor["x"], anchor["y"] = anchorCoordinates[i * 2:i * 2 + 2]
+            anchors.append(anchor)
+        glyph.anchors = anchors
+        return glyph
+
+    # ----
+    # Math
+    # ----
+
+    # math with other glyph set
+
+    def __add__(self, other):
+        return self._processMathOne(other, addArray)
+
+    def __sub__(self, other):
+        return self._processMathOne(other, subArray)
+
+    def _processMathOne(self, other, func):
+        self._checkCompatible(other)
+        return self._copyWithArrays([func(a1, a2) for a1, a2 in zip(self._arrays(), other._arrays())])
+
+    # math with factor
+
+    def __mul__(self, factor):
+        return self._processMathTwo(factor, mulArray)
+
+    __rmul__ = __mul__
+
+    def __div__(self, factor):
+        return self._processMathTwo(factor, divArray)
+
+    __truediv__ = __div__
+
+    __rdiv__ = __div__
+
+    __rtruediv__ = __rdiv__
+
+    def _processMathTwo(self, factor, func):
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        arrays = [func(a, factor) for a in self._arrays()]
+        if not self.scaleComponentTransform:
+            arrays[1] = self.componentScales
+        return self._copyWithArrays(arrays)
+
+    # interpolation
+
+    def interpolate(self, other, factor):
+        """
+        return a new PackedGlyphSet interpolated between self
+        and other. this is the same as:
+
+            self + (other - self) * factor
+        """
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        self._checkCompatible(other)
+        scaleFactor = factor if self.scaleComponentTransform else (1, 1)
+        factors = (factor, scaleFactor, factor, factor, factor)
+        return self._copyWithArrays([
+            interpolateArray(a1, a2, f)
+            for a1, a2, f in zip(self._arrays(), other._arrays(), factors)
+        ])
+
+    # ----
+    # File
+    # ----
+
+    def write(self, path):
+        """
+        Write the glyph set to a binary file that can
+        be opened with PackedGlyphSet.fromFile.
+        """
+        structure = self._structure
+        arrays = [
+            ("coordinates", self.coordinates),
+            ("componentScales", self.componentScales),
+            ("componentOffsets", self.componentOffsets),
+            ("anchorCoordinates", self.anchorCoordinates),
+            ("metrics", self.metrics),
+            ("pointStarts", structure.pointStarts),
+            ("contourStarts", structure.contourStarts),
+            ("contourEnds", structure.contourEnds),
+            ("componentStarts", structure.componentStarts),
+            ("anchorStarts", structure.anchorStarts),
+        ]
+        descriptors = {}
+        chunks = []
+        offset = 0
+        for name, values in arrays:
+            typecode = getattr(values, "typecode", None) or values.format
+            data = array(typecode, values).tobytes()
+            descriptors[name] = [typecode, offset, len(values)]
+            chunks.append(data)
+            offset += len(data)
+        sideTable = dict(
+            byteOrder=sys.byteorder,
+            scaleComponentTransform=self.scaleComponentTransform,
+            glyphOrder=list(structure.glyphOrder),
+            glyphs=[
+                _describeGlyph(structure.getTemplate(index), structure.getTopology(index))
+                for index in range(len(structure.glyphOrder))
+            ],
+            arrays=descriptors
+        )
+        sideTable = json.dumps(sideTable, separators=(",", ":")).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(struct.pack(_headerFormat, _magic, _formatVersion, 0, len(sideTable)))
+            f.write(sideTable)
+            f.write(b"\0" * (_dataStart(len(sideTable)) - _headerSize - len(sideTable)))
+            for data in chunks:
+                f.write(data)
+
+    @classmethod
+    def fromFile(cls, path):
+        """
+        Open a file written by PackedGlyphSet.write. The file
+        is memory mapped and the arrays of the glyph set are
+        views of it, so nothing but the side table is read
+        until it is used. The glyphs are only built when they
+        are unpacked.
+        """
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, reserved, sideTableLength = struct.unpack(_headerFormat, data[:_headerSize])
+        if magic != _magic:
+            raise ValueError("%s is not a packed glyph set file." % path)
+        if version > _formatVersion:
+            raise ValueError("Unsupported packed glyph set file version: %d." % version)
+        sideTable = json.loads(data[_headerSize:_headerSize + sideTableLength].decode("utf-8"))
+        start = _dataStart(sideTableLength)
+        swap = sideTable["byteOrder"] != sys.byteorder
+        view = memoryview(data)
+        arrays = {}
+        for name, (typecode, offset, count) in sideTable["arrays"].items():
+            values = view[start + offset:start + offset + count * 8]
+            if swap:
+                # the data has to be copied to be byte swapped
+                values = array(typecode, values.tobytes())
+                values.byteswap()
+            else:
+                values = values.cast(typecode)
+            arrays[name] = values
+        structure = _SideTableGlyphSetStructure(
+            tuple(sideTable["glyphOrder"]), sideTable["glyphs"],
+            sideTable["scaleComponentTransform"],
+            arrays["pointStarts"], arrays["contourStarts"], arrays["contourEnds"],
+            arrays["componentStarts"], arrays["anchorStarts"]
+        )
+        return cls(
+            structure, arrays["coordinates"], arrays["componentScales"],
+            arrays["componentOffsets"], arrays["anchorCoordinates"], arrays["metrics"],
+            scaleComponentTransform=sideTable["scaleComponentTransform"]
+        )
+
+    # --------
+    # Rounding
+    # --------
+
+    def round(self, digits=None):
+        """round the geometry."""
+        return self._copyWithArrays([
+            _roundArray(self.coordinates, digits),
+            self.componentScales,
+            _roundArray(self.componentOffsets, digits),
+            _roundArray(self.anchorCoordinates, digits),
+            _roundArray(self.metrics, digits)
+        ])
+
+
+class _GlyphSetStructure(object):
+
+    """
+    The glyph order, offset tables and template glyphs
+    shared by the glyph sets made from one master.
+    """
+
+    def __init__(self, glyphOrder, templates, topology,
+                 pointStarts, contourStarts, contourEnds,
+                 componentStarts, anchorStarts):
+        self.glyphOrder = glyphOrder
+        self.glyphIndexes = {glyphName: index for index, glyphName in enumerate(glyphOrder)}
+        self.templates = templates
+        self.topology = topology
+        self.pointStarts = pointStarts
+        self.contourStarts = contourStarts
+        self.contourEnds = contourEnds
+        self.componentStarts = componentStarts
+        self.anchorStarts = anchorStarts
+        self._pairingKeys = None
+
+    def getTemplate(self, index):
+        return self.templates[index]
+
+    def getPairingKey(self, index):
+        template = self.getTemplate(index)
+        return (
+            tuple((component["baseGlyph"], component["identifier"])
+                  for component in template.components),
+            tuple((anchor.get("name"), anchor.get("identifier"))
+                  for anchor in template.anchors)
+        )
+
+    def getPairingKeys(self):
+        """
+        The component base glyphs and anchor names of every glyph.
+        Components and anchors are combined by position, so two
+        structures must list them in the same order.
+        """
+        if self._pairingKeys is None:
+            self._pairingKeys = [
+                self.getPairingKey(index) for index in range(len(self.glyphOrder))
+            ]
+        return self._pairingKeys
+
+    def getTopology(self, index):
+        return self.topology[index]
+
+    def isCompatible(self, other):
+        if self is other:
+            return True
+        return (
+            self.glyphOrder == other.glyphOrder
+            and self.pointStarts == other.pointStarts
+            and self.contourStarts == other.contourStarts
+            and self.contourEnds == other.contourEnds
+            and self.componentStarts == other.componentStarts
+            and self.anchorStarts == other.anchorStarts
+            and self.getPairingKeys() == other.getPairingKeys()
+        )
+
+
+class _SideTableGlyphSetStructure(_GlyphSetStructure):
+
+    """
+    A glyph set structure read from a file. The template
+    glyphs and topology are built from the side table when
+    they are first needed.
+    """
+
+    def __init__(self, glyphOrder, glyphDescriptions, scaleComponentTransform,
+                 pointStarts, contourStarts, contourEnds,
+                 componentStarts, anchorStarts):
+        count = len(glyphOrder)
+        super(_SideTableGlyphSetStructure, self).__init__(
+            glyphOrder, [None] * count, [None] * count,
+            pointStarts, contourStarts, contourEnds,
+            componentStarts, anchorStarts
+        )
+        self.glyphDescriptions = glyphDescriptions
+        self.scaleComponentTransform = scaleComponentTransform
+
+    def getTemplate(self, index):
+        template = self.templates[index]
+        if template is None:
+            template = self.templates[index] = _templateFromDescription(
+                self.glyphDescriptions[index], self.scaleComponentTransform
+            )
+        return template
+
+    def getPairingKey(self, index):
+        description = self.glyphDescriptions[index]
+        return (
+            tuple((baseGlyph, identifier)
+                  for baseGlyph, identifier in description["components"]),
+            tuple((name, identifier)
+                  for name, identifier, color in description["anchors"])
+        )
+
+    def getTopology(self, index):
+        topology = self.topology[index]
+        if topology is None:
+            description = self.glyphDescriptions[index]
+            topology = self.topology[index] = (
+                tuple(tuple(info) for info in description["pointInfo"]),
+                tuple(description["contourIdentifiers"])
+            )
+        return topology
+
+
+# ---------
+# File Data
+# ---------
+
+_magic = b"fontMath"
+_formatVersion = 1
+_headerFormat = "<8sIIQ"
+_headerSize = struct.calcsize(_headerFormat)
+
+def _dataStart(sideTableLength):
+    end = _headerSize + sideTableLength
+    return end + (-end % 8)
+
+def _describeGlyph(glyph, topology):
+    pointInfo, contourIdentifiers = topology
+    return dict(
+        name=glyph.name,
+        unicodes=glyph.unicodes,
+        note=glyph.note,
+        strict=glyph.strict,
+        packed=glyph.packed,
+        pointInfo=pointInfo,
+        contourIdentifiers=contourIdentifiers,
+        components=[
+            [component["baseGlyph"], component["identifier"]]
+            for component in glyph.components
+        ],
+        anchors=[
+            [anchor.get("name"), anchor.get("identifier"), anchor.get("color")]
+            for anchor in glyph.anchors
+        ]
+    )
+
+def _templateFromDescription(description, scaleComponentTransform):
+    glyph = MathGlyph(
+        None, scaleComponentTransform=scaleComponentTransform,
+        strict=description["strict"], packed=description["packed"]
+    )
+    glyph.name = description["name"]
+    glyph.unicodes = description["unicodes"]
+    glyph.note = description["note"]
+    glyph.components = [
+        dict(baseGlyph=baseGlyph, transformation=(1, 0, 0, 1, 0, 0), identifier=identifier)
+        for baseGlyph, identifier in description["components"]
+    ]
+    glyph.anchors = [
+        dict(x=0, y=0, name=name, identifier=identifier, color=color)
+        for name, identifier, color in description["anchors"]
+    ]
+    return glyph
+
+
+# ------------------
+# Linear Combination
+# ------------------
+
+def linearCombination(glyphSetsAndWeights):
+    """
+    Return a new PackedGlyphSet that is the weighted sum of
+    any number of compatible glyph sets:
+
+        glyphSet1 * weight1 + glyphSet2 * weight2 + ...
+
+    glyphSetsAndWeights is a list of (glyphSet, weight) tuples.
+    A weight may be a number or an (x, y) tuple. The result is
+    based on the first glyph set.
+    """
+    if not glyphSetsAndWeights:
+        raise ValueError("At least one glyph set is required.")
+    glyphSets = []
+    factors = []
+    scaleFactors = []
+    for glyphSet, weight in glyphSetsAndWeights:
+        if not isinstance(weight, tuple):
+            weight = (weight, weight)
+        glyphSets.append(glyphSet)
+        factors.append(weight)
+        scaleFactors.append(weight if glyphSet.scaleComponentTransform else (1, 1))
+    glyphSet1 = glyphSets[0]
+    for glyphSet in glyphSets[1:]:
+        glyphSet1._checkCompatible(glyphSet)
+    arrayLists = zip(*[glyphSet._arrays() for glyphSet in glyphSets])
+    arrayFactors = (factors, scaleFactors, factors, factors, factors)
+    return glyphSet1._copyWithArrays([
+        linearCombinationArray(arrays, f)
+        for arrays, f in zip(arrayLists, arrayFactors)
+    ])
+
+
+if __name__ == "__main__":
+    import sys
+    import doctest
+    sys.exit(doctest.testmod().failed)
@@ -1,11 +1,13 @@
-from fontMath.mathFunctions import factorAngle, _roundNumber
+from fontMath.mathFunctions import factorAngle, transformAngle, transformPt, _roundNumber
 
 __all__ = [
     "_expandGuideline",
     "_compressGuideline",
     "_pairGuidelines",
+    "_pairGuidelineIndexes",
     "_processMathOneGuidelines",
     "_processMathTwoGuidelines",
+    "_transformGuidelines",
     "_roundGuidelines"
 ]
 
@@ -39,42 +41,53 @@ def _compressGuideline(guideline):
     return guideline
 
 def _pairGuidelines(guidelines1, guidelines2):
-    guidelines1 = list(guidelines1)
-    guidelines2 = list(guidelines2)
+    return [
+        (guidelines1[index1], guidelines2[index2])
+        for index1, index2 in _pairGuidelineIndexes(guidelines1, guidelines2)
+    ]
+
+def _pairGuidelineIndexes(guidelines1, guidelines2):
+    """
+    Pair two lists of guidelines and return a list of
+    (index in guidelines1, index in guidelines2) tuples.
+    """
+    indexes1 = list(range(len(guidelines1)))
+    indexes2 = list(range(len(guidelines2)))
     pairs = []
     # name + identifier + (x, y, angle)
-    _findPair(guidelines1, guidelines2, pairs, ("name", "identifier", "x", "y", "angle"))
+    _findPair(guidelines1, guidelines2, indexes1, indexes2, pairs, ("name", "identifier", "x", "y", "angle"))
     # name + identifier matches
-    _findPair(guidelines1, guidelines2, pairs, ("name", "identifier"))
+    _findPair(guidelines1, guidelines2, indexes1, indexes2, pairs, ("name", "identifier"))
     # name + (x, y, angle)
-    _findPair(guidelines1, guidelines2, pairs, ("name", "x", "y", "angle"))
+    _findPair(guidelines1, guidelines2, indexes1, indexes2, pairs, ("name", "x", "y", "angle"))
     # identifier + (x, y, angle)
-    _findPair(guidelines1, guidelines2, pairs, ("identifier", "x", "y", "angle"))
+    _findPair(guidelines1, guidelines2, indexes1, indexes2, pairs, ("identifier", "x", "y", "angle"))
     # name matches
-    if guidelines1 and guidelines2:
-        _findPair(guidelines1, guidelines2, pairs, ("name",))
+    if indexes1 and indexes2:
+        _findPair(guidelines1, guidelines2, indexes1, indexes2, pairs, ("name",))
     # identifier matches
-    if guidelines1 and guidelines2:
-        _findPair(guidelines1, guidelines2, pairs, ("identifier",))
+    if indexes1 and indexes2:
+        _findPair(guidelines1, guidelines2, indexes1, indexes2, pairs, ("identifier",))
     # done
     return pairs
 
-def _findPair(guidelines1, guidelines2, pairs, attrs):
-    removeFromGuidelines1 = []
-    for guideline1 in guidelines1:
+def _findPair(guidelines1, guidelines2, indexes1, indexes2, pairs, attrs):
+    removeFromIndexes1 = []
+    for index1 in indexes1:
+        guideline1 = guidelines1[index1]
         match = None
-        for guideline2 in guidelines2:
+        for index2 in indexes2:
+            guideline2 = guidelines2[index2]
             attrMatch = False not in [guideline1.get(attr) == guideline2.get(attr) for attr in attrs]
             if attrMatch:
-                match = guideline2
+                match = index2
                 break
         if match is not None:
-            guideline2 = match
-            removeFromGuidelines1.append(guideline1)
-            guidelines2.remove(guideline2)
-            pairs.append((guideline1, guideline2))
-    for removeGuide in removeFromGuidelines1:
-        guidelines1.remove(removeGuide)
+            removeFromIndexes1.append(index1)
+            indexes2.remove(match)
+            pairs.append((index1, match))
+    for index1 in removeFromIndexes1:
+        indexes1.remove(index1)
 
 def _processMathOneGuidelines(guidelinePairs, ptFunc, func):
     result = []
@@ -100,6 +113,15 @@ def _processMathTwoGuidelines(guidelines, factor, func):
         result.append(guideline)
     return result
 
+def _transformGuidelines(guidelines, matrix):
+    result = []
+    for guideline in guidelines:
+        guideline = dict(guideline)
+        guideline["x"], guideline["y"] = transformPt((guideline["x"], guideline["y"]), matrix)
+        guideline["angle"] = transformAngle(guideline["angle"], matrix) % 360
+        result.append(guideline)
+    return result
+
 def _roundGuidelines(guidelines, digits=None):
     results = []
     for guideline in guidelines:
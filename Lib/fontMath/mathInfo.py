@@ -6,8 +6,177 @@ from fontMath.mathGuideline import (
     _processMathTwoGuidelines, _roundGuidelines)
 
 
+# ----------
+# Formatters
+# ----------
+
+def _numberFormatter(value):
+    v = int(value)
+    if v == value:
+        return v
+    return value
+
+def _integerFormatter(value):
+    return _roundNumber(value)
+
+def _floatFormatter(value):
+    return float(value)
+
+def _nonNegativeNumberFormatter(value):
+    """
+    >>> _nonNegativeNumberFormatter(-10)
+    0
+    """
+    if value < 0:
+        return 0
+    return value
+
+def _nonNegativeIntegerFormatter(value):
+    value = _integerFormatter(value)
+    if value < 0:
+        return 0
+    return value
+
+def _integerListFormatter(value):
+    """
+    >>> _integerListFormatter([.9, 40.3, 16.0001])
+    [1, 40, 16]
+    """
+    return [_integerFormatter(v) for v in value]
+
+def _numberListFormatter(value):
+    return [_numberFormatter(v) for v in value]
+
+def _openTypeOS2WidthClassFormatter(value):
+    """
+    >>> _openTypeOS2WidthClassFormatter(-2)
+    1
+    >>> _openTypeOS2WidthClassFormatter(0)
+    1
+    >>> _openTypeOS2WidthClassFormatter(5.4)
+    5
+    >>> _openTypeOS2WidthClassFormatter(9.6)
+    9
+    >>> _openTypeOS2WidthClassFormatter(12)
+    9
+    """
+    value = int(round2(value))
+    if value > 9:
+        value = 9
+    elif value < 1:
+        value = 1
+    return value
+
+def _openTypeOS2WeightClassFormatter(value):
+    """
+    >>> _openTypeOS2WeightClassFormatter(-20)
+    0
+    >>> _openTypeOS2WeightClassFormatter(0)
+    0
+    >>> _openTypeOS2WeightClassFormatter(50.4)
+    50
+    >>> _openTypeOS2WeightClassFormatter(90.6)
+    91
+    >>> _openTypeOS2WeightClassFormatter(120)
+    120
+    """
+    value = _roundNumber(value)
+    if value < 0:
+        value = 0
+    return value
+
+_infoAttrs = dict(
+    # these are structured as:
+    #   attribute name = (formatter function, factor direction)
+    # where factor direction 0 = x, 1 = y and 3 = x, y (for angles)
+
+    unitsPerEm=(_nonNegativeNumberFormatter, 1),
+    descender=(_numberFormatter, 1),
+    xHeight=(_numberFormatter, 1),
+    capHeight=(_numberFormatter, 1),
+    ascender=(_numberFormatter, 1),
+    italicAngle=(_numberFormatter, 3),
+
+    openTypeHeadLowestRecPPEM=(_nonNegativeIntegerFormatter, 1),
+
+    openTypeHheaAscender=(_integerFormatter, 1),
+    openTypeHheaDescender=(_integerFormatter, 1),
+    openTypeHheaLineGap=(_integerFormatter, 1),
+    openTypeHheaCaretSlopeRise=(_integerFormatter, 1),
+    openTypeHheaCaretSlopeRun=(_integerFormatter, 1),
+    openTypeHheaCaretOffset=(_integerFormatter, 1),
+
+    openTypeOS2WidthClass=(_openTypeOS2WidthClassFormatter, 0),
+    openTypeOS2WeightClass=(_openTypeOS2WeightClassFormatter, 0),
+    openTypeOS2TypoAscender=(_integerFormatter, 1),
+    openTypeOS2TypoDescender=(_integerFormatter, 1),
+    openTypeOS2TypoLineGap=(_integerFormatter, 1),
+    openTypeOS2WinAscent=(_nonNegativeIntegerFormatter, 1),
+    openTypeOS2WinDescent=(_nonNegativeIntegerFormatter, 1),
+    openTypeOS2SubscriptXSize=(_integerFormatter, 0),
+    openTypeOS2SubscriptYSize=(_integerFormatter, 1),
+    openTypeOS2SubscriptXOffset=(_integerFormatter, 0),
+    openTypeOS2SubscriptYOffset=(_integerFormatter, 1),
+    openTypeOS2SuperscriptXSize=(_integerFormatter, 0),
+    openTypeOS2SuperscriptYSize=(_integerFormatter, 1),
+    openTypeOS2SuperscriptXOffset=(_integerFormatter, 0),
+    openTypeOS2SuperscriptYOffset=(_integerFormatter, 1),
+    openTypeOS2StrikeoutSize=(_integerFormatter, 1),
+    openTypeOS2StrikeoutPosition=(_integerFormatter, 1),
+
+    openTypeVheaVertTypoAscender=(_integerFormatter, 1),
+    openTypeVheaVertTypoDescender=(_integerFormatter, 1),
+    openTypeVheaVertTypoLineGap=(_integerFormatter, 1),
+    openTypeVheaCaretSlopeRise=(_integerFormatter, 1),
+    openTypeVheaCaretSlopeRun=(_integerFormatter, 1),
+    openTypeVheaCaretOffset=(_integerFormatter, 1),
+
+    postscriptSlantAngle=(_numberFormatter, 3),
+    postscriptUnderlineThickness=(_numberFormatter, 1),
+    postscriptUnderlinePosition=(_numberFormatter, 1),
+    postscriptBlueValues=(_numberListFormatter, 1),
+    postscriptOtherBlues=(_numberListFormatter, 1),
+    postscriptFamilyBlues=(_numberListFormatter, 1),
+    postscriptFamilyOtherBlues=(_numberListFormatter, 1),
+    postscriptStemSnapH=(_numberListFormatter, 0),
+    postscriptStemSnapV=(_numberListFormatter, 1),
+    postscriptBlueFuzz=(_numberFormatter, 1),
+    postscriptBlueShift=(_numberFormatter, 1),
+    postscriptBlueScale=(_floatFormatter, 1),
+    postscriptDefaultWidthX=(_numberFormatter, 0),
+    postscriptNominalWidthX=(_numberFormatter, 0),
+    # this will be handled in a special way
+    # postscriptWeightName=unicode
+)
+
+_numberListAttrs = {
+    attr
+    for attr, (formatter, _) in _infoAttrs.items()
+    if formatter is _numberListFormatter
+}
+
+_postscriptWeightNameOptions = {
+    100 : "Thin",
+    200 : "Extra-light",
+    300 : "Light",
+    400 : "Normal",
+    500 : "Medium",
+    600 : "Semi-bold",
+    700 : "Bold",
+    800 : "Extra-bold",
+    900 : "Black"
+}
+
+# the attributes that MathInfo stores in slots.
+# attributes that the info object does not have
+# are left unset.
+_infoSlots = tuple(_infoAttrs.keys()) + ("guidelines", "postscriptWeightName")
+
+
 class MathInfo(object):
 
+    __slots__ = _infoSlots + ("__dict__", "__weakref__")
+
     def __init__(self, infoObject):
         for attr in _infoAttrs.keys():
             if hasattr(infoObject, attr):
@@ -19,6 +188,30 @@ class MathInfo(object):
         else:
             self.guidelines = []
 
+    def _attributes(self):
+        """
+        Return a dict of the attributes that are set.
+        """
+        attributes = {}
+        for attr in _infoSlots:
+            try:
+                attributes[attr] = getattr(self, attr)
+            except AttributeError:
+                pass
+        attributes.update(self.__dict__)
+        return attributes
+
+    # --------
+    # Pickling
+    # --------
+
+    def __getstate__(self):
+        return self._attributes()
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
     # ----
     # Copy
     # ----
@@ -43,7 +236,19 @@ class MathInfo(object):
         self._processMathOne(copiedInfo, otherInfo, subPt, sub)
         return copiedInfo
 
+    # in-place math with other info
+
+    def __iadd__(self, otherInfo):
+        self._processMathOne(self, otherInfo, addPt, add)
+        return self
+
+    def __isub__(self, otherInfo):
+        self._processMathOne(self, otherInfo, subPt, sub)
+        return self
+
     def _processMathOne(self, copiedInfo, otherInfo, ptFunc, func):
+        # copiedInfo may be self, so each value
+        # is computed before it is replaced.
         # basic attributes
         for attr in _infoAttrs.keys():
             a = None
@@ -76,10 +281,11 @@ class MathInfo(object):
         # special attributes
         self._processPostscriptWeightName(copiedInfo)
         # guidelines
-        copiedInfo.guidelines = []
+        guidelines = []
         if self.guidelines:
             guidelinePairs = _pairGuidelines(self.guidelines, otherInfo.guidelines)
-            copiedInfo.guidelines = _processMathOneGuidelines(guidelinePairs, ptFunc, func)
+            guidelines = _processMathOneGuidelines(guidelinePairs, ptFunc, func)
+        copiedInfo.guidelines = guidelines
 
     def _processMathOneNumber(self, a, b, func):
         return func(a, b)
@@ -117,7 +323,25 @@ class MathInfo(object):
 
     __rtruediv__ = __rdiv__
 
+    # in-place math with factor
+
+    def __imul__(self, factor):
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        self._processMathTwo(self, factor, mul)
+        return self
+
+    def __idiv__(self, factor):
+        if not isinstance(factor, tuple):
+            factor = (factor, factor)
+        self._processMathTwo(self, factor, div)
+        return self
+
+    __itruediv__ = __idiv__
+
     def _processMathTwo(self, copiedInfo, factor, func):
+        # copiedInfo may be self, so each value
+        # is computed before it is replaced.
         # basic attributes
         for attr, (formatter, factorIndex) in _infoAttrs.items():
             if hasattr(copiedInfo, attr):
@@ -136,9 +360,10 @@ class MathInfo(object):
         # special attributes
         self._processPostscriptWeightName(copiedInfo)
         # guidelines
-        copiedInfo.guidelines = []
+        guidelines = []
         if self.guidelines:
-            copiedInfo.guidelines = _processMathTwoGuidelines(self.guidelines, factor, func)
+            guidelines = _processMathTwoGuidelines(self.guidelines, factor, func)
+        copiedInfo.guidelines = guidelines
 
     def _processMathTwoNumber(self, v, factor, func):
         return func(v, factor)
@@ -243,11 +468,13 @@ class MathInfo(object):
     # -------
 
     def __lt__(self, other):
-        if set(self.__dict__.keys()) < set(other.__dict__.keys()):
+        attributes = self._attributes()
+        otherAttributes = other._attributes()
+        if set(attributes.keys()) < set(otherAttributes.keys()):
             return True
-        elif set(self.__dict__.keys()) > set(other.__dict__.keys()):
+        elif set(attributes.keys()) > set(otherAttributes.keys()):
             return False
-        for attr, value in self.__dict__.items():
+        for attr, value in attributes.items():
             other_value = getattr(other, attr)
             if value is not None and other_value is not None:
                 # guidelines is a list of dicts
@@ -270,175 +497,15 @@ class MathInfo(object):
         return False
 
     def __eq__(self, other):
-        if set(self.__dict__.keys()) != set(other.__dict__.keys()):
+        attributes = self._attributes()
+        if set(attributes.keys()) != set(other._attributes().keys()):
             return False
-        for attr, value in self.__dict__.items():
+        for attr, value in attributes.items():
             if hasattr(other, attr) and value != getattr(other, attr):
                 return False
         return True
 
 
-# ----------
-# Formatters
-# ----------
-
-def _numberFormatter(value):
-    v = int(value)
-    if v == value:
-        return v
-    return value
-
-def _integerFormatter(value):
-    return _roundNumber(value)
-
-def _floatFormatter(value):
-    return float(value)
-
-def _nonNegativeNumberFormatter(value):
-    """
-    >>> _nonNegativeNumberFormatter(-10)
-    0
-    """
-    if value < 0:
-        return 0
-    return value
-
-def _nonNegativeIntegerFormatter(value):
-    value = _integerFormatter(value)
-    if value < 0:
-        return 0
-    return value
-
-def _integerListFormatter(value):
-    """
-    >>> _integerListFormatter([.9, 40.3, 16.0001])
-    [1, 40, 16]
-    """
-    return [_integerFormatter(v) for v in value]
-
-def _numberListFormatter(value):
-    return [_numberFormatter(v) for v in value]
-
-def _openTypeOS2WidthClassFormatter(value):
-    """
-    >>> _openTypeOS2WidthClassFormatter(-2)
-    1
-    >>> _openTypeOS2WidthClassFormatter(0)
-    1
-    >>> _openTypeOS2WidthClassFormatter(5.4)
-    5
-    >>> _openTypeOS2WidthClassFormatter(9.6)
-    9
-    >>> _openTypeOS2WidthClassFormatter(12)
-    9
-    """
-    value = int(round2(value))
-    if value > 9:
-        value = 9
-    elif value < 1:
-        value = 1
-    return value
-
-def _openTypeOS2WeightClassFormatter(value):
-    """
-    >>> _openTypeOS2WeightClassFormatter(-20)
-    0
-    >>> _openTypeOS2WeightClassFormatter(0)
-    0
-    >>> _openTypeOS2WeightClassFormatter(50.4)
-    50
-    >>> _openTypeOS2WeightClassFormatter(90.6)
-    91
-    >>> _openTypeOS2WeightClassFormatter(120)
-    120
-    """
-    value = _roundNumber(value)
-    if value < 0:
-        value = 0
-    return value
-
-_infoAttrs = dict(
-    # these are structured as:
-    #   attribute name = (formatter function, factor direction)
-    # where factor direction 0 = x, 1 = y and 3 = x, y (for angles)
-
-    unitsPerEm=(_nonNegativeNumberFormatter, 1),
-    descender=(_numberFormatter, 1),
-    xHeight=(_numberFormatter, 1),
-    capHeight=(_numberFormatter, 1),
-    ascender=(_numberFormatter, 1),
-    italicAngle=(_numberFormatter, 3),
-
-    openTypeHeadLowestRecPPEM=(_nonNegativeIntegerFormatter, 1),
-
-    openTypeHheaAscender=(_integerFormatter, 1),
-    openTypeHheaDescender=(_integerFormatter, 1),
-    openTypeHheaLineGap=(_integerFormatter, 1),
-    openTypeHheaCaretSlopeRise=(_integerFormatter, 1),
-    openTypeHheaCaretSlopeRun=(_integerFormatter, 1),
-    openTypeHheaCaretOffset=(_integerFormatter, 1),
-
-    openTypeOS2WidthClass=(_openTypeOS2WidthClassFormatter, 0),
-    openTypeOS2WeightClass=(_openTypeOS2WeightClassFormatter, 0),
-    openTypeOS2TypoAscender=(_integerFormatter, 1),
-    openTypeOS2TypoDescender=(_integerFormatter, 1),
-    openTypeOS2TypoLineGap=(_integerFormatter, 1),
-    openTypeOS2WinAscent=(_nonNegativeIntegerFormatter, 1),
-    openTypeOS2WinDescent=(_nonNegativeIntegerFormatter, 1),
-    openTypeOS2SubscriptXSize=(_integerFormatter, 0),
-    openTypeOS2SubscriptYSize=(_integerFormatter, 1),
-    openTypeOS2SubscriptXOffset=(_integerFormatter, 0),
-    openTypeOS2SubscriptYOffset=(_integerFormatter, 1),
-    openTypeOS2SuperscriptXSize=(_integerFormatter, 0),
-    openTypeOS2SuperscriptYSize=(_integerFormatter, 1),
-    openTypeOS2SuperscriptXOffset=(_integerFormatter, 0),
-    openTypeOS2SuperscriptYOffset=(_integerFormatter, 1),
-    openTypeOS2StrikeoutSize=(_integerFormatter, 1),
-    openTypeOS2StrikeoutPosition=(_integerFormatter, 1),
-
-    openTypeVheaVertTypoAscender=(_integerFormatter, 1),
-    openTypeVheaVertTypoDescender=(_integerFormatter, 1),
-    openTypeVheaVertTypoLineGap=(_integerFormatter, 1),
-    openTypeVheaCaretSlopeRise=(_integerFormatter, 1),
-    openTypeVheaCaretSlopeRun=(_integerFormatter, 1),
-    openTypeVheaCaretOffset=(_integerFormatter, 1),
-
-    postscriptSlantAngle=(_numberFormatter, 3),
-    postscriptUnderlineThickness=(_numberFormatter, 1),
-    postscriptUnderlinePosition=(_numberFormatter, 1),
-    postscriptBlueValues=(_numberListFormatter, 1),
-    postscriptOtherBlues=(_numberListFormatter, 1),
-    postscriptFamilyBlues=(_numberListFormatter, 1),
-    postscriptFamilyOtherBlues=(_numberListFormatter, 1),
-    postscriptStemSnapH=(_numberListFormatter, 0),
-    postscriptStemSnapV=(_numberListFormatter, 1),
-    postscriptBlueFuzz=(_numberFormatter, 1),
-    postscriptBlueShift=(_numberFormatter, 1),
-    postscriptBlueScale=(_floatFormatter, 1),
-    postscriptDefaultWidthX=(_numberFormatter, 0),
-    postscriptNominalWidthX=(_numberFormatter, 0),
-    # this will be handled in a special way
-    # postscriptWeightName=unicode
-)
-
-_numberListAttrs = {
-    attr
-    for attr, (formatter, _) in _infoAttrs.items()
-    if formatter is _numberListFormatter
-}
-
-_postscriptWeightNameOptions = {
-    100 : "Thin",
-    200 : "Extra-light",
-    300 : "Light",
-    400 : "Normal",
-    500 : "Medium",
-    600 : "Semi-bold",
-    700 : "Bold",
-    800 : "Extra-bold",
-    900 : "Black"
-}
-
 if __name__ == "__main__":
     import sys
     import doctest
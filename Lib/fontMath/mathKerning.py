@@ -1,6 +1,8 @@
 from __future__ import division, absolute_import
-from copy import deepcopy
-from fontMath.mathFunctions import add, sub, mul, div, round2
+from array import array
+from fontMath.mathFunctions import (
+    add, sub, mul, div, round2, addArray, subArray, mulArray, divArray)
+from fontMath.mathKerningMatrix import KerningMatrix
 
 """
 An object that serves kerning data from a
@@ -16,13 +18,130 @@ side1Prefix = "public.kern1."
 side2Prefix = "public.kern2."
 
 
+class KerningGroups(object):
+
+    """
+    An immutable table of kerning groups.
+
+    The side1 and side2 groups are split and the glyph
+    to group maps are made once, when the table is made.
+    A table is never changed, so a MathKerning object, its
+    copies and the results of math with it share one table
+    instead of copying the groups and making the maps again.
+    The indexes made from the maps are cached on the table
+    and are shared the same way.
+
+    >>> groups = KerningGroups({
+    ...     "public.kern1.O": ["O", "D"],
+    ...     "public.kern2.O": ["O", "C"],
+    ...     "other": ["A"],
+    ... })
+    >>> groups.side1GroupMap["D"]
+    'public.kern1.O'
+    >>> sorted(groups.toDict())
+    ['public.kern1.O', 'public.kern2.O']
+    """
+
+    __slots__ = (
+        "groups", "side1Groups", "side2Groups",
+        "side1GroupMap", "side2GroupMap",
+        "_sideResolution", "_exceptionIndex"
+    )
+
+    def __init__(self, groups):
+        self.groups = {}
+        self.side1Groups = {}
+        self.side2Groups = {}
+        self.side1GroupMap = {}
+        self.side2GroupMap = {}
+        self._sideResolution = None
+        self._exceptionIndex = None
+        for groupName, glyphList in groups.items():
+            if groupName.startswith(side1Prefix):
+                glyphList = tuple(glyphList)
+                self.groups[groupName] = self.side1Groups[groupName] = glyphList
+                for glyphName in glyphList:
+                    self.side1GroupMap[glyphName] = groupName
+            elif groupName.startswith(side2Prefix):
+                glyphList = tuple(glyphList)
+                self.groups[groupName] = self.side2Groups[groupName] = glyphList
+                for glyphName in glyphList:
+                    self.side2GroupMap[glyphName] = groupName
+
+    def toDict(self):
+        """
+        Return the groups as a new dict of lists.
+        """
+        return {groupName: list(glyphList) for groupName, glyphList in self.groups.items()}
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        return self.groups == other.groups
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        # the indexes are made again when they are needed
+        return self.__class__, (self.groups,)
+
+    # -------
+    # Indexes
+    # -------
+
+    # The side resolution maps each side1 and side2 name
+    # that has been looked up to a (glyph, group) tuple.
+    # The exception index holds the glyph names that are
+    # in a group, for each side. See MathKerning.cleanup.
+
+    def getSideResolution(self):
+        if self._sideResolution is None:
+            self._sideResolution = ({}, {})
+        return self._sideResolution
+
+    def getExceptionIndex(self):
+        if self._exceptionIndex is None:
+            self._exceptionIndex = (
+                frozenset([name for name in self.side1GroupMap if not name.startswith(side1Prefix)]),
+                frozenset([name for name in self.side2GroupMap if not name.startswith(side2Prefix)])
+            )
+        return self._exceptionIndex
+
+
+_kerningSlots = (
+    "packed", "_kerningDict", "_packedKerning",
+    "_groupTable", "_resolutionIndex"
+)
+
+
 class MathKerning(object):
 
-    def __init__(self, kerning=None, groups=None):
+    __slots__ = _kerningSlots + ("__dict__", "__weakref__")
+
+    def __init__(self, kerning=None, groups=None, packed=False):
+        """Initialize a new MathKerning object.
+
+        Args:
+            kerning: a kerning dict, or None.
+            groups: a groups dict, a KerningGroups table or None.
+                Only the kerning groups are used.
+            packed (bool): when set to True, the kerning is stored as a
+                KerningMatrix: the side names are interned to integer indexes
+                and the values are kept in one array. Math between kernings
+                with the same pairs and math with a factor is then done on the
+                value arrays, and so are round, addTo and the integer
+                conversion of cleanup. The dict is made from the arrays when
+                a dict method needs it.
+        """
         if kerning is None:
             kerning = {}
         if groups is None:
             groups = {}
+        self.packed = packed
         self.update(kerning)
         self.updateGroups(groups)
 
@@ -31,29 +150,70 @@ class MathKerning(object):
     # -------
 
     def update(self, kerning):
-        self._kerning = dict(kerning)
+        kerning = dict(kerning)
+        self._kerningDict = kerning
+        self._packedKerning = None
+        if self.packed:
+            self._packedKerning = KerningMatrix.fromDict(kerning)
+        self._resolutionIndex = None
 
     def updateGroups(self, groups):
-        self._groups = {}
-        self._side1GroupMap = {}
-        self._side2GroupMap = {}
-        self._side1Groups = {}
-        self._side2Groups = {}
-        for groupName, glyphList in groups.items():
-            if groupName.startswith(side1Prefix):
-                self._groups[groupName] = list(glyphList)
-                self._side1Groups[groupName] = glyphList
-                for glyphName in glyphList:
-                    self._side1GroupMap[glyphName] = groupName
-            elif groupName.startswith(side2Prefix):
-                self._groups[groupName] = list(glyphList)
-                self._side2Groups[groupName] = glyphList
-                for glyphName in glyphList:
-                    self._side2GroupMap[glyphName] = groupName
+        if not isinstance(groups, KerningGroups):
+            groups = KerningGroups(groups)
+        self._groupTable = groups
+        self._resolutionIndex = None
 
     def addTo(self, value):
+        if self.packed:
+            matrix = self._packedKerning
+            self._setPackedKerning(matrix.copyWithValues(array("d", [v + value for v in matrix.values])))
+            return
         for k, v in self._kerning.items():
             self._kerning[k] = v + value
+        self._resolutionIndex = None
+
+    # -------
+    # Storage
+    # -------
+
+    def _get_kerning(self):
+        if self._kerningDict is None:
+            self._kerningDict = self._packedKerning.toDict()
+        return self._kerningDict
+
+    def _set_kerning(self, kerning):
+        self.update(kerning)
+
+    _kerning = property(_get_kerning, _set_kerning, doc="""
+        The kerning dict. In packed mode this is made from the
+        matrix when it is first needed and kept until the kerning
+        changes. It must then only be read, the changes are made
+        to the matrix.
+        """)
+
+    def _setPackedKerning(self, matrix):
+        self._packedKerning = matrix
+        self._kerningDict = None
+        self._resolutionIndex = None
+
+    # --------
+    # Pickling
+    # --------
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for attr in _kerningSlots:
+            state[attr] = getattr(self, attr)
+        # the index is made again when it is needed
+        state["_resolutionIndex"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.packed = False
+        self._packedKerning = None
+        self._resolutionIndex = None
+        for attr, value in state.items():
+            setattr(self, attr, value)
 
     # -------------
     # dict Behavior
@@ -69,37 +229,102 @@ class MathKerning(object):
         return self._kerning.items()
 
     def groups(self):
-        return deepcopy(self._groups)
+        return self._groupTable.toDict()
 
     def __contains__(self, pair):
         return pair in self._kerning
 
     def __getitem__(self, pair):
-        if pair in self._kerning:
-            return self._kerning[pair]
+        index = self._resolutionIndex
+        if index is None:
+            index = self._resolutionIndex = dict(self._kerning)
+        if pair in index:
+            return index[pair]
+        value = index[pair] = self._resolvePair(pair)
+        return value
+
+    def get(self, pair):
+        v = self[pair]
+        return v
+
+    def getValues(self, pairs):
+        """
+        Return the values of pairs, an iterable of
+        (side1, side2) tuples, as a list.
+
+        >>> kerning = MathKerning(
+        ...     {("public.kern1.A", "V"): -10, ("A", "V"): -20},
+        ...     {"public.kern1.A": ["A", "Aacute"]}
+        ... )
+        >>> kerning.getValues([("A", "V"), ("Aacute", "V"), ("V", "A")])
+        [-20, -10, 0]
+        """
+        index = self._resolutionIndex
+        if index is None:
+            index = self._resolutionIndex = dict(self._kerning)
+        resolvePair = self._resolvePair
+        values = []
+        append = values.append
+        for pair in pairs:
+            value = index.get(pair)
+            if value is None:
+                value = index[pair] = resolvePair(pair)
+            append(value)
+        return values
+
+    def getSequenceValues(self, glyphNames):
+        """
+        Return the values of the adjacent pairs in
+        a sequence of glyph names, as a list.
+
+        >>> kerning = MathKerning({("A", "V"): -20, ("V", "A"): -15})
+        >>> kerning.getSequenceValues(["V", "A", "V", "B"])
+        [-15, -20, 0]
+        """
+        glyphNames = list(glyphNames)
+        return self.getValues(zip(glyphNames[:-1], glyphNames[1:]))
+
+    # ----------
+    # Resolution
+    # ----------
+
+    # The resolution index maps pairs to their effective
+    # value. It starts as a copy of the kerning and every
+    # pair that is resolved through the groups is added
+    # to it, so each pair is only resolved once. It is
+    # dropped whenever the kerning or the groups change.
+    # The names of the sides are resolved through the side
+    # resolution of the group table, which is kept when the
+    # kerning changes.
+
+    def _resolvePair(self, pair):
+        kerning = self._kerning
+        if pair in kerning:
+            return kerning[pair]
+        groupTable = self._groupTable
+        side1Resolution, side2Resolution = groupTable.getSideResolution()
         side1, side2 = pair
-        if side1.startswith(side1Prefix):
-            side1Group = side1
-            side1 = None
+        if side1 in side1Resolution:
+            side1, side1Group = side1Resolution[side1]
         else:
-            side1Group = self._side1GroupMap.get(side1)
-        if side2.startswith(side2Prefix):
-            side2Group = side2
-            side2 = None
+            side1, side1Group = side1Resolution[side1] = self._resolveSide(side1, side1Prefix, groupTable.side1GroupMap)
+        if side2 in side2Resolution:
+            side2, side2Group = side2Resolution[side2]
         else:
-            side2Group = self._side2GroupMap.get(side2)
-        if (side1Group, side2) in self._kerning:
-            return self._kerning[side1Group, side2]
-        elif (side1, side2Group) in self._kerning:
-            return self._kerning[side1, side2Group]
-        elif (side1Group, side2Group) in self._kerning:
-            return self._kerning[side1Group, side2Group]
+            side2, side2Group = side2Resolution[side2] = self._resolveSide(side2, side2Prefix, groupTable.side2GroupMap)
+        if (side1Group, side2) in kerning:
+            return kerning[side1Group, side2]
+        elif (side1, side2Group) in kerning:
+            return kerning[side1, side2Group]
+        elif (side1Group, side2Group) in kerning:
+            return kerning[side1Group, side2Group]
         else:
             return 0
 
-    def get(self, pair):
-        v = self[pair]
-        return v
+    def _resolveSide(self, name, prefix, groupMap):
+        if name.startswith(prefix):
+            return None, name
+        return name, groupMap.get(name)
 
     # ---------
     # Pair Type
@@ -110,11 +335,11 @@ class MathKerning(object):
         if side1.startswith(side1Prefix):
             side1Group = side1
         else:
-            side1Group = self._side1GroupMap.get(side1)
+            side1Group = self._groupTable.side1GroupMap.get(side1)
         if side2.startswith(side2Prefix):
             side2Group = side2
         else:
-            side2Group = self._side2GroupMap.get(side2)
+            side2Group = self._groupTable.side2GroupMap.get(side2)
         side1Type = side2Type = "glyph"
         if pair in self:
             if side1 == side1Group:
@@ -147,7 +372,12 @@ class MathKerning(object):
     # ----
 
     def copy(self):
-        k = MathKerning(self._kerning, self._groups)
+        if self.packed:
+            k = MathKerning(None, self._groupTable, packed=True)
+            matrix = self._packedKerning
+            k._setPackedKerning(matrix.copyWithValues(matrix.values[:]))
+            return k
+        k = MathKerning(self._kerning, self._groupTable)
         return k
 
     # ----
@@ -157,92 +387,215 @@ class MathKerning(object):
     # math with other kerning
 
     def __add__(self, other):
-        k = self._processMathOne(other, add)
-        k.cleanup()
+        k = self._processMathOne(other, add, cleanup=True)
         return k
 
     def __sub__(self, other):
-        k = self._processMathOne(other, sub)
-        k.cleanup()
+        k = self._processMathOne(other, sub, cleanup=True)
         return k
 
-    def _processMathOne(self, other, funct):
-        comboPairs = set(self._kerning.keys()) | set(other._kerning.keys())
-        kerning = dict.fromkeys(comboPairs, None)
-        for k in comboPairs:
-            v1 = self.get(k)
-            v2 = other.get(k)
-            v = funct(v1, v2)
-            kerning[k] = v
-        g1 = self.groups()
-        g2 = other.groups()
-        if g1 == g2 or not g1 or not g2:
-            groups = g1 or g2
+    def _processMathOne(self, other, funct, cleanup=False):
+        # with cleanup the zero pairs are dropped and the
+        # integral values are made ints while the new
+        # kerning is made, instead of in a second pass.
+        matrix = self._processMathOnePacked(other, funct)
+        groups = self._processMathOneGroups(other)
+        if groups is None:
+            groups = self._groupTable
+        ks = MathKerning(None, groups, packed=self.packed)
+        if matrix is None:
+            items = self._processMathOneItems(other, funct)
+            if cleanup:
+                ks.update(ks._cleanupItems(items))
+            else:
+                ks.update(dict(items))
         else:
-            comboGroups = set(g1.keys()) | set(g2.keys())
-            groups = dict.fromkeys(comboGroups, None)
-            for groupName in comboGroups:
-                s1 = set(g1.get(groupName, []))
-                s2 = set(g2.get(groupName, []))
-                groups[groupName] = sorted(list(s1 | s2))
-        ks = MathKerning(kerning, groups)
+            ks._setPackedKerning(matrix)
+            if cleanup:
+                ks.cleanup()
         return ks
 
+    def _processMathOnePacked(self, other, funct):
+        # returns None unless both kernings are packed
+        # and have the same pairs, so that every value
+        # is explicit and the value arrays are aligned.
+        if not self.packed or not getattr(other, "packed", False):
+            return None
+        matrix1 = self._packedKerning
+        matrix2 = other._packedKerning
+        if not matrix1.isAligned(matrix2):
+            return None
+        return matrix1.copyWithValues(_arrayFunctions[funct](matrix1.values, matrix2.values))
+
+    def _processMathOneItems(self, other, funct):
+        comboPairs = set(self._kerning.keys()) | set(other._kerning.keys())
+        return ((k, funct(self[k], other[k])) for k in comboPairs)
+
+    def _processMathOneGroups(self, other):
+        # returns None when the groups of self are kept
+        if self._groupTable == other._groupTable or not other._groupTable:
+            return None
+        if not self._groupTable:
+            return other._groupTable
+        g1 = self._groupTable.groups
+        g2 = other._groupTable.groups
+        comboGroups = set(g1.keys()) | set(g2.keys())
+        groups = dict.fromkeys(comboGroups, None)
+        for groupName in comboGroups:
+            s1 = set(g1.get(groupName, []))
+            s2 = set(g2.get(groupName, []))
+            groups[groupName] = sorted(list(s1 | s2))
+        return KerningGroups(groups)
+
+    # in-place math with other kerning
+
+    def __iadd__(self, other):
+        self._processMathOneInPlace(other, add)
+        self.cleanup()
+        return self
+
+    def __isub__(self, other):
+        self._processMathOneInPlace(other, sub)
+        self.cleanup()
+        return self
+
+    def _processMathOneInPlace(self, other, funct):
+        # the values are looked up through the groups of
+        # self, so the new kerning is made before either
+        # the kerning or the groups are replaced.
+        matrix = self._processMathOnePacked(other, funct)
+        if matrix is None:
+            kerning = dict(self._processMathOneItems(other, funct))
+        groups = self._processMathOneGroups(other)
+        if matrix is None:
+            self.update(kerning)
+        else:
+            self._setPackedKerning(matrix)
+        if groups is not None:
+            self.updateGroups(groups)
+
     # math with factor
 
     def __mul__(self, factor):
         if isinstance(factor, tuple):
             factor = factor[0]
-        k = self._processMathTwo(factor, mul)
-        k.cleanup()
+        k = self._processMathTwo(factor, mul, cleanup=True)
         return k
 
     def __rmul__(self, factor):
         if isinstance(factor, tuple):
             factor = factor[0]
-        k = self._processMathTwo(factor, mul)
-        k.cleanup()
+        k = self._processMathTwo(factor, mul, cleanup=True)
         return k
 
     def __div__(self, factor):
         if isinstance(factor, tuple):
             factor = factor[0]
-        k = self._processMathTwo(factor, div)
-        k.cleanup()
+        k = self._processMathTwo(factor, div, cleanup=True)
         return k
 
     __truediv__ = __div__
 
-    def _processMathTwo(self, factor, funct):
-        kerning = deepcopy(self._kerning)
-        for k, v in self._kerning.items():
-            v = funct(v, factor)
-            kerning[k] = v
-        ks = MathKerning(kerning, self._groups)
+    def _processMathTwo(self, factor, funct, cleanup=False):
+        ks = MathKerning(None, self._groupTable, packed=self.packed)
+        if self.packed:
+            matrix = self._packedKerning
+            ks._setPackedKerning(matrix.copyWithValues(_arrayFunctions[funct](matrix.values, (factor, factor))))
+            if cleanup:
+                ks.cleanup()
+            return ks
+        items = ((k, funct(v, factor)) for k, v in self._kerning.items())
+        if cleanup:
+            ks.update(ks._cleanupItems(items))
+        else:
+            ks.update(dict(items))
         return ks
 
+    # in-place math with factor
+
+    def __imul__(self, factor):
+        if isinstance(factor, tuple):
+            factor = factor[0]
+        self._processMathTwoInPlace(factor, mul)
+        self.cleanup()
+        return self
+
+    def __idiv__(self, factor):
+        if isinstance(factor, tuple):
+            factor = factor[0]
+        self._processMathTwoInPlace(factor, div)
+        self.cleanup()
+        return self
+
+    __itruediv__ = __idiv__
+
+    def _processMathTwoInPlace(self, factor, funct):
+        if self.packed:
+            matrix = self._packedKerning
+            self._setPackedKerning(matrix.copyWithValues(_arrayFunctions[funct](matrix.values, (factor, factor))))
+            return
+        kerning = self._kerning
+        for k, v in kerning.items():
+            kerning[k] = funct(v, factor)
+        self._resolutionIndex = None
+
     # ---------
     # More math
     # ---------
 
     def round(self, multiple=1):
         multiple = float(multiple)
+        if self.packed:
+            matrix = self._packedKerning
+            values = array("q", [int(round2(int(round2(v / multiple)) * multiple)) for v in matrix.values])
+            self._setPackedKerning(matrix.copyWithValues(values))
+            return
         for k, v in self._kerning.items():
             self._kerning[k] = int(round2(int(round2(v / multiple)) * multiple))
+        self._resolutionIndex = None
 
     # -------
     # Cleanup
     # -------
 
+    # A pair with a zero value is removed unless one of
+    # its sides is an exception. For a pair that is in the
+    # kerning, guessPairType reports a side as an exception
+    # when it is a glyph that is in a kerning group, so the
+    # exception index holds the grouped glyph names of each
+    # side and the test is two set lookups.
+
     def cleanup(self):
-        for (side1, side2), v in list(self._kerning.items()):
+        if self.packed:
+            # integral values are made ints when the dict is made
+            matrix = self._packedKerning
+            structure = matrix.structure
+            side1Exceptions, side2Exceptions = self._groupTable.getExceptionIndex()
+            side1Names = [name in side1Exceptions for name in structure.side1Names]
+            side2Names = [name in side2Exceptions for name in structure.side2Names]
+            remove = [
+                index for index, (v, index1, index2)
+                in enumerate(zip(matrix.values, structure.side1Indexes, structure.side2Indexes))
+                if v == 0 and not side1Names[index1] and not side2Names[index2]
+            ]
+            if remove:
+                self._setPackedKerning(matrix.without(remove))
+            return
+        self._kerningDict = self._cleanupItems(self._kerning.items())
+        self._resolutionIndex = None
+
+    def _cleanupItems(self, items):
+        side1Exceptions, side2Exceptions = self._groupTable.getExceptionIndex()
+        kerning = {}
+        for pair, v in items:
             if int(v) == v:
                 v = int(v)
-                self._kerning[side1, side2] = v
             if v == 0:
-                side1Type, side2Type = self.guessPairType((side1, side2))
-                if side1Type != "exception" and side2Type != "exception":
-                    del self._kerning[side1, side2]
+                side1, side2 = pair
+                if side1 not in side1Exceptions and side2 not in side2Exceptions:
+                    continue
+            kerning[pair] = v
+        return kerning
 
     # ----------
     # Extraction
@@ -281,11 +634,11 @@ class MathKerning(object):
         if lessish is not None:
             return lessish
 
-        lessish = self._isLessish(self._side1Groups, other._side1Groups)
+        lessish = self._isLessish(self._groupTable.side1Groups, other._groupTable.side1Groups)
         if lessish is not None:
             return lessish
 
-        lessish = self._isLessish(self._side2Groups, other._side2Groups)
+        lessish = self._isLessish(self._groupTable.side2Groups, other._groupTable.side2Groups)
         if lessish is not None:
             return lessish
 
@@ -294,13 +647,19 @@ class MathKerning(object):
     def __eq__(self, other):
         if self._kerning != other._kerning:
             return False
-        if self._side1Groups != other._side1Groups:
-            return False
-        if self._side2Groups != other._side2Groups:
+        if self._groupTable != other._groupTable:
             return False
         return True
 
 
+_arrayFunctions = {
+    add: addArray,
+    sub: subArray,
+    mul: mulArray,
+    div: divArray,
+}
+
+
 if __name__ == "__main__":
     import sys
     import doctest
@@ -0,0 +1,149 @@
+from __future__ import absolute_import
+from array import array
+
+"""
+Array backed kerning storage for MathKerning.
+
+The kerning pairs are split into:
+-   a structure holding the pairs: the side1 and side2
+    names, glyphs and groups alike, are interned to
+    integer indexes in two sorted name tuples, and the
+    pairs are two parallel arrays of those indexes,
+    sorted by side1 and then side2. this is a sparse
+    matrix in coordinate format.
+-   values: one array with the value of each pair.
+
+Only the values change during math, so the structure is
+immutable and shared between the operands and the result.
+Two matrices made from the same pairs get equal structures,
+so math between them is done on the value arrays directly.
+"""
+
+__all__ = [
+    "KerningMatrix",
+]
+
+
+class KerningMatrixStructure(object):
+
+    def __init__(self, side1Names, side2Names, side1Indexes, side2Indexes):
+        self.side1Names = side1Names
+        self.side2Names = side2Names
+        self.side1Indexes = side1Indexes
+        self.side2Indexes = side2Indexes
+        self._pairs = None
+
+    @classmethod
+    def fromPairs(cls, pairs):
+        side1Names = tuple(sorted(set([side1 for side1, side2 in pairs])))
+        side2Names = tuple(sorted(set([side2 for side1, side2 in pairs])))
+        side1Map = dict((name, index) for index, name in enumerate(side1Names))
+        side2Map = dict((name, index) for index, name in enumerate(side2Names))
+        indexes = sorted([(side1Map[side1], side2Map[side2]) for side1, side2 in pairs])
+        side1Indexes = array("i", [index1 for index1, index2 in indexes])
+        side2Indexes = array("i", [index2 for index1, index2 in indexes])
+        return cls(side1Names, side2Names, side1Indexes, side2Indexes)
+
+    def __len__(self):
+        return len(self.side1Indexes)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        return (
+            self.side1Indexes == other.side1Indexes
+            and self.side2Indexes == other.side2Indexes
+            and self.side1Names == other.side1Names
+            and self.side2Names == other.side2Names
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def _get_pairs(self):
+        if self._pairs is None:
+            side1Names = self.side1Names
+            side2Names = self.side2Names
+            self._pairs = [
+                (side1Names[index1], side2Names[index2])
+                for index1, index2 in zip(self.side1Indexes, self.side2Indexes)
+            ]
+        return self._pairs
+
+    pairs = property(_get_pairs, doc="The pairs as a list of (side1, side2) tuples, in order.")
+
+
+class KerningMatrix(object):
+
+    def __init__(self, structure, values):
+        self.structure = structure
+        self.values = values
+
+    @classmethod
+    def fromDict(cls, kerning):
+        """
+        Pack a kerning dict.
+
+        >>> matrix = KerningMatrix.fromDict({("B", "A"): -10, ("A", "public.kern2.O"): 5})
+        >>> matrix.structure.side1Names
+        ('A', 'B')
+        >>> matrix.structure.pairs
+        [('A', 'public.kern2.O'), ('B', 'A')]
+        >>> matrix.values
+        array('d', [5.0, -10.0])
+        >>> matrix.toDict() == {("B", "A"): -10, ("A", "public.kern2.O"): 5}
+        True
+        """
+        structure = KerningMatrixStructure.fromPairs(list(kerning.keys()))
+        values = array("d", [kerning[pair] for pair in structure.pairs])
+        return cls(structure, values)
+
+    def toDict(self):
+        """
+        Unpack to a kerning dict. Values that are integral
+        are returned as ints, as MathKerning.cleanup does.
+        """
+        return dict(zip(self.structure.pairs, [
+            int(value) if int(value) == value else value
+            for value in self.values
+        ]))
+
+    def copyWithValues(self, values):
+        """
+        Return a new matrix sharing the structure
+        of self but with different values.
+        """
+        return self.__class__(self.structure, values)
+
+    def isAligned(self, other):
+        """
+        Return True when other has the same pairs,
+        in the same order, as self.
+        """
+        return self.structure == other.structure
+
+    def without(self, indexes):
+        """
+        Return a new matrix without the pairs at indexes.
+        """
+        indexes = set(indexes)
+        keep = [index for index in range(len(self.values)) if index not in indexes]
+        structure = self.structure
+        side1Indexes = structure.side1Indexes
+        side2Indexes = structure.side2Indexes
+        values = self.values
+        structure = KerningMatrixStructure(
+            structure.side1Names, structure.side2Names,
+            array("i", [side1Indexes[index] for index in keep]),
+            array("i", [side2Indexes[index] for index in keep])
+        )
+        return self.__class__(structure, array(values.typecode, [values[index] for index in keep]))
+
+    def __len__(self):
+        return len(self.values)
+
+
+if __name__ == "__main__":
+    import sys
+    import doctest
+    sys.exit(doctest.testmod().failed)
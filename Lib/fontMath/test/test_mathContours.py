@@ -0,0 +1,141 @@
+import unittest
+from array import array
+from fontMath.mathContours import PackedContours
+
+
+class _TestPointPen(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.calls.append(("beginPath", identifier))
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None,
+                 identifier=None, **kwargs):
+        self.calls.append(("addPoint", pt, segmentType, smooth, name,
+                           identifier))
+
+    def endPath(self):
+        self.calls.append(("endPath",))
+
+
+class PackedContoursTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    def _makeContours(self):
+        return [
+            dict(identifier="contour 1",
+                 points=[("curve", (0, 100), False, "name 1", "point 1"),
+                         (None, (50, 100), False, None, None),
+                         (None, (100, 50), False, None, None),
+                         ("curve", (100, 0), True, None, None)]),
+            dict(identifier=None,
+                 points=[("line", (10.5, 20.5), False, None, None),
+                         ("line", (30, 40), False, None, None)])
+        ]
+
+    def test_fromContours(self):
+        packed = PackedContours.fromContours(self._makeContours())
+        self.assertEqual(
+            packed.coordinates,
+            array("d", [0, 100, 50, 100, 100, 50, 100, 0,
+                        10.5, 20.5, 30, 40])
+        )
+        self.assertEqual(packed.contourEnds, (4, 6))
+        self.assertEqual(packed.contourIdentifiers, ("contour 1", None))
+        self.assertEqual(
+            packed.pointInfo[0], ("curve", False, "name 1", "point 1"))
+        self.assertEqual(len(packed), 6)
+
+    def test_fromContours_empty(self):
+        packed = PackedContours.fromContours([])
+        self.assertEqual(len(packed), 0)
+        self.assertEqual(packed.toContours(), [])
+
+    def test_toContours(self):
+        contours = self._makeContours()
+        packed = PackedContours.fromContours(contours)
+        self.assertEqual(packed.toContours(), contours)
+
+    def test_copyWithCoordinates(self):
+        packed = PackedContours.fromContours(self._makeContours())
+        coordinates = array("d", range(12))
+        copied = packed.copyWithCoordinates(coordinates)
+        self.assertIs(copied.coordinates, coordinates)
+        self.assertIs(copied.pointInfo, packed.pointInfo)
+        self.assertIs(copied.contourEnds, packed.contourEnds)
+
+    def test_isCompatible(self):
+        packed1 = PackedContours.fromContours(self._makeContours())
+        packed2 = PackedContours.fromContours(self._makeContours()[:1])
+        self.assertTrue(packed1.isCompatible(packed1))
+        self.assertFalse(packed1.isCompatible(packed2))
+
+    def test_eq(self):
+        packed1 = PackedContours.fromContours(self._makeContours())
+        packed2 = PackedContours.fromContours(self._makeContours())
+        self.assertEqual(packed1, packed2)
+        packed2.coordinates[0] = 1
+        self.assertNotEqual(packed1, packed2)
+        self.assertNotEqual(packed1, "foo")
+
+    def test_drawPoints(self):
+        packed = PackedContours.fromContours(self._makeContours())
+        pen = _TestPointPen()
+        packed.drawPoints(pen)
+        self.assertEqual(
+            pen.calls,
+            [
+                ("beginPath", "contour 1"),
+                ("addPoint", (0, 100), "curve", False, "name 1", "point 1"),
+                ("addPoint", (50, 100), None, False, None, None),
+                ("addPoint", (100, 50), None, False, None, None),
+                ("addPoint", (100, 0), "curve", True, None, None),
+                ("endPath",),
+                ("beginPath", None),
+                ("addPoint", (10.5, 20.5), "line", False, None, None),
+                ("addPoint", (30, 40), "line", False, None, None),
+                ("endPath",),
+            ]
+        )
+
+    def test_round(self):
+        packed = PackedContours.fromContours(self._makeContours())
+        rounded = packed.round()
+        self.assertEqual(
+            list(rounded.coordinates),
+            [0, 100, 50, 100, 100, 50, 100, 0, 10, 20, 30, 40]
+        )
+        self.assertIsInstance(rounded.toContours()[1]["points"][0][1][0], int)
+        rounded = packed.round(1)
+        self.assertEqual(rounded.coordinates[8], 10.5)
+
+    def test_transform(self):
+        packed = PackedContours.fromContours(self._makeContours())
+        transformed = packed.transform((2, 0, 0, 1, 10, 0))
+        self.assertIs(transformed.pointInfo, packed.pointInfo)
+        self.assertEqual(list(transformed.coordinates[:4]), [10, 100, 110, 100])
+
+    def test_join(self):
+        contours = self._makeContours()
+        packed1 = PackedContours.fromContours(contours[:1])
+        packed2 = PackedContours.fromContours(contours[1:]).round()
+        joined = PackedContours.join([packed1, packed2])
+        self.assertEqual(joined.coordinates.typecode, "d")
+        self.assertEqual(joined.contourEnds, (4, 6))
+        self.assertEqual(joined.toContours()[0], contours[0])
+        self.assertEqual(joined.toContours()[1]["points"][0][1], (10, 20))
+        self.assertEqual(PackedContours.join([]).toContours(), [])
+
+    def test_withoutIdentifiers(self):
+        packed = PackedContours.fromContours(self._makeContours())
+        stripped = packed.withoutIdentifiers()
+        self.assertIs(stripped.coordinates, packed.coordinates)
+        self.assertEqual(stripped.contourIdentifiers, (None, None))
+        self.assertEqual(stripped.pointInfo[0], ("curve", False, "name 1", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
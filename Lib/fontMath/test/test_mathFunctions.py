@@ -1,7 +1,11 @@
 import unittest
+from array import array
 from fontTools.misc.fixedTools import otRound
 from fontMath.mathFunctions import (
-    add, addPt, sub, subPt, mul, mulPt, div, divPt, factorAngle, _roundNumber,
+    add, addPt, sub, subPt, mul, mulPt, div, divPt,
+    addArray, subArray, mulArray, divArray, interpolate, interpolatePt,
+    interpolateArray, linearCombinationArray, transformPt, transformArray,
+    factorAngle, transformAngle, _roundNumber,
     setRoundIntegerFunction, setRoundFloatFunction,
     _ROUND_INTEGER_FUNC, _ROUND_FLOAT_FUNC, round2
 )
@@ -46,6 +50,84 @@ class MathFunctionsTest(unittest.TestCase):
     def test_divPt(self):
         self.assertEqual(divPt((15, 75), (2, 3)), (7.5, 25.0))
 
+    def test_addArray(self):
+        self.assertEqual(
+            addArray(array("d", [20, 230, 1, 2]), array("d", [50, 40, 3, 4])),
+            array("d", [70, 270, 4, 6])
+        )
+
+    def test_subArray(self):
+        self.assertEqual(
+            subArray(array("d", [20, 230, 1, 2]), array("d", [50, 40, 3, 4])),
+            array("d", [-30, 190, -2, -2])
+        )
+
+    def test_mulArray(self):
+        self.assertEqual(
+            mulArray(array("d", [15, 25, 1, 2]), (2, 3)),
+            array("d", [30, 75, 2, 6])
+        )
+        self.assertEqual(
+            mulArray(array("q", [15, 25, 1, 2]), (2, 2)),
+            array("d", [30, 50, 2, 4])
+        )
+
+    def test_divArray(self):
+        self.assertEqual(
+            divArray(array("d", [15, 75, 1, 2]), (2, 3)),
+            array("d", [7.5, 25, 0.5, 2 / 3])
+        )
+        with self.assertRaises(ZeroDivisionError):
+            divArray(array("d", [1, 2]), (0, 0))
+
+    def test_interpolate(self):
+        self.assertEqual(interpolate(10, 20, 0.25), 12.5)
+        self.assertEqual(interpolate(10, 20, 0.3), 10 + (20 - 10) * 0.3)
+
+    def test_interpolatePt(self):
+        self.assertEqual(interpolatePt((10, 20), (20, 40), (0.5, 0.25)),
+                         (15, 25))
+
+    def test_interpolateArray(self):
+        a1 = array("d", [10, 20, 0.1, 0.7])
+        a2 = array("d", [20, 40, 0.2, 1.1])
+        self.assertEqual(
+            interpolateArray(a1, a2, (0.5, 0.25)),
+            array("d", [15, 25, 0.1 + (0.2 - 0.1) * 0.5,
+                        0.7 + (1.1 - 0.7) * 0.25])
+        )
+        self.assertEqual(
+            interpolateArray(a1, a2, (0.3, 0.3)),
+            addArray(a1, mulArray(subArray(a2, a1), (0.3, 0.3)))
+        )
+
+    def test_linearCombinationArray(self):
+        a1 = array("d", [10, 20, 0.1, 0.7])
+        a2 = array("d", [20, 40, 0.2, 1.1])
+        a3 = array("d", [1, 2, 3, 4])
+        self.assertEqual(
+            linearCombinationArray([a1, a2, a3],
+                                   [(0.5, 0.5), (0.25, 2), (1, -1)]),
+            addArray(addArray(mulArray(a1, (0.5, 0.5)),
+                              mulArray(a2, (0.25, 2))),
+                     mulArray(a3, (1, -1)))
+        )
+
+    def test_transformPt(self):
+        self.assertEqual(transformPt((10, 20), (2, 0, 0, 3, 1, 2)), (21, 62))
+        self.assertEqual(transformPt((10, 20), (1, 0, 0.5, 1, 0, 0)), (20, 20))
+
+    def test_transformArray(self):
+        self.assertEqual(
+            transformArray(array("d", [10, 20, 1, 2]), (1, 0.5, 0.5, 1, 1, 2)),
+            array("d", [21, 27, 3, 4.5])
+        )
+
+    def test_transformAngle(self):
+        self.assertAlmostEqual(transformAngle(90, (1, 0, 1, 1, 0, 0)), 45)
+        self.assertAlmostEqual(transformAngle(30, (1, 0, 0, 1, 50, 50)), 30)
+        self.assertAlmostEqual(transformAngle(0, (0, 1, -1, 0, 0, 0)), 90)
+
     def test_factorAngle(self):
         f = factorAngle(5, (2, 1.5), mul)
         self.assertEqual(_roundNumber(f, 2), 3.75)
@@ -1,12 +1,17 @@
 from __future__ import division
+import math
 import unittest
+from fontTools.misc.transform import Transform
 from fontTools.pens.pointPen import AbstractPointPen
 from fontMath.mathFunctions import addPt, mulPt
 from fontMath.mathGlyph import (
-    MathGlyph, MathGlyphPen, FilterRedundantPointPen,
-    _processMathOneContours, _processMathTwoContours, _anchorTree,
-    _pairAnchors, _processMathOneAnchors, _processMathTwoAnchors,
-    _pairComponents, _processMathOneComponents, _processMathTwoComponents,
+    MathGlyph, MathGlyphPen, FilterRedundantPointPen, MathGlyphPairing,
+    LazyMathGlyph, MathGlyphDeltaCache, DecomposedOutlineCache, linearCombination, batchLinearCombination,
+    batchInterpolate, checkCompatibility,
+    _processMathOneContours, _processMathTwoContours, _filterRedundantPoints,
+    _anchorTree, _pairAnchors, _pairAnchorIndexes, _processMathOneAnchors,
+    _processMathTwoAnchors, _pairComponents, _pairComponentIndexes,
+    _processMathOneComponents, _processMathTwoComponents,
     _expandImage, _compressImage, _pairImages, _processMathOneImage,
     _processMathTwoImage, _processMathOneTransformation,
     _processMathTwoTransformation, _roundContours, _roundTransformation,
@@ -515,6 +520,1089 @@ class MathGlyphTest(unittest.TestCase):
         glyph2 = glyph1.copy()
         self.assertEqual(glyph1, glyph2)
 
+    def test_pickle(self):
+        import pickle
+        glyph1 = MathGlyphInterpolateTest("test_interpolate")._setupTestGlyph()
+        glyph1.lib = {"foo": "bar"}
+        self.assertEqual(vars(glyph1), {})
+        for glyph in (glyph1, glyph1 * 2, glyph1.copy(), MathGlyph(glyph1, packed=True)):
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                self.assertEqual(glyph, pickle.loads(pickle.dumps(glyph, protocol)))
+
+    def test_lib_copy_on_write(self):
+        source = self._setupTestGlyph()
+        source.unicodes = []
+        source.lib = {"foo": {"bar": [1, 2]}}
+        glyph1 = MathGlyph(source)
+        lib = glyph1._peekLib()
+        glyph2 = glyph1 * 2
+        glyph3 = glyph2.copy()
+        # a lib that was not handed out is shared until it is read
+        self.assertIs(glyph1._peekLib(), lib)
+        self.assertIs(glyph2._peekLib(), lib)
+        self.assertIs(glyph3._peekLib(), lib)
+        glyph3.lib["foo"]["bar"].append(3)
+        self.assertEqual(glyph1.lib, {"foo": {"bar": [1, 2]}})
+        self.assertEqual(glyph2.lib, {"foo": {"bar": [1, 2]}})
+        self.assertIsNot(glyph2.lib, glyph1.lib)
+        self.assertIs(glyph2.lib, glyph2.lib)
+        glyph2.lib = {"baz": 1}
+        self.assertEqual(glyph2.lib, {"baz": 1})
+        self.assertEqual(glyph3.lib, {"foo": {"bar": [1, 2, 3]}})
+
+    def test_lib_edit_source(self):
+        glyph = self._setupTestGlyph()
+        glyph.lib = {"foo": {"a": 1}}
+        for copied in (glyph.copy(), glyph * 2):
+            glyph.lib["foo"]["a"] = 2
+            glyph.lib["bar"] = 1
+            self.assertEqual(copied.lib, {"foo": {"a": 1}})
+            glyph.lib = {"foo": {"a": 1}}
+        self.assertEqual(glyph.lib, {"foo": {"a": 1}})
+        # comparing does not copy the libs
+        copied = glyph.copy()
+        self.assertEqual(copied, glyph)
+        self.assertIsNotNone(copied._sharedLib)
+
+    def test_lib_held_reference(self):
+        glyph = self._setupTestGlyph()
+        glyph.lib = {"k": 1}
+        for lib in (glyph.lib, glyph._peekLib()):
+            result = glyph * 2
+            copied = glyph.copy()
+            lib["leak"] = 1
+            self.assertEqual(result.lib, {"k": 1})
+            self.assertEqual(copied.lib, {"k": 1})
+            # the held dict is still the lib of the glyph
+            self.assertIs(glyph.lib, lib)
+            del lib["leak"]
+        # the same when the lib is set from a dict that is kept
+        lib = {"k": 1}
+        glyph.lib = lib
+        result = glyph + glyph
+        lib["leak"] = 1
+        self.assertEqual(result.lib, {"k": 1})
+
+    def test_copy_structures(self):
+        glyph1 = MathGlyphInterpolateTest("test_interpolate")._setupTestGlyph()
+        glyph1.unicodes = None
+        glyph1.image["transformation"] = (2, 0, 0, 2, 5, 5)
+        glyph2 = glyph1.copy()
+        self.assertEqual(glyph1, glyph2)
+        self.assertIsNone(glyph2.unicodes)
+        self.assertEqual(glyph2.image["transformation"], (2, 0, 0, 2, 5, 5))
+        # point tuples are shared
+        self.assertIs(glyph1.contours[0]["points"][0],
+                      glyph2.contours[0]["points"][0])
+        # containers are not
+        glyph2.contours[0]["points"].pop()
+        glyph2.components[0]["baseGlyph"] = "C"
+        glyph2.anchors[0]["x"] = 1000
+        glyph2.guidelines[0]["x"] = 1000
+        glyph2.image["fileName"] = "other.png"
+        self.assertEqual(len(glyph1.contours[0]["points"]), 4)
+        self.assertEqual(glyph1.components[0]["baseGlyph"], "A")
+        self.assertNotEqual(glyph1.anchors[0]["x"], 1000)
+        self.assertNotEqual(glyph1.guidelines[0]["x"], 1000)
+        self.assertEqual(glyph1.image["fileName"], "image.png")
+
+
+class MathGlyphPackedTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    def _setupTestGlyph(self, packed=True, offset=0):
+        glyph = MathGlyph(None)
+        glyph.width = 100
+        glyph.height = 200
+        glyph.unicodes = []
+        glyph.contours = [
+            dict(identifier="contour 1",
+                 points=[("curve", (0 + offset, 100), False, "name 1", "1"),
+                         (None, (50 + offset, 100), False, None, None),
+                         (None, (100 + offset, 50), False, None, None),
+                         ("curve", (100 + offset, 0), True, None, None)]),
+            dict(identifier=None,
+                 points=[("line", (10 + offset, 20), False, None, None)])
+        ]
+        return MathGlyph(glyph, packed=packed)
+
+    def test_init(self):
+        glyph = self._setupTestGlyph()
+        self.assertTrue(glyph.packed)
+        self.assertIsNotNone(glyph._packedContours)
+        self.assertEqual(glyph, self._setupTestGlyph(packed=False))
+
+    def test_math(self):
+        packed1 = self._setupTestGlyph()
+        packed2 = self._setupTestGlyph(offset=10)
+        unpacked1 = self._setupTestGlyph(packed=False)
+        unpacked2 = self._setupTestGlyph(packed=False, offset=10)
+        results = [
+            (packed1 + packed2, unpacked1 + unpacked2),
+            (packed1 - packed2, unpacked1 - unpacked2),
+            (packed1 * 2, unpacked1 * 2),
+            (packed1 * (2, 3), unpacked1 * (2, 3)),
+            (packed1 / 2, unpacked1 / 2),
+            (packed1 + (packed2 - packed1) * 0.25,
+             unpacked1 + (unpacked2 - unpacked1) * 0.25),
+            (packed1 + unpacked2, unpacked1 + unpacked2),
+            (packed1.round(), unpacked1.round()),
+        ]
+        for packedResult, unpackedResult in results:
+            self.assertTrue(packedResult.packed)
+            self.assertIsNotNone(packedResult._packedContours)
+            self.assertEqual(packedResult, unpackedResult)
+            self.assertEqual(packedResult.contours, unpackedResult.contours)
+
+    def test_math_operands_stay_packed(self):
+        unpacked = self._setupTestGlyph(packed=False)
+        packed = self._setupTestGlyph(offset=10)
+        packedContours = packed._packedContours
+        unpacked + packed
+        unpacked - packed
+        unpacked.interpolate(packed, 0.5)
+        linearCombination([(unpacked, 0.5), (packed, 0.5)])
+        self.assertIs(packed._packedContours, packedContours)
+        self.assertIsNone(packed._contours)
+
+    def test_math_incompatible(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph()
+        glyph2.contours = glyph2.contours[:1]
+        with self.assertRaises(IndexError):
+            glyph1 + glyph2
+
+    def test_contours_unpack(self):
+        glyph = self._setupTestGlyph()
+        glyph.contours[1]["points"][0] = ("line", (0, 0), False, None, None)
+        self.assertIsNone(glyph._packedContours)
+        glyph = glyph * 2
+        self.assertEqual(glyph.contours[1]["points"][0][1], (0, 0))
+
+    def test_drawPoints(self):
+        pen = MathGlyphPen(strict=True)
+        self._setupTestGlyph().drawPoints(pen)
+        self.assertEqual(
+            pen.contours, self._setupTestGlyph(packed=False).contours)
+
+    def test_copy(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = glyph1.copy()
+        self.assertTrue(glyph2.packed)
+        self.assertEqual(glyph1, glyph2)
+        packed1 = glyph1._packedContours
+        packed2 = glyph2._packedContours
+        self.assertIs(packed1.pointInfo, packed2.pointInfo)
+        self.assertIsNot(packed1.coordinates, packed2.coordinates)
+
+
+class MathGlyphSinglePrecisionTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    def _setupTestGlyph(self, offset=0):
+        glyph = MathGlyphPackedTest._setupTestGlyph(self, packed=False, offset=offset)
+        return MathGlyph(glyph, singlePrecision=True)
+
+    def assertSinglePrecision(self, glyph):
+        self.assertTrue(glyph.singlePrecision)
+        self.assertTrue(glyph.packed)
+        self.assertEqual(glyph._packedContours.coordinates.typecode, "f")
+
+    def test_init(self):
+        glyph = self._setupTestGlyph()
+        self.assertSinglePrecision(glyph)
+        self.assertSinglePrecision(glyph.copy())
+        self.assertEqual(
+            glyph.contours,
+            MathGlyphPackedTest._setupTestGlyph(self, packed=False).contours
+        )
+
+    def test_math(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=0.1)
+        for result in (glyph1 + glyph2, glyph1 - glyph2, glyph1 * 2,
+                       glyph1 / 3, glyph1.interpolate(glyph2, 0.3),
+                       linearCombination([(glyph1, 0.5), (glyph2, 0.5)])):
+            self.assertSinglePrecision(result)
+        result = glyph1.interpolate(glyph2, 0.3)
+        self.assertAlmostEqual(result.contours[0]["points"][0][1][0], 0.03, places=6)
+        self.assertNotEqual(result.contours[0]["points"][0][1][0], 0.03)
+
+    def test_round(self):
+        glyph = self._setupTestGlyph(offset=0.1)
+        rounded = glyph.round()
+        self.assertFalse(rounded.singlePrecision)
+        self.assertEqual(rounded._packedContours.coordinates.typecode, "q")
+        self.assertEqual(rounded.contours[0]["points"][0][1], (0, 100))
+        rounded = glyph.round(digits=2)
+        self.assertEqual(rounded._packedContours.coordinates.typecode, "d")
+        self.assertEqual(rounded.contours[1]["points"][0][1], (10.1, 20))
+
+
+class MathGlyphInterpolateTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    def _setupTestGlyph(self, offset=0, packed=False,
+                        scaleComponentTransform=True):
+        glyph = MathGlyph(None)
+        glyph.width = 100 + offset
+        glyph.height = 200 - offset
+        glyph.unicodes = [65]
+        glyph.contours = [
+            dict(identifier="contour 1",
+                 points=[("curve", (0.1 + offset, 100), False, "name 1", "1"),
+                         (None, (50, 100.3 + offset), False, None, None),
+                         (None, (100 - offset, 50), False, None, None),
+                         ("curve", (100, 0 + offset), True, None, None)])
+        ]
+        glyph.components = [
+            dict(baseGlyph="A", identifier=None,
+                 transformation=(1, 0, 0.1 * offset, 1 + offset, offset, 3)),
+            dict(baseGlyph="B", identifier="1",
+                 transformation=(1, 0, 0, 1, 0, -offset))
+        ]
+        glyph.anchors = [
+            dict(x=10 + offset, y=20, name="top", identifier=None,
+                 color=None),
+            dict(x=30, y=40 - offset, name="bottom", identifier="1",
+                 color=None)
+        ]
+        glyph.guidelines = [
+            dict(x=1, y=2 + offset, angle=10 + offset * 5, name="foo",
+                 identifier="1", color=None)
+        ]
+        glyph.image = dict(fileName="image.png",
+                           transformation=(1, 0, 0, 1, offset, 0),
+                           color=None)
+        return MathGlyph(glyph, packed=packed,
+                         scaleComponentTransform=scaleComponentTransform)
+
+    def test_interpolate(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=7)
+        for factor in (0, 0.3, 1, 1.5, (0.2, 0.7)):
+            self.assertEqual(
+                glyph1.interpolate(glyph2, factor),
+                glyph1 + (glyph2 - glyph1) * factor
+            )
+
+    def test_interpolate_packed(self):
+        glyph1 = self._setupTestGlyph(packed=True)
+        glyph2 = self._setupTestGlyph(offset=7, packed=True)
+        for factor in (0.3, (0.2, 0.7)):
+            result = glyph1.interpolate(glyph2, factor)
+            self.assertIsNotNone(result._packedContours)
+            self.assertEqual(result, glyph1 + (glyph2 - glyph1) * factor)
+
+    def test_interpolate_guidelineOrder(self):
+        # "bar" pairs on its exact position, "foo" only on its
+        # name, so interpolate lists "bar" first while the
+        # expression keeps the order of glyph1.
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=7)
+        for glyph in (glyph1, glyph2):
+            glyph.guidelines.append(
+                dict(x=5, y=5, angle=0, name="bar", identifier="2",
+                     color=None))
+        expected = glyph1 + (glyph2 - glyph1) * 0.5
+        results = [glyph1.interpolate(glyph2, 0.5),
+                   batchInterpolate(glyph1, glyph2, [0.5])[0]]
+        self.assertEqual(
+            [guideline["name"] for guideline in results[0].guidelines],
+            ["bar", "foo"])
+        self.assertEqual(
+            [guideline["name"] for guideline in expected.guidelines],
+            ["foo", "bar"])
+        for result in results:
+            self.assertEqual(
+                sorted(result.guidelines, key=lambda g: g["name"]),
+                sorted(expected.guidelines, key=lambda g: g["name"]))
+
+    def test_interpolate_scaleComponentTransform(self):
+        glyph1 = self._setupTestGlyph(scaleComponentTransform=False)
+        glyph2 = self._setupTestGlyph(offset=4, scaleComponentTransform=False)
+        result = glyph1.interpolate(glyph2, 0.5)
+        self.assertEqual(result, glyph1 + (glyph2 - glyph1) * 0.5)
+        self.assertEqual(result.components[0]["transformation"],
+                         (1, 0, 0.4, 5, 2, 3))
+
+    def test_interpolate_different_image(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=7)
+        glyph2.image = dict(fileName="other.png",
+                            transformation=(1, 0, 0, 1, 0, 0), color=None)
+        result = glyph1.interpolate(glyph2, 0.5)
+        self.assertEqual(result.image, _expandImage(None))
+        self.assertEqual(result, glyph1 + (glyph2 - glyph1) * 0.5)
+
+
+class MathGlyphInPlaceTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    def test_inplace(self):
+        for packed in (False, True):
+            glyph2 = self._setupTestGlyph(offset=3, packed=packed)
+            for func, inPlaceFunc in (
+                    (lambda g: g + glyph2, lambda g: g.__iadd__(glyph2)),
+                    (lambda g: g - glyph2, lambda g: g.__isub__(glyph2)),
+                    (lambda g: g * 2, lambda g: g.__imul__(2)),
+                    (lambda g: g * (2, 0.5), lambda g: g.__imul__((2, 0.5))),
+                    (lambda g: g / 4, lambda g: g.__itruediv__(4))):
+                glyph1 = self._setupTestGlyph(packed=packed)
+                lib = glyph1.lib
+                expected = func(glyph1)
+                result = inPlaceFunc(glyph1)
+                self.assertIs(result, glyph1)
+                self.assertIs(glyph1.lib, lib)
+                self.assertEqual(glyph1, expected)
+
+    def test_inplace_unpaired(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=3)
+        glyph2.components = glyph2.components[1:]
+        expected = glyph1 + glyph2
+        glyph1 += glyph2
+        self.assertEqual(glyph1, expected)
+        self.assertEqual(len(glyph1.components), 1)
+
+    def test_inplace_self(self):
+        glyph = self._setupTestGlyph()
+        glyph += glyph
+        self.assertEqual(glyph, self._setupTestGlyph() * 2)
+
+    def test_inplace_accumulate(self):
+        glyphs = [self._setupTestGlyph(offset=offset) for offset in (0, 3, 11)]
+        weights = (0.2, 0.3, 0.5)
+        result = glyphs[0] * weights[0]
+        for glyph, weight in zip(glyphs[1:], weights[1:]):
+            result += glyph * weight
+        expected = glyphs[0] * weights[0]
+        for glyph, weight in zip(glyphs[1:], weights[1:]):
+            expected = expected + glyph * weight
+        self.assertEqual(result, expected)
+
+    def test_inplace_lazy(self):
+        glyph = MathGlyph(self._setupTestGlyph(), lazy=True)
+        result = glyph
+        result += glyph
+        self.assertIsInstance(result, LazyMathGlyph)
+        self.assertIsNot(result, glyph)
+
+
+class MathGlyphTransformTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    matrices = [
+        (1, 0, 0, 1, 10, -20),
+        (2, 0, 0, 0.5, 0, 0),
+        (1, 0, 0.2, 1, 0, 0),
+        Transform().rotate(0.5).scale(1.5, 0.75).translate(3, 4),
+    ]
+
+    def test_transform_pen(self):
+        from fontTools.pens.transformPen import TransformPointPen
+        glyph = self._setupTestGlyph()
+        for matrix in self.matrices:
+            pen = MathGlyphPen(strict=True)
+            glyph.drawPoints(TransformPointPen(pen, matrix))
+            result = glyph.transform(matrix)
+            self.assertEqual(result.contours, pen.contours)
+            self.assertEqual(result.components, pen.components)
+            self.assertEqual(result.width, glyph.width)
+            self.assertEqual(result.lib, glyph.lib)
+
+    def test_transform_anchors_guidelines_image(self):
+        glyph = self._setupTestGlyph()
+        matrix = Transform().rotate(math.radians(30)).translate(10, 0)
+        result = glyph.transform(matrix)
+        anchor = result.anchors[0]
+        self.assertEqual((anchor["x"], anchor["y"]), matrix.transformPoint((10, 20)))
+        guideline = result.guidelines[0]
+        self.assertEqual((guideline["x"], guideline["y"]), matrix.transformPoint((1, 2)))
+        self.assertAlmostEqual(guideline["angle"], 40)
+        self.assertEqual(result.image["transformation"], tuple(matrix))
+        # slanting a vertical guideline
+        glyph.guidelines[0]["angle"] = 90
+        result = glyph.transform((1, 0, 1, 1, 0, 0))
+        self.assertAlmostEqual(result.guidelines[0]["angle"], 45)
+        result = glyph.transform((-1, 0, 0, 1, 0, 0))
+        self.assertAlmostEqual(result.guidelines[0]["angle"], 90)
+        glyph.guidelines[0]["angle"] = 10
+        result = glyph.transform((-1, 0, 0, 1, 0, 0))
+        self.assertAlmostEqual(result.guidelines[0]["angle"], 170)
+
+    def test_transform_packed(self):
+        for matrix in self.matrices:
+            packed = self._setupTestGlyph(packed=True).transform(matrix)
+            self.assertIsNotNone(packed._packedContours)
+            self.assertEqual(packed, self._setupTestGlyph().transform(matrix))
+
+    def test_transform_geometryOnly(self):
+        glyph = MathGlyph(self._setupTestGlyph(), geometryOnly=True)
+        result = glyph.transform((2, 0, 0, 2, 0, 0))
+        self.assertEqual(result.contours, (glyph * 2).contours)
+        self.assertEqual(result.anchors, [])
+
+
+class MathGlyphDecomposeTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    def _setupTestGlyphs(self, packed=False):
+        glyphs = {}
+
+        def makeGlyph(glyphName, contours=(), components=()):
+            glyph = MathGlyph(None)
+            glyph.name = glyphName
+            glyph.unicodes = []
+            glyph.width = 500
+            glyph.height = 700
+            glyph.contours = [
+                dict(identifier=None, points=[
+                    (segmentType, pt, False, None, None)
+                    for segmentType, pt in points
+                ])
+                for points in contours
+            ]
+            glyph.components = [
+                dict(baseGlyph=baseGlyph, transformation=transformation,
+                     identifier=None)
+                for baseGlyph, transformation in components
+            ]
+            glyphs[glyphName] = MathGlyph(glyph, packed=packed)
+
+        makeGlyph("o", contours=[
+            [("curve", (0, 0)), (None, (10, 20)), (None, (30, 40)),
+             ("curve", (50, 0))],
+            [("line", (10, 10)), ("line", (20, 10)), ("line", (15, 20))]
+        ])
+        makeGlyph("acute", contours=[
+            [("line", (0, 500)), ("line", (50, 600)), ("line", (40, 610))]
+        ])
+        makeGlyph("oacute", components=[
+            ("o", (1, 0, 0, 1, 0, 0)),
+            ("acute", (1, 0, 0, 1, 100, 0))
+        ])
+        makeGlyph("oacute.sc", components=[
+            ("oacute", (0.8, 0, 0, 0.8, 0, 0))
+        ])
+        makeGlyph("oacute.ss01", contours=[
+            [("line", (0, 0)), ("line", (5, 5)), ("line", (0, 5))]
+        ], components=[
+            ("oacute.sc", (1, 0, 0.2, 1, 10, 0)),
+            ("missing", (1, 0, 0, 1, 0, 0))
+        ])
+        return glyphs
+
+    def _decomposeWithPens(self, glyph, glyphs):
+        from fontTools.pens.transformPen import TransformPointPen
+
+        class DecomposingPointPen(TransformPointPen):
+            def addComponent(self, baseGlyph, transformation, identifier=None):
+                if baseGlyph not in glyphs:
+                    return
+                transformation = Transform(*self._transformation).transform(transformation)
+                glyphs[baseGlyph].drawPoints(DecomposingPointPen(self._outPen, transformation))
+
+        pen = MathGlyphPen(strict=True)
+        glyph.drawPoints(DecomposingPointPen(pen, Transform()))
+        return pen.contours
+
+    def test_decompose(self):
+        for packed in (False, True):
+            glyphs = self._setupTestGlyphs(packed=packed)
+            cache = DecomposedOutlineCache(glyphs)
+            for glyphName, glyph in sorted(glyphs.items()):
+                expected = self._decomposeWithPens(glyph, glyphs)
+                for result in (glyph.decompose(glyphs),
+                               glyph.decompose(glyphs, cache)):
+                    self.assertEqual(result.components, [])
+                    self.assertEqual(result.packed, packed)
+                    self.assertEqual(len(result.contours), len(expected))
+                    for contour, expectedContour in zip(result.contours, expected):
+                        for point, expectedPoint in zip(contour["points"], expectedContour["points"]):
+                            self.assertEqual(point[0], expectedPoint[0])
+                            self.assertAlmostEqual(point[1][0], expectedPoint[1][0])
+                            self.assertAlmostEqual(point[1][1], expectedPoint[1][1])
+                    self.assertEqual(result.width, glyph.width)
+
+    def test_cache(self):
+        glyphs = self._setupTestGlyphs(packed=True)
+        cache = DecomposedOutlineCache(glyphs)
+        glyphs["oacute.ss01"].decompose(glyphs, cache)
+        self.assertEqual(sorted(cache._outlines),
+                         ["acute", "o", "oacute", "oacute.sc"])
+        self.assertIsNone(cache.getOutline("missing"))
+        outline = cache.getOutline("oacute")
+        self.assertIs(cache.getOutline("oacute"), outline)
+        transformed = cache.getOutline("oacute", (0.8, 0, 0, 0.8, 0, 0))
+        self.assertIs(cache.getOutline("oacute", (0.8, 0, 0, 0.8, 0, 0)), transformed)
+        cache.clear()
+        self.assertEqual(cache._outlines, {})
+
+    def test_identifiers(self):
+        glyphs = self._setupTestGlyphs()
+        contours = glyphs["o"].contours
+        contours[0]["identifier"] = "contour 1"
+        contours[0]["points"][0] = ("curve", (0, 0), False, "name", "point 1")
+        glyphs["o"].contours = contours
+        result = glyphs["o"].decompose(glyphs)
+        self.assertEqual(result.contours[0]["identifier"], "contour 1")
+        result = glyphs["oacute"].decompose(glyphs)
+        self.assertIsNone(result.contours[0]["identifier"])
+        self.assertEqual(result.contours[0]["points"][0],
+                         ("curve", (0, 0), False, "name", None))
+
+    def test_recursion(self):
+        glyphs = self._setupTestGlyphs()
+        glyphs["o"].components = [
+            dict(baseGlyph="oacute.sc", transformation=(1, 0, 0, 1, 0, 0),
+                 identifier=None)
+        ]
+        with self.assertRaises(ValueError):
+            glyphs["oacute"].decompose(glyphs)
+
+
+class LinearCombinationTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    def _combine(self, glyphsAndWeights):
+        result = None
+        for glyph, weight in glyphsAndWeights:
+            if result is None:
+                result = glyph * weight
+            else:
+                result = result + glyph * weight
+        return result
+
+    def test_linearCombination(self):
+        glyphs = [self._setupTestGlyph(offset=offset)
+                  for offset in (0, 3, 11)]
+        for weights in ((1,), (1, -1), (0.2, 0.3, 0.5),
+                        (0.2, (0.3, 0.6), (-1.5, 2))):
+            glyphsAndWeights = list(zip(glyphs, weights))
+            self.assertEqual(
+                linearCombination(glyphsAndWeights),
+                self._combine(glyphsAndWeights)
+            )
+
+    def test_linearCombination_packed(self):
+        glyphs = [self._setupTestGlyph(offset=offset, packed=True)
+                  for offset in (0, 3, 11)]
+        glyphsAndWeights = list(zip(glyphs, (0.2, 0.3, (0.5, 0.1))))
+        result = linearCombination(glyphsAndWeights)
+        self.assertIsNotNone(result._packedContours)
+        self.assertEqual(result, self._combine(glyphsAndWeights))
+
+    def test_linearCombination_scaleComponentTransform(self):
+        glyphs = [self._setupTestGlyph(offset=offset,
+                                       scaleComponentTransform=False)
+                  for offset in (0, 3, 11)]
+        glyphsAndWeights = list(zip(glyphs, (0.2, 0.3, 0.5)))
+        self.assertEqual(
+            linearCombination(glyphsAndWeights),
+            self._combine(glyphsAndWeights)
+        )
+
+    def test_linearCombination_unpaired(self):
+        glyphs = [self._setupTestGlyph(offset=offset)
+                  for offset in (0, 3, 11)]
+        glyphs[2].components = glyphs[2].components[1:]
+        glyphs[1].anchors = glyphs[1].anchors[:1]
+        result = linearCombination(list(zip(glyphs, (0.2, 0.3, 0.5))))
+        self.assertEqual(
+            [component["baseGlyph"] for component in result.components],
+            ["B"]
+        )
+        self.assertEqual(
+            [anchor["name"] for anchor in result.anchors],
+            ["top"]
+        )
+
+    def test_linearCombination_incompatible(self):
+        for packed in (False, True):
+            glyphs = [self._setupTestGlyph(offset=offset, packed=packed)
+                      for offset in (0, 3)]
+            contours = glyphs[1].contours
+            contours[0]["points"] = contours[0]["points"][:-1]
+            glyphs[1].contours = contours
+            with self.assertRaises(IndexError):
+                linearCombination(list(zip(glyphs, (0.5, 0.5))))
+
+    def test_linearCombination_empty(self):
+        with self.assertRaises(ValueError):
+            linearCombination([])
+
+
+class BatchLinearCombinationTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    locations = [(1, 0, 0), (0.2, 0.3, 0.5), (0.2, (0.3, 0.6), (-1.5, 2))]
+
+    def test_batchLinearCombination(self):
+        for packed in (False, True):
+            glyphs = [self._setupTestGlyph(offset=offset, packed=packed)
+                      for offset in (0, 3, 11)]
+            batch = batchLinearCombination(glyphs, self.locations)
+            self.assertEqual(len(batch), 3)
+            self.assertEqual(batch.shape, (3, 4, 2))
+            self.assertEqual(len(batch.coordinates), 3 * 4 * 2)
+            for index, weights in enumerate(self.locations):
+                expected = linearCombination(list(zip(glyphs, weights)))
+                self.assertEqual(batch[index], expected)
+                self.assertEqual(batch[index].packed, packed)
+                self.assertEqual(
+                    list(batch.getCoordinates(index)),
+                    list(expected._getPackedContours().coordinates)
+                )
+            self.assertIs(batch[-1], batch[2])
+            self.assertEqual(list(batch), [batch[0], batch[1], batch[2]])
+            with self.assertRaises(IndexError):
+                batch[3]
+
+    def test_batchLinearCombination_noContours(self):
+        glyphs = [self._setupTestGlyph(offset=offset) for offset in (0, 3)]
+        for glyph in glyphs:
+            glyph.contours = []
+        batch = batchLinearCombination(glyphs, [(0.5, 0.5), (1, 0)])
+        self.assertEqual(batch.shape, (2, 0, 2))
+        self.assertEqual(batch[0], linearCombination(list(zip(glyphs, (0.5, 0.5)))))
+
+    def test_batchLinearCombination_errors(self):
+        glyphs = [self._setupTestGlyph(offset=offset) for offset in (0, 3)]
+        with self.assertRaises(ValueError):
+            batchLinearCombination([], [])
+        with self.assertRaises(ValueError):
+            batchLinearCombination(glyphs, [(0.5, 0.25, 0.25)])
+        with self.assertRaises(ValueError):
+            batchLinearCombination(glyphs, [], pairing=MathGlyphPairing(glyphs[:1]))
+        contours = glyphs[1].contours
+        contours[0]["points"] = contours[0]["points"][:-1]
+        glyphs[1].contours = contours
+        with self.assertRaises(ValueError):
+            batchLinearCombination(glyphs, [(0.5, 0.5)])
+
+    def test_batchInterpolate(self):
+        factors = [0, 0.25, 0.5, 1, 1.5, (0.2, 0.7)]
+        for kwargs in (dict(), dict(packed=True),
+                       dict(scaleComponentTransform=False)):
+            glyph1 = self._setupTestGlyph(**kwargs)
+            glyph2 = self._setupTestGlyph(offset=7, **kwargs)
+            # the guideline angles wrap around 0
+            glyph1.guidelines[0]["angle"] = 350
+            glyph2.guidelines[0]["angle"] = 10
+            batch = batchInterpolate(glyph1, glyph2, factors)
+            self.assertEqual(len(batch), len(factors))
+            for index, factor in enumerate(factors):
+                expected = glyph1.interpolate(glyph2, factor)
+                self.assertEqual(batch[index], expected)
+                self.assertEqual(
+                    list(batch.getCoordinates(index)),
+                    list(expected._getPackedContours().coordinates)
+                )
+            self.assertEqual(batch[1].guidelines[0]["angle"], 355)
+
+
+class MathGlyphDeltaCacheTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    def _setupDeltaCache(self, packed=False):
+        base = self._setupTestGlyph(packed=packed)
+        masters = [self._setupTestGlyph(offset=offset, packed=packed)
+                   for offset in (3, 11)]
+        return MathGlyphDeltaCache(base, masters)
+
+    def _expected(self, base, masters, weights):
+        result = base
+        for master, weight in zip(masters, weights):
+            result = result + (master - base) * weight
+        return result
+
+    def test_instance(self):
+        for packed in (False, True):
+            cache = self._setupDeltaCache(packed)
+            self.assertEqual(len(cache), 2)
+            for weights in ((0, 0), (0.25, 0.5), (1, -0.5), (0.2, (0.3, 0.6))):
+                self.assertEqual(
+                    cache.instance(weights),
+                    self._expected(cache.base, cache.masters, weights)
+                )
+            with self.assertRaises(ValueError):
+                cache.instance((0.5,))
+
+    def test_cached(self):
+        cache = self._setupDeltaCache()
+        deltas = cache.deltas
+        pairing = cache.pairing
+        cache.instance((0.5, 0.5))
+        self.assertEqual(deltas, [cache.masters[0] - cache.base,
+                                  cache.masters[1] - cache.base])
+        self.assertIs(cache.deltas[0], deltas[0])
+        self.assertIs(cache.pairing, pairing)
+
+    def test_invalidate(self):
+        cache = self._setupDeltaCache()
+        deltas = cache.deltas
+        master = self._setupTestGlyph(offset=5)
+        cache.setMaster(1, master)
+        self.assertIs(cache.deltas[0], deltas[0])
+        self.assertEqual(cache.deltas[1], master - cache.base)
+        self.assertEqual(
+            cache.instance((0.5, 0.5)),
+            self._expected(cache.base, cache.masters, (0.5, 0.5))
+        )
+        cache.masters[0].width = 1000
+        cache.invalidate(0)
+        self.assertEqual(cache.instance((1, 0)).width, 1000)
+        base = self._setupTestGlyph(offset=1)
+        cache.setBase(base)
+        self.assertEqual(
+            cache.instance((0.5, 0.5)),
+            self._expected(base, cache.masters, (0.5, 0.5))
+        )
+
+    def test_batch(self):
+        cache = self._setupDeltaCache(packed=True)
+        locations = [(0.25, 0.5), (1, -0.5)]
+        batch = cache.batch(locations)
+        self.assertEqual(batch.shape, (2, 4, 2))
+        for index, weights in enumerate(locations):
+            self.assertEqual(batch[index], cache.instance(weights))
+
+
+class MathGlyphPairingTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    def test_indexes(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=3)
+        glyph2.components.reverse()
+        glyph2.anchors.reverse()
+        pairing = MathGlyphPairing([glyph1, glyph2])
+        self.assertEqual(pairing.glyphCount, 2)
+        self.assertEqual(pairing.componentIndexes, [(0, 1), (1, 0)])
+        self.assertEqual(pairing.anchorIndexes, [(0, 1), (1, 0)])
+        self.assertEqual(pairing.guidelineIndexes, [(0, 0)])
+        self.assertTrue(pairing.imagesPaired)
+        glyph3 = self._setupTestGlyph(offset=5)
+        glyph3.components = glyph3.components[:1]
+        glyph3.image = dict(fileName=None,
+                            transformation=(1, 0, 0, 1, 0, 0), color=None)
+        pairing = MathGlyphPairing([glyph1, glyph2, glyph3])
+        self.assertEqual(pairing.glyphCount, 3)
+        self.assertEqual(pairing.componentIndexes, [(0, 1, 0)])
+        self.assertFalse(pairing.imagesPaired)
+
+    def test_pairs(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=3)
+        pairing = MathGlyphPairing([glyph1, glyph2])
+        self.assertEqual(
+            pairing.componentPairs(glyph1, glyph2),
+            _pairComponents(glyph1.components, glyph2.components)
+        )
+        self.assertEqual(
+            pairing.anchorPairs(glyph1, glyph2),
+            _pairAnchors(_anchorTree(glyph1.anchors),
+                         _anchorTree(glyph2.anchors))
+        )
+
+    def test_reuse(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=3)
+        glyph3 = self._setupTestGlyph(offset=11)
+        pairing = MathGlyphPairing([glyph1, glyph2])
+        for factor in (0.1, 0.5, (0.2, 0.8)):
+            self.assertEqual(
+                glyph1.interpolate(glyph2, factor, pairing=pairing),
+                glyph1.interpolate(glyph2, factor)
+            )
+        pairing = MathGlyphPairing([glyph1, glyph2, glyph3])
+        for weights in ((0.2, 0.3, 0.5), (1, -1, 1)):
+            glyphsAndWeights = list(zip([glyph1, glyph2, glyph3], weights))
+            self.assertEqual(
+                linearCombination(glyphsAndWeights, pairing=pairing),
+                linearCombination(glyphsAndWeights)
+            )
+
+    def test_glyphCount(self):
+        glyph1 = self._setupTestGlyph()
+        glyph2 = self._setupTestGlyph(offset=3)
+        pairing = MathGlyphPairing([glyph1, glyph2, glyph2])
+        with self.assertRaises(ValueError):
+            glyph1.interpolate(glyph2, 0.5, pairing=pairing)
+        with self.assertRaises(ValueError):
+            linearCombination([(glyph1, 0.5), (glyph2, 0.5)], pairing=pairing)
+
+
+class LazyMathGlyphTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    def _setupTestGlyph(self, offset=0, lazy=True, packed=False,
+                        scaleComponentTransform=True):
+        # all values are small integers so that the lazy
+        # and eager results are exactly the same
+        glyph = MathGlyph(None)
+        glyph.width = 100 + offset
+        glyph.height = 200 - offset
+        glyph.unicodes = [65]
+        glyph.contours = [
+            dict(identifier="contour 1",
+                 points=[("curve", (offset, 100), False, "name 1", "1"),
+                         (None, (50, 100 + offset), False, None, None),
+                         ("line", (100 - offset, 50), True, None, None)])
+        ]
+        glyph.components = [
+            dict(baseGlyph="A", identifier=None,
+                 transformation=(1, 0, offset, 1 + offset, offset, 3))
+        ]
+        glyph.anchors = [
+            dict(x=10 + offset, y=20, name="top", identifier=None,
+                 color=None)
+        ]
+        glyph.guidelines = [
+            dict(x=1, y=2 + offset, angle=10 + offset * 4, name="foo",
+                 identifier="1", color=None)
+        ]
+        return MathGlyph(glyph, lazy=lazy, packed=packed,
+                         scaleComponentTransform=scaleComponentTransform)
+
+    def _masters(self, **kwargs):
+        return [self._setupTestGlyph(offset=offset, **kwargs)
+                for offset in (0, 4, 8)]
+
+    def test_operators(self):
+        m0, m1, m2 = self._masters()
+        self.assertIsInstance(m0 + m1, LazyMathGlyph)
+        self.assertIsInstance(m0 - m1, LazyMathGlyph)
+        self.assertIsInstance(m0 * 2, LazyMathGlyph)
+        self.assertIsInstance(2 * m0, LazyMathGlyph)
+        self.assertIsInstance(m0 / 2, LazyMathGlyph)
+        self.assertIsInstance((m0 + m1) * 0.5 - m2 / 4, LazyMathGlyph)
+
+    def test_terms(self):
+        m0, m1, m2 = self._masters()
+        expression = m0 + (m1 - m0) * 0.25 + (m2 - m0) * (0.5, 0.75)
+        self.assertEqual(
+            expression._terms,
+            [
+                (m0, (1, 1), 1),
+                (m1, (0.25, 0.25), 1),
+                (m0, (-0.25, -0.25), -1),
+                (m2, (0.5, 0.75), 1),
+                (m0, (-0.5, -0.75), -1)
+            ]
+        )
+
+    def test_evaluate(self):
+        for kwargs in (dict(), dict(packed=True),
+                       dict(scaleComponentTransform=False)):
+            eager = self._masters(lazy=False, **kwargs)
+            lazy = self._masters(**kwargs)
+            for a, b in ((0.25, 0.5), (0.5, 0.75), (-0.5, 1), ((0.25, 0.5), 0.5)):
+                m0, m1, m2 = eager
+                expected = m0 + (m1 - m0) * a + (m2 - m0) * b
+                m0, m1, m2 = lazy
+                expression = m0 + (m1 - m0) * a + (m2 - m0) * b
+                result = expression.evaluate()
+                self.assertIsInstance(result, MathGlyph)
+                self.assertEqual(result, expected)
+            self.assertEqual((lazy[1] / 2).evaluate(), eager[1] / 2)
+
+    def test_evaluate_guideline_wrap(self):
+        eager = self._masters(lazy=False)
+        lazy = self._masters()
+        for glyphs in (eager, lazy):
+            glyphs[0].guidelines[0]["angle"] = 350
+            glyphs[1].guidelines[0]["angle"] = 10
+            glyphs[2].guidelines[0]["angle"] = 340
+        m0, m1, m2 = lazy
+        result = (m0 + (m1 - m0) * 0.25).evaluate()
+        self.assertEqual(result.guidelines[0]["angle"], 355)
+        self.assertEqual(result, eager[0].interpolate(eager[1], 0.25))
+        for a, b in ((0.25, 0.5), ((0.5, 0.25), 0.75)):
+            m0, m1, m2 = eager
+            expected = m0 + (m1 - m0) * a + (m2 - m0) * b
+            m0, m1, m2 = lazy
+            result = (m0 + (m1 - m0) * a + (m2 - m0) * b).evaluate()
+            self.assertEqual(result.guidelines, expected.guidelines)
+            self.assertEqual(result, expected)
+        self.assertEqual((m0 * 0.75 + m1 * 0.25).guidelines, (eager[0] * 0.75 + eager[1] * 0.25).guidelines)
+
+    def test_evaluate_once(self):
+        m0, m1, m2 = self._masters()
+        expression = m0 + (m1 - m0) * 0.5
+        self.assertIs(expression.evaluate(), expression.evaluate())
+
+    def test_attributes(self):
+        m0, m1, m2 = self._masters()
+        expression = m0 + (m1 - m0) * 0.5
+        self.assertEqual(expression.width, 102)
+        self.assertEqual(expression.name, m0.name)
+        self.assertEqual(expression.contours[0]["points"][0][1], (2, 100))
+        pen = MathGlyphPen()
+        expression.drawPoints(pen)
+        self.assertEqual(pen.contours, expression.contours)
+        self.assertEqual(expression.round(), expression.evaluate().round())
+        expression.width = 10
+        self.assertEqual(expression.evaluate().width, 10)
+
+    def test_mixed(self):
+        m0, m1, m2 = self._masters()
+        eager = self._setupTestGlyph(offset=4, lazy=False)
+        self.assertEqual(m0 + eager, m0 + m1)
+        self.assertEqual(eager + (m1 - m0), (m1 - m0) + eager)
+
+
+class MathGlyphGeometryOnlyTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    def _setupGeometryGlyph(self, offset=0):
+        glyph = self._setupTestGlyph(offset=offset)
+        glyph.lib = {"foo": "bar"}
+        return MathGlyph(glyph, geometryOnly=True)
+
+    def assertGeometryOnly(self, glyph, expected):
+        self.assertTrue(glyph.geometryOnly)
+        self.assertEqual(glyph.width, expected.width)
+        self.assertEqual(glyph.height, expected.height)
+        self.assertEqual(glyph.contours, expected.contours)
+        self.assertEqual(glyph.components, expected.components)
+        self.assertEqual(glyph.anchors, [])
+        self.assertEqual(glyph.guidelines, [])
+        self.assertEqual(glyph.image, MathGlyph(None).image)
+        self.assertEqual(glyph.lib, {})
+
+    def test_init(self):
+        glyph = self._setupGeometryGlyph()
+        self.assertGeometryOnly(glyph, self._setupTestGlyph())
+        self.assertEqual(glyph.unicodes, [65])
+        self.assertGeometryOnly(glyph.copy(), glyph)
+
+    def test_math(self):
+        glyph1 = self._setupGeometryGlyph()
+        glyph2 = self._setupGeometryGlyph(offset=2)
+        full1 = self._setupTestGlyph()
+        full2 = self._setupTestGlyph(offset=2)
+        self.assertGeometryOnly(glyph1 + glyph2, full1 + full2)
+        self.assertGeometryOnly(glyph1 - glyph2, full1 - full2)
+        self.assertGeometryOnly(glyph1 * 2, full1 * 2)
+        self.assertGeometryOnly(glyph1 / 2, full1 / 2)
+        self.assertGeometryOnly(glyph1.round(), full1.round())
+        self.assertGeometryOnly(
+            glyph1.interpolate(glyph2, 0.25),
+            full1.interpolate(full2, 0.25)
+        )
+        self.assertGeometryOnly(
+            linearCombination([(glyph1, 0.75), (glyph2, 0.25)]),
+            linearCombination([(full1, 0.75), (full2, 0.25)])
+        )
+
+    def test_pairing(self):
+        glyph1 = self._setupGeometryGlyph()
+        glyph2 = self._setupGeometryGlyph(offset=2)
+        pairing = MathGlyphPairing([glyph1, glyph2])
+        self.assertEqual(pairing.componentIndexes, [(0, 0), (1, 1)])
+        self.assertEqual(pairing.anchorIndexes, [])
+        self.assertEqual(pairing.guidelineIndexes, [])
+        self.assertFalse(pairing.imagesPaired)
+
+
+class MathGlyphFingerprintTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyph = MathGlyphInterpolateTest._setupTestGlyph
+
+    def test_topologyFingerprint(self):
+        glyph = self._setupTestGlyph()
+        self.assertEqual(glyph.topologyFingerprint, ("1:cooc", ("A", "B")))
+        self.assertEqual(hash(glyph.topologyFingerprint),
+                         hash(self._setupTestGlyph(offset=2).topologyFingerprint))
+        self.assertEqual(self._setupTestGlyph(packed=True).topologyFingerprint,
+                         glyph.topologyFingerprint)
+        self.assertEqual(MathGlyph(None).topologyFingerprint, ("0:", ()))
+
+    def test_topologyFingerprint_reset(self):
+        glyph = self._setupTestGlyph()
+        fingerprint = glyph.topologyFingerprint
+        glyph.components = glyph.components[:1]
+        self.assertEqual(glyph.topologyFingerprint, ("1:cooc", ("A",)))
+        glyph.contours = glyph.contours + [
+            dict(identifier=None, points=[("line", (0, 0), False, None, None)])
+        ]
+        self.assertEqual(glyph.topologyFingerprint, ("2:cooc|l", ("A",)))
+        self.assertNotEqual(glyph.topologyFingerprint, fingerprint)
+
+    def test_topologyFingerprint_shared(self):
+        glyph1 = self._setupTestGlyph(packed=True)
+        glyph2 = self._setupTestGlyph(offset=2, packed=True)
+        fingerprint = glyph1._packedContours.fingerprint()
+        for result in (glyph1 * 2, glyph1 + glyph2, glyph1.copy(),
+                       glyph1.interpolate(glyph2, 0.5), glyph1.round()):
+            self.assertIs(result._packedContours.fingerprint(), fingerprint)
+
+    def test_checkCompatibility(self):
+        master1 = dict(a=self._setupTestGlyph(), b=self._setupTestGlyph(),
+                       c=MathGlyph(None), d=self._setupTestGlyph())
+        master2 = dict(a=self._setupTestGlyph(offset=2),
+                       b=self._setupTestGlyph(offset=2),
+                       c=MathGlyph(None), d=self._setupTestGlyph(offset=2),
+                       e=MathGlyph(None))
+        master2["d"].contours[0]["points"].pop()
+        master2["d"].contours = master2["d"].contours
+        groups, incompatible = checkCompatibility([master1, master2])
+        self.assertEqual(list(groups.items()), [
+            (("1:cooc", ("A", "B")), ["a", "b"]),
+            (("0:", ()), ["c"]),
+        ])
+        self.assertEqual(incompatible, ["d", "e"])
+
+    def test_checkCompatibility_emptyContour(self):
+        glyph = MathGlyph(None)
+        glyph.contours = [dict(identifier=None, points=[])]
+        self.assertNotEqual(glyph.topologyFingerprint,
+                            MathGlyph(None).topologyFingerprint)
+        groups, incompatible = checkCompatibility(
+            [dict(a=MathGlyph(None)), dict(a=glyph)])
+        self.assertEqual(groups, {})
+        self.assertEqual(incompatible, ["a"])
+
+    def test_topologyFingerprint_pointPen(self):
+        glyph = self._setupTestGlyph()
+        fingerprint = glyph.topologyFingerprint
+        pen = glyph.getPointPen()
+        pen.beginPath()
+        pen.addPoint((0, 0), "line")
+        pen.endPath()
+        self.assertTrue(glyph.topologyFingerprint[0].startswith("2:"))
+        self.assertNotEqual(glyph.topologyFingerprint, fingerprint)
+
 
 class MathGlyphPenTest(unittest.TestCase):
     def __init__(self, methodName):
@@ -549,6 +1637,43 @@ class MathGlyphPenTest(unittest.TestCase):
         self.assertEqual(pen.contours[-1]["points"], expected)
         self.assertEqual(pen.contours[-1]["identifier"], 'contour 1')
 
+    def test_pen_with_leading_offcurves(self):
+        pen = MathGlyphPen()
+        pen.beginPath(identifier="contour 1")
+        pen.addPoint((0, 50), None)
+        pen.addPoint((50, 100), None)
+        pen.addPoint((100, 50), "qcurve", smooth=True, name="name 1",
+                     identifier="point 1")
+        pen.addPoint((50, 0), None)
+        pen.addPoint((0, 0), "line", smooth=False, name="name 2",
+                     identifier="point 2")
+        pen.endPath()
+        expected = [
+            ("qcurve", (100, 50), True,  "name 1", "point 1"),
+            (None,     (50,   0), False, None,     None),
+            (None,     (50,   0), False, None,     None),
+            (None,     (0,    0), False, None,     None),
+            ("curve",  (0,    0), False, "name 2", "point 2"),
+            (None,     (0,   50), False, None,     None),
+            (None,     (50, 100), False, None,     None),
+        ]
+        self.assertEqual(pen.contours[-1]["points"], expected)
+
+    def test_pen_offcurves_only(self):
+        pen = MathGlyphPen()
+        pen.beginPath()
+        pen.addPoint((0, 50), None)
+        pen.addPoint((50, 100), None)
+        pen.endPath()
+        pen.beginPath()
+        pen.endPath()
+        self.assertEqual(
+            [contour["points"] for contour in pen.contours],
+            [[(None, (0, 50), False, None, None),
+              (None, (50, 100), False, None, None)],
+             []]
+        )
+
     def test_pen_with_lines_strict(self):
         pen = MathGlyphPen(strict=True)
         pen.beginPath(identifier="contour 1")
@@ -722,6 +1847,62 @@ class FilterRedundantPointPenTest(unittest.TestCase):
             'endPath()'
         )
 
+    def test_filterRedundantPoints(self):
+        points = [
+            ("curve", (0,   100), False, "name 1", "point 1"),
+            (None,    (0,   100), False, None,     None),
+            (None,    (100, 100), False, None,     None),
+            ("curve", (100, 100), False, "name 2", "point 2"),
+            (None,    (100,  50), False, None,     None),
+            (None,    (50,    0), False, None,     None),
+            ("curve", (0,     0), True,  "name 3", "point 3"),
+            (None,    (0,     0), False, None,     None),
+            (None,    (0,   100), False, None,     None),
+        ]
+        self.assertEqual(
+            _filterRedundantPoints(points),
+            [
+                ("line",  (0,   100), False, "name 1", "point 1"),
+                ("line",  (100, 100), False, "name 2", "point 2"),
+                (None,    (100,  50), False, None,     None),
+                (None,    (50,    0), False, None,     None),
+                ("curve", (0,     0), True,  "name 3", "point 3"),
+            ]
+        )
+        points = points[3:7]
+        self.assertIs(_filterRedundantPoints(points), points)
+
+    def test_drawPoints_filterRedundantPoints(self):
+        glyph = MathGlyph(None)
+        glyph.unicodes = []
+        glyph.width = glyph.height = 0
+        pen = glyph.getPointPen()
+        pen.beginPath(identifier="contour 1")
+        pen.addPoint((0, 100), "line", name="name 1", identifier="point 1")
+        pen.addPoint((100, 100), "line", name="name 2", identifier="point 2")
+        pen.addPoint((100, 0), "line", name="name 3", identifier="point 3")
+        pen.addPoint((0, 0), "line", name="name 4", identifier="point 4")
+        pen.endPath()
+        for packed in (False, True):
+            if packed:
+                # rounding keeps the packed coordinates integers
+                glyph = MathGlyph(glyph, packed=True).round()
+            testPen = _TestPointPen()
+            glyph.drawPoints(testPen, filterRedundantPoints=True)
+            self.assertEqual(
+                testPen.dump(),
+                'beginPath(identifier="contour 1")\n'
+                'addPoint((0, 100), segmentType="line", smooth=False, '
+                'name="name 1", identifier="point 1")\n'
+                'addPoint((100, 100), segmentType="line", smooth=False, '
+                'name="name 2", identifier="point 2")\n'
+                'addPoint((100, 0), segmentType="line", smooth=False, '
+                'name="name 3", identifier="point 3")\n'
+                'addPoint((0, 0), segmentType="line", smooth=False, '
+                'name="name 4", identifier="point 4")\n'
+                'endPath()'
+            )
+
 
 class PrivateFuncsTest(unittest.TestCase):
     def __init__(self, methodName):
@@ -865,6 +2046,47 @@ class PrivateFuncsTest(unittest.TestCase):
             ]
         )
 
+    def test_pairComponentIndexes(self):
+        components1 = [
+            dict(baseGlyph="A", transformation=(0, 0, 0, 0, 0, 0),
+                 identifier="1"),
+            dict(baseGlyph="B", transformation=(0, 0, 0, 0, 0, 0),
+                 identifier="1"),
+            dict(baseGlyph="A", transformation=(0, 0, 0, 0, 0, 0),
+                 identifier=None),
+            dict(baseGlyph="C", transformation=(0, 0, 0, 0, 0, 0),
+                 identifier=None)
+        ]
+        components2 = [
+            dict(baseGlyph="A", transformation=(0, 0, 0, 0, 0, 0),
+                 identifier=None),
+            dict(baseGlyph="B", transformation=(0, 0, 0, 0, 0, 0),
+                 identifier="2"),
+            dict(baseGlyph="A", transformation=(0, 0, 0, 0, 0, 0),
+                 identifier="1")
+        ]
+        self.assertEqual(
+            _pairComponentIndexes(components1, components2),
+            [(0, 2), (2, 0), (1, 1)]
+        )
+
+    def test_pairAnchorIndexes(self):
+        anchors1 = [
+            dict(name="test", x=1, y=2),
+            dict(name="test", identifier="identifier 1", x=3, y=4),
+            dict(name="other", x=5, y=6),
+            dict(name="top", x=5, y=6)
+        ]
+        anchors2 = [
+            dict(name="top", identifier="identifier 2", x=5, y=6),
+            dict(name="test", identifier="identifier 1", x=1, y=2),
+            dict(name="test", x=3, y=4)
+        ]
+        self.assertEqual(
+            _pairAnchorIndexes(anchors1, anchors2),
+            [(0, 2), (1, 1), (3, 0)]
+        )
+
     def test_pairComponents(self):
         components1 = [
             dict(baseGlyph="A", transformation=(0, 0, 0, 0, 0, 0),
@@ -0,0 +1,304 @@
+import gc
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+from array import array
+from fontMath.mathGlyph import MathGlyph
+from fontMath.mathGlyph import linearCombination as glyphLinearCombination
+from fontMath.mathGlyphSet import (
+    PackedGlyphSet, linearCombination, _dataStart, _headerFormat, _headerSize)
+
+
+class PackedGlyphSetTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    def _setupTestGlyphs(self, offset=0, scaleComponentTransform=True):
+        a = MathGlyph(None, scaleComponentTransform=scaleComponentTransform)
+        a.name = "a"
+        a.unicodes = [97]
+        a.width = 500 + offset
+        a.height = 700
+        a.contours = [
+            dict(identifier="contour 1",
+                 points=[("curve", (0 + offset, 100), False, "name 1", "1"),
+                         (None, (50, 100 + offset), False, None, None),
+                         (None, (100 - offset, 50), False, None, None),
+                         ("curve", (100, 0 + offset), True, None, None)]),
+            dict(identifier=None,
+                 points=[("line", (10 + offset, 20), False, None, None)])
+        ]
+        a.anchors = [
+            dict(x=100 + offset, y=200, name="top", identifier=None,
+                 color=None)
+        ]
+        a.lib = {"foo": "bar"}
+        b = MathGlyph(None, scaleComponentTransform=scaleComponentTransform)
+        b.name = "b"
+        b.unicodes = []
+        b.width = 600
+        b.height = 700 - offset
+        b.components = [
+            dict(baseGlyph="a", identifier=None,
+                 transformation=(1, 0, offset, 1 + offset, offset, 3)),
+            dict(baseGlyph="a", identifier="1",
+                 transformation=(1, 0, 0, 1, 200, -offset))
+        ]
+        space = MathGlyph(None, scaleComponentTransform=scaleComponentTransform)
+        space.name = "space"
+        space.unicodes = [32]
+        space.width = 250 + offset
+        space.height = 0
+        return dict(a=a, b=b, space=space)
+
+    def _setupTestGlyphSet(self, offset=0, scaleComponentTransform=True):
+        return PackedGlyphSet.fromGlyphs(
+            self._setupTestGlyphs(offset, scaleComponentTransform),
+            glyphOrder=["space", "a", "b"],
+            scaleComponentTransform=scaleComponentTransform
+        )
+
+    def assertGlyphSetEqual(self, glyphSet, glyphs):
+        self.assertEqual(glyphSet.keys(), ["space", "a", "b"])
+        # guidelines and images are not packed
+        for glyphName in glyphSet:
+            glyph = glyphSet[glyphName]
+            expected = glyphs[glyphName]
+            for attr in ("name", "unicodes", "width", "height", "lib",
+                         "contours", "components", "anchors"):
+                self.assertEqual(getattr(glyph, attr), getattr(expected, attr))
+
+    def test_fromGlyphs(self):
+        glyphSet = self._setupTestGlyphSet()
+        self.assertEqual(len(glyphSet), 3)
+        self.assertEqual(glyphSet.glyphOrder, ("space", "a", "b"))
+        self.assertIn("a", glyphSet)
+        self.assertNotIn("c", glyphSet)
+        self.assertEqual(list(glyphSet.coordinates),
+                         [0, 100, 50, 100, 100, 50, 100, 0, 10, 20])
+        self.assertEqual(list(glyphSet.componentScales),
+                         [1, 1, 0, 0, 1, 1, 0, 0])
+        self.assertEqual(list(glyphSet.componentOffsets), [0, 3, 200, 0])
+        self.assertEqual(list(glyphSet.anchorCoordinates), [100, 200])
+        self.assertEqual(list(glyphSet.metrics),
+                         [250, 0, 500, 700, 600, 700])
+        structure = glyphSet._structure
+        self.assertEqual(list(structure.pointStarts), [0, 0, 5, 5])
+        self.assertEqual(list(structure.contourStarts), [0, 0, 2, 2])
+        self.assertEqual(list(structure.contourEnds), [4, 5])
+        self.assertEqual(list(structure.componentStarts), [0, 0, 0, 2])
+        self.assertEqual(list(structure.anchorStarts), [0, 0, 1, 1])
+
+    def test_unpack(self):
+        glyphs = self._setupTestGlyphs()
+        glyphSet = self._setupTestGlyphSet()
+        self.assertGlyphSetEqual(glyphSet, glyphs)
+        self.assertIs(glyphSet["a"], glyphSet["a"])
+        self.assertEqual(glyphSet["a"].lib, {"foo": "bar"})
+        with self.assertRaises(KeyError):
+            glyphSet["c"]
+
+    def test_fromGlyphs_coordinateTypes(self):
+        glyphs = self._setupTestGlyphs()
+        glyphSet = self._setupTestGlyphSet()
+        for packedGlyphs in (
+                {glyphName: MathGlyph(glyph, packed=True).round()
+                 for glyphName, glyph in glyphs.items()},
+                {glyphName: glyphSet.round()[glyphName] for glyphName in glyphSet},
+                {glyphName: MathGlyph(glyph, singlePrecision=True)
+                 for glyphName, glyph in glyphs.items()}):
+            result = PackedGlyphSet.fromGlyphs(packedGlyphs, glyphOrder=["space", "a", "b"])
+            self.assertEqual(result.coordinates.typecode, "d")
+            self.assertGlyphSetEqual(result, packedGlyphs)
+
+    def test_math(self):
+        glyphs1 = self._setupTestGlyphs()
+        glyphs2 = self._setupTestGlyphs(offset=2)
+        glyphSet1 = self._setupTestGlyphSet()
+        glyphSet2 = self._setupTestGlyphSet(offset=2)
+        for func in (
+                lambda g1, g2: g1 + g2,
+                lambda g1, g2: g1 - g2,
+                lambda g1, g2: g1 * 2,
+                lambda g1, g2: g1 * (2, 0.5),
+                lambda g1, g2: 0.5 * g2,
+                lambda g1, g2: g1 / 4,
+                lambda g1, g2: (g1 * 1.5).round(),
+                lambda g1, g2: g1.interpolate(g2, 0.25),
+                lambda g1, g2: g1.interpolate(g2, (0.25, 0.75))):
+            expected = {glyphName: func(glyphs1[glyphName], glyphs2[glyphName])
+                        for glyphName in glyphs1}
+            self.assertGlyphSetEqual(func(glyphSet1, glyphSet2), expected)
+
+    def test_math_scaleComponentTransform(self):
+        glyphs1 = self._setupTestGlyphs(scaleComponentTransform=False)
+        glyphs2 = self._setupTestGlyphs(offset=2, scaleComponentTransform=False)
+        glyphSet1 = self._setupTestGlyphSet(scaleComponentTransform=False)
+        glyphSet2 = self._setupTestGlyphSet(offset=2, scaleComponentTransform=False)
+        for func in (
+                lambda g1, g2: g1 * 2,
+                lambda g1, g2: g1 / 4,
+                lambda g1, g2: g1.interpolate(g2, 0.25)):
+            expected = {glyphName: func(glyphs1[glyphName], glyphs2[glyphName])
+                        for glyphName in glyphs1}
+            self.assertGlyphSetEqual(func(glyphSet1, glyphSet2), expected)
+
+    def test_linearCombination(self):
+        masters = [self._setupTestGlyphs(offset) for offset in (0, 2, 4)]
+        glyphSets = [self._setupTestGlyphSet(offset) for offset in (0, 2, 4)]
+        weights = [0.5, (0.25, 0.75), -0.25]
+        expected = {
+            glyphName: glyphLinearCombination([
+                (glyphs[glyphName], weight)
+                for glyphs, weight in zip(masters, weights)
+            ])
+            for glyphName in masters[0]
+        }
+        self.assertGlyphSetEqual(
+            linearCombination(list(zip(glyphSets, weights))),
+            expected
+        )
+        with self.assertRaises(ValueError):
+            linearCombination([])
+
+    def test_incompatible(self):
+        glyphSet1 = self._setupTestGlyphSet()
+        glyphs = self._setupTestGlyphs()
+        glyphs["a"].contours[1]["points"].append(
+            ("line", (0, 0), False, None, None))
+        glyphSet2 = PackedGlyphSet.fromGlyphs(glyphs, glyphOrder=["space", "a", "b"])
+        glyphSet3 = PackedGlyphSet.fromGlyphs(glyphs, glyphOrder=["a", "b"])
+        self.assertTrue(glyphSet1.isCompatible(self._setupTestGlyphSet(offset=2)))
+        self.assertFalse(glyphSet1.isCompatible(glyphSet2))
+        self.assertFalse(glyphSet1.isCompatible(glyphSet3))
+        with self.assertRaises(ValueError):
+            glyphSet1 + glyphSet2
+        with self.assertRaises(ValueError):
+            glyphSet1.interpolate(glyphSet3, 0.5)
+        with self.assertRaises(ValueError):
+            linearCombination([(glyphSet1, 0.5), (glyphSet2, 0.5)])
+
+    def test_incompatible_componentOrder(self):
+        glyphSet1 = self._setupTestGlyphSet()
+        glyphs = self._setupTestGlyphs(offset=2)
+        glyphs["b"].components.reverse()
+        glyphSet2 = PackedGlyphSet.fromGlyphs(glyphs, glyphOrder=["space", "a", "b"])
+        self.assertFalse(glyphSet1.isCompatible(glyphSet2))
+        with self.assertRaises(ValueError):
+            glyphSet1.interpolate(glyphSet2, 0.5)
+
+    def test_incompatible_anchorOrder(self):
+        glyphs1 = self._setupTestGlyphs()
+        glyphs1["a"].anchors.append(
+            dict(x=0, y=0, name="bottom", identifier=None, color=None))
+        glyphs2 = self._setupTestGlyphs(offset=2)
+        glyphs2["a"].anchors.insert(
+            0, dict(x=0, y=0, name="bottom", identifier=None, color=None))
+        glyphSet1 = PackedGlyphSet.fromGlyphs(glyphs1, glyphOrder=["space", "a", "b"])
+        glyphSet2 = PackedGlyphSet.fromGlyphs(glyphs2, glyphOrder=["space", "a", "b"])
+        self.assertFalse(glyphSet1.isCompatible(glyphSet2))
+        with self.assertRaises(ValueError):
+            glyphSet1 + glyphSet2
+
+
+class PackedGlyphSetFileTest(unittest.TestCase):
+    def __init__(self, methodName):
+        unittest.TestCase.__init__(self, methodName)
+
+    _setupTestGlyphs = PackedGlyphSetTest._setupTestGlyphs
+    _setupTestGlyphSet = PackedGlyphSetTest._setupTestGlyphSet
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        # the memory maps must be released before
+        # the files can be removed on Windows
+        gc.collect()
+        shutil.rmtree(self.tempDir)
+
+    def _roundTrip(self, glyphSet):
+        path = os.path.join(self.tempDir, "master.fmgs")
+        glyphSet.write(path)
+        return PackedGlyphSet.fromFile(path)
+
+    def test_roundTrip(self):
+        glyphSet1 = self._setupTestGlyphSet()
+        glyphSet2 = self._roundTrip(glyphSet1)
+        self.assertIsInstance(glyphSet2.coordinates, memoryview)
+        self.assertEqual(glyphSet2.glyphOrder, glyphSet1.glyphOrder)
+        self.assertTrue(glyphSet2.isCompatible(glyphSet1))
+        for attr in ("coordinates", "componentScales", "componentOffsets",
+                     "anchorCoordinates", "metrics"):
+            self.assertEqual(getattr(glyphSet2, attr), getattr(glyphSet1, attr))
+        for glyphName in glyphSet1:
+            glyph1 = glyphSet1[glyphName]
+            glyph2 = glyphSet2[glyphName]
+            for attr in ("name", "unicodes", "note", "width", "height",
+                         "contours", "components", "anchors"):
+                self.assertEqual(getattr(glyph2, attr), getattr(glyph1, attr))
+
+    def test_math(self):
+        master1 = self._roundTrip(self._setupTestGlyphSet())
+        master2 = self._setupTestGlyphSet(offset=2)
+        expected = self._setupTestGlyphSet().interpolate(master2, 0.25)
+        result = master1.interpolate(master2, 0.25)
+        self.assertIsInstance(result.coordinates, array)
+        self.assertEqual(result.coordinates, expected.coordinates)
+        self.assertEqual(result["b"].components, expected["b"].components)
+
+    def test_incompatible_componentOrder(self):
+        master1 = self._roundTrip(self._setupTestGlyphSet())
+        glyphs = self._setupTestGlyphs(offset=2)
+        glyphs["b"].components.reverse()
+        master2 = PackedGlyphSet.fromGlyphs(glyphs, glyphOrder=["space", "a", "b"])
+        self.assertFalse(master1.isCompatible(master2))
+        self.assertTrue(master1.isCompatible(self._setupTestGlyphSet(offset=2)))
+
+    def test_round(self):
+        glyphSet = self._roundTrip(self._setupTestGlyphSet().round())
+        self.assertEqual(glyphSet.coordinates.format, "q")
+        self.assertEqual(glyphSet["a"].contours[0]["points"][0][1], (0, 100))
+
+    def test_byteOrder(self):
+        path = os.path.join(self.tempDir, "master.fmgs")
+        glyphSet1 = self._setupTestGlyphSet()
+        glyphSet1.write(path)
+        # rewrite the file with the other byte order
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, reserved, length = struct.unpack(_headerFormat, data[:_headerSize])
+        sideTable = json.loads(data[_headerSize:_headerSize + length].decode("utf-8"))
+        start = _dataStart(length)
+        chunks = []
+        for typecode, offset, count in sorted(sideTable["arrays"].values(), key=lambda d: d[1]):
+            values = array(typecode)
+            values.frombytes(data[start + offset:start + offset + count * 8])
+            values.byteswap()
+            chunks.append(values.tobytes())
+        sideTable["byteOrder"] = "big" if sys.byteorder == "little" else "little"
+        sideTable = json.dumps(sideTable).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(struct.pack(_headerFormat, magic, version, reserved, len(sideTable)))
+            f.write(sideTable)
+            f.write(b"\0" * (_dataStart(len(sideTable)) - _headerSize - len(sideTable)))
+            f.write(b"".join(chunks))
+        glyphSet2 = PackedGlyphSet.fromFile(path)
+        self.assertIsInstance(glyphSet2.coordinates, array)
+        self.assertEqual(glyphSet2.coordinates, glyphSet1.coordinates)
+        self.assertEqual(glyphSet2["b"].components, glyphSet1["b"].components)
+
+    def test_notAGlyphSetFile(self):
+        path = os.path.join(self.tempDir, "other")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 32)
+        with self.assertRaises(ValueError):
+            PackedGlyphSet.fromFile(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -276,6 +276,42 @@ class MathInfoTest(unittest.TestCase):
 
         self.assertIsNone(m5.postscriptBlueValues)
 
+    def test_inplace(self):
+        info2 = MathInfo(_TestInfoObject(_testDataSubset))
+        for func, inPlaceFunc in (
+                (lambda i: i + info2, lambda i: i.__iadd__(info2)),
+                (lambda i: i - info2, lambda i: i.__isub__(info2)),
+                (lambda i: i * 2.5, lambda i: i.__imul__(2.5)),
+                (lambda i: i * (2, 0.5), lambda i: i.__imul__((2, 0.5))),
+                (lambda i: i / 4, lambda i: i.__itruediv__(4))):
+            info1 = MathInfo(_TestInfoObject())
+            info1.guidelines = [dict(x=1, y=2, angle=10, name="foo",
+                                     identifier=None, color=None)]
+            expected = func(info1)
+            result = inPlaceFunc(info1)
+            self.assertIs(result, info1)
+            self.assertEqual(info1._attributes(), expected._attributes())
+        info1 = MathInfo(_TestInfoObject())
+        info1 += info1
+        self.assertEqual(info1, MathInfo(_TestInfoObject()) * 2)
+
+    def test_slots(self):
+        info = MathInfo(_TestInfoObject()) * 2
+        self.assertEqual(vars(info), {})
+        info.customAttribute = 1
+        self.assertEqual(vars(info), {"customAttribute": 1})
+        self.assertEqual(info._attributes()["customAttribute"], 1)
+
+    def test_pickle(self):
+        import pickle
+        info1 = MathInfo(_TestInfoObject()) * 2
+        del info1.ascender
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            info2 = pickle.loads(pickle.dumps(info1, protocol))
+            self.assertEqual(info1, info2)
+            self.assertFalse(hasattr(info2, "ascender"))
+
+
 
 # ----
 # Test Data
@@ -1,6 +1,6 @@
 from __future__ import unicode_literals
 import unittest
-from fontMath.mathFunctions import _roundNumber
+from fontMath.mathFunctions import add, sub, mul, div, _roundNumber
 from fontMath.mathKerning import MathKerning
 
 
@@ -493,6 +493,67 @@ class MathKerningTest(unittest.TestCase):
              (('E', 'E'), 1.2),
              (('public.kern1.C', 'public.kern2.C'), 1)])
 
+    def test_cleanup_exceptionIndex(self):
+        kerning = {
+            ("public.kern1.A", "public.kern2.A"): 0,
+            ("A", "public.kern2.A"): 0,
+            ("public.kern1.A", "A"): 0.0,
+            ("A", "A"): 0,
+            ("X", "A"): 0,
+            ("X", "X"): 0,
+            ("public.kern1.A", "X"): 0,
+            ("X", "public.kern2.A"): 2.0,
+        }
+        groups = {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.A": ["A"],
+        }
+        obj = MathKerning(kerning, groups)
+        expected = {
+            pair: v for pair, v in kerning.items()
+            if v or "exception" in obj.guessPairType(pair)
+        }
+        obj.cleanup()
+        self.assertEqual(dict(obj.items()), expected)
+        self.assertEqual(obj._groupTable._exceptionIndex,
+                         (frozenset(["A", "Aacute"]), frozenset(["A"])))
+        self.assertEqual([type(v) for k, v in sorted(obj.items())], [int] * 5)
+        obj.updateGroups({})
+        self.assertIsNone(obj._groupTable._exceptionIndex)
+        obj.cleanup()
+        self.assertEqual(list(obj.items()), [(("X", "public.kern2.A"), 2)])
+
+    def test_cleanup_fused(self):
+        kerning1 = {
+            ("A", "A"): 1,
+            ("A", "public.kern2.A"): -1,
+            ("public.kern1.A", "B"): 2.5,
+        }
+        kerning2 = {
+            ("A", "A"): 1,
+            ("A", "public.kern2.A"): 1,
+            ("B", "B"): 3,
+        }
+        groups = {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.A": ["A", "Aacute"],
+        }
+        obj1 = MathKerning(kerning1, groups)
+        obj2 = MathKerning(kerning2, groups)
+        for result, funct, args in (
+                (obj1 + obj2, "_processMathOne", (obj2, add)),
+                (obj1 - obj2, "_processMathOne", (obj2, sub)),
+                (obj1 * 0, "_processMathTwo", (0, mul)),
+                (obj1 / 2, "_processMathTwo", (2, div))):
+            expected = getattr(obj1, funct)(*args)
+            expected.cleanup()
+            self.assertEqual(sorted(result.items()), sorted(expected.items()))
+        self.assertEqual(sorted((obj1 - obj2).items()),
+                         [(("A", "A"), 0),
+                          (("A", "public.kern2.A"), -2),
+                          (("B", "B"), -3),
+                          (("public.kern1.A", "B"), 2.5)])
+
     def test_extractKerning(self):
         kerning = {
             ("A", "A"): 0,
@@ -544,5 +605,246 @@ class MathKerningTest(unittest.TestCase):
             1200)
 
 
+    def test_inplace(self):
+        kerning1 = {
+            ("A", "A"): 1,
+            ("public.kern1.D", "B"): 2,
+            ("public.kern1.D", "public.kern2.D"): 1,
+        }
+        groups1 = {
+            "public.kern1.D": ["D", "H"],
+            "public.kern2.D": ["D", "H"],
+        }
+        kerning2 = {
+            ("A", "A"): -1,
+            ("D", "B"): 1,
+            ("public.kern1.NotIn1", "C"): 1,
+        }
+        groups2 = {
+            "public.kern1.NotIn1": ["C"],
+        }
+        other = MathKerning(kerning2, groups2)
+        for func, inPlaceFunc in (
+                (lambda k: k + other, lambda k: k.__iadd__(other)),
+                (lambda k: k - other, lambda k: k.__isub__(other)),
+                (lambda k: k * 2, lambda k: k.__imul__(2)),
+                (lambda k: k * (2, 3), lambda k: k.__imul__((2, 3))),
+                (lambda k: k / 4, lambda k: k.__itruediv__(4))):
+            obj = MathKerning(kerning1, groups1)
+            result = inPlaceFunc(obj)
+            self.assertIs(result, obj)
+            self.assertEqual(obj, func(MathKerning(kerning1, groups1)))
+            self.assertEqual(obj.groups(), func(MathKerning(kerning1, groups1)).groups())
+        obj = MathKerning(kerning1, groups1)
+        obj += obj
+        self.assertEqual(obj, MathKerning(kerning1, groups1) * 2)
+
+    def test_resolutionIndex(self):
+        kerning = {
+            ("public.kern1.A", "public.kern2.B"): -10,
+            ("A", "public.kern2.B"): -20,
+        }
+        groups = {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.B": ["B", "D"],
+        }
+        obj = MathKerning(kerning, groups)
+        self.assertIsNone(obj._resolutionIndex)
+        self.assertEqual(obj["Aacute", "D"], -10)
+        self.assertEqual(obj._resolutionIndex[("Aacute", "D")], -10)
+        self.assertEqual(obj["A", "D"], -20)
+        self.assertEqual(obj["A", "C"], 0)
+        obj.update({("public.kern1.A", "public.kern2.B"): -5})
+        self.assertIsNone(obj._resolutionIndex)
+        self.assertEqual(obj["A", "D"], -5)
+        obj.updateGroups({"public.kern1.A": ["Aacute"], "public.kern2.B": ["B", "D"]})
+        self.assertEqual(obj["A", "D"], 0)
+        self.assertEqual(obj["Aacute", "D"], -5)
+        obj.addTo(1)
+        self.assertEqual(obj["Aacute", "D"], -4)
+        obj *= 2
+        self.assertEqual(obj["Aacute", "D"], -8)
+        obj /= 3
+        obj.round()
+        self.assertEqual(obj["Aacute", "D"], -3)
+
+    def test_getValues(self):
+        kerning = {
+            ("public.kern1.A", "public.kern2.B"): -10,
+            ("A", "public.kern2.B"): -20,
+            ("B", "A"): 5,
+        }
+        groups = {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.B": ["B", "D"],
+        }
+        obj = MathKerning(kerning, groups)
+        pairs = [("Aacute", "D"), ("A", "B"), ("B", "A"), ("C", "D"),
+                 ("public.kern1.A", "D"), ("Aacute", "D")]
+        self.assertEqual(obj.getValues(pairs), [obj[pair] for pair in pairs])
+        self.assertEqual(obj.getValues(iter(pairs)), [-10, -20, 5, 0, -10, -10])
+        self.assertEqual(obj.getSequenceValues(["B", "A", "D"]), [5, -20])
+        self.assertEqual(obj.getSequenceValues(["Aacute", "B", "A", "D"]), [-10, 5, -20])
+        self.assertEqual(obj.getSequenceValues(["A"]), [])
+        self.assertEqual(obj.getSequenceValues([]), [])
+        side1Resolution, side2Resolution = obj._groupTable._sideResolution
+        self.assertEqual(side1Resolution["Aacute"], ("Aacute", "public.kern1.A"))
+        self.assertEqual(side2Resolution["D"], ("D", "public.kern2.B"))
+        # the side resolution is kept when the kerning changes
+        obj.update({("public.kern1.A", "public.kern2.B"): -5})
+        self.assertIsNotNone(obj._groupTable._sideResolution)
+        self.assertEqual(obj.getValues([("Aacute", "D")]), [-5])
+        obj.updateGroups({"public.kern2.B": ["B", "D"]})
+        self.assertIsNone(obj._groupTable._sideResolution)
+        self.assertEqual(obj.getValues([("Aacute", "D")]), [0])
+
+    def test_groupTable(self):
+        kerning = {("public.kern1.A", "B"): 10, ("C", "public.kern2.C"): 5}
+        groups = {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.C": ["C"],
+            "other": ["X"],
+        }
+        obj1 = MathKerning(kerning, groups)
+        table = obj1._groupTable
+        self.assertEqual(table.side1GroupMap, {"A": "public.kern1.A", "Aacute": "public.kern1.A"})
+        self.assertEqual(table.side2GroupMap, {"C": "public.kern2.C"})
+        # the table is shared by copies and the results of math
+        for result in (obj1.copy(), obj1 * 2, 0.5 * obj1, obj1 / 2,
+                       obj1 + obj1, obj1 - MathKerning(kerning),
+                       MathKerning(kerning, table)):
+            self.assertIs(result._groupTable, table)
+        obj1 *= 2
+        self.assertIs(obj1._groupTable, table)
+        # groups returns a new dict of lists
+        obj1.groups()["public.kern1.A"].append("B")
+        self.assertEqual(obj1.groups(), {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.C": ["C"],
+        })
+        # merged groups make a new table
+        obj2 = MathKerning(kerning, {"public.kern1.A": ["Agrave"]})
+        result = obj1 + obj2
+        self.assertIsNot(result._groupTable, table)
+        self.assertEqual(result.groups()["public.kern1.A"], ["A", "Aacute", "Agrave"])
+        self.assertEqual(result["Agrave", "B"], 30)
+        self.assertIs((MathKerning(kerning) + obj2)._groupTable, obj2._groupTable)
+
+    def test_pickle(self):
+        import pickle
+        kerning = {("public.kern1.A", "B"): 1, ("A", "public.kern2.B"): -1}
+        groups = {"public.kern1.A": ["A", "Aacute"], "public.kern2.B": ["B"]}
+        obj1 = MathKerning(kerning, groups)
+        self.assertEqual(vars(obj1), {})
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            obj2 = pickle.loads(pickle.dumps(obj1, protocol))
+            self.assertEqual(obj1, obj2)
+            self.assertEqual(obj2["Aacute", "B"], 1)
+            self.assertEqual(obj2.groups(), groups)
+
+
+class MathKerningPackedTest(unittest.TestCase):
+
+    kerning1 = {
+        ("A", "A"): 1,
+        ("A", "public.kern2.O"): -20,
+        ("public.kern1.O", "public.kern2.O"): 10,
+        ("O", "public.kern2.O"): 0,
+        ("T", "o"): -30.5,
+    }
+    kerning2 = {
+        ("A", "A"): -1,
+        ("public.kern1.O", "public.kern2.O"): 15,
+        ("T", "o"): 30.5,
+        ("V", "A"): -40,
+    }
+    groups = {
+        "public.kern1.O": ["O", "D"],
+        "public.kern2.O": ["O", "C"],
+    }
+
+    def _setupKerning(self, kerning, packed=True):
+        return MathKerning(kerning, self.groups, packed=packed)
+
+    def assertKerningEqual(self, obj, expected):
+        # integral values are ints in packed mode, so only
+        # the values are compared
+        self.assertEqual(sorted(obj.items()), sorted(expected.items()))
+        self.assertEqual(obj.groups(), expected.groups())
+
+    def test_init(self):
+        obj = self._setupKerning(self.kerning1)
+        self.assertTrue(obj.packed)
+        self.assertEqual(len(obj._packedKerning), 5)
+        self.assertEqual(dict(obj.items()), self.kerning1)
+        self.assertEqual(obj["D", "C"], 10)
+        self.assertEqual(obj["A", "C"], -20)
+        self.assertIn(("T", "o"), obj)
+        self.assertEqual(obj, self._setupKerning(self.kerning1, packed=False))
+        self.assertEqual(obj.copy(), obj)
+        self.assertTrue(obj.copy().packed)
+
+    def test_math(self):
+        for func in (
+                lambda k1, k2: k1 + k2,
+                lambda k1, k2: k1 - k2,
+                lambda k1, k2: k1 + (k2 - k1) * 0.25,
+                lambda k1, k2: k1 * 2,
+                lambda k1, k2: 0.5 * k1,
+                lambda k1, k2: k1 / 4,
+                lambda k1, k2: (k1 + k1) * (3, 2)):
+            result = func(self._setupKerning(self.kerning1),
+                          self._setupKerning(self.kerning2))
+            expected = func(self._setupKerning(self.kerning1, packed=False),
+                            self._setupKerning(self.kerning2, packed=False))
+            self.assertTrue(result.packed)
+            self.assertKerningEqual(result, expected)
+
+    def test_math_aligned(self):
+        obj1 = self._setupKerning(self.kerning1)
+        obj2 = self._setupKerning({k: v * 3 for k, v in self.kerning1.items()})
+        matrix = obj1._packedKerning
+        self.assertTrue(matrix.isAligned(obj2._packedKerning))
+        result = obj1 + obj2 * 0.5
+        self.assertEqual(result["A", "A"], 2.5)
+        self.assertEqual(result["D", "C"], 25)
+        self.assertIsInstance(result["D", "C"], int)
+        result = obj1 - obj1 * 0.5
+        self.assertIs(result._packedKerning.structure.side1Names,
+                      matrix.structure.side1Names)
+
+    def test_inplace(self):
+        for func in (
+                lambda k1, k2: k1.__iadd__(k2),
+                lambda k1, k2: k1.__isub__(k1 * 2),
+                lambda k1, k2: k1.__imul__(2),
+                lambda k1, k2: k1.__itruediv__(4)):
+            obj = self._setupKerning(self.kerning1)
+            result = func(obj, self._setupKerning(self.kerning2))
+            self.assertIs(result, obj)
+            expected = self._setupKerning(self.kerning1, packed=False)
+            expected = func(expected, self._setupKerning(self.kerning2, packed=False))
+            self.assertKerningEqual(obj, expected)
+
+    def test_round_addTo_cleanup(self):
+        for func in (
+                lambda k: k.round(5),
+                lambda k: k.addTo(0.5),
+                lambda k: k.cleanup()):
+            obj = self._setupKerning(self.kerning1)
+            expected = self._setupKerning(self.kerning1, packed=False)
+            func(obj)
+            func(expected)
+            self.assertKerningEqual(obj, expected)
+
+    def test_pickle(self):
+        import pickle
+        obj1 = self._setupKerning(self.kerning1)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            obj2 = pickle.loads(pickle.dumps(obj1, protocol))
+            self.assertTrue(obj2.packed)
+            self.assertEqual(obj1, obj2)
+
+
 if __name__ == "__main__":
     unittest.main()